@@ -13,6 +13,7 @@ import sys
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.styling import get_base_css, get_home_theme
+from utils.preload import render_preload_status
 
 # Page config
 st.set_page_config(
@@ -111,6 +112,9 @@ with st.sidebar:
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # Model readiness (only shown with POTHOLE_PRELOAD=1)
+    render_preload_status()
+    
     # 3. DEVELOPER INFO / FOOTER
     st.markdown("""
     <div style='text-align: center; padding: 1rem; background: rgba(255,255,255,0.03); border-radius: 10px; border-top: 1px solid #333;'>
@@ -301,7 +305,7 @@ st.info("""
 **Dataset Characteristics:**
 - Binary Classification: POTHOLE vs NOPOTHOLE
 - Balanced Distribution: 50/50 split
-- Image Resolution: 224×224 pixels (resized)
+- Image Resolution: 224×224 pixels (resized; lower-resolution model variants use 128 / 160)
 - Format: JPG, PNG
 """)
 
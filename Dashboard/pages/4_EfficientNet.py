@@ -8,18 +8,16 @@ import os
 import sys
 import pandas as pd
 import numpy as np
-from PIL import Image
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import zipfile
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import (
     get_base_css, get_efficientnet_theme,
-    load_efficientnet_model, get_model_info, CLASS_NAMES,
-    predict_with_gradcam, compute_image_stats, generate_interpretation
+    get_model_info, check_model_exists, CLASS_NAMES,
+    render_preload_status, render_registry_status,
+    compute_image_stats, generate_interpretation,
+    ImageContext, list_zip_images,
+    render_batch_options, render_stage_summary, render_batch_downloads
 )
 
 # Page config
@@ -49,11 +47,11 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Load model
-model = load_efficientnet_model()
+# Model info (the model itself is loaded inside the tabs that run inference,
+# so TensorFlow is only imported once it is needed)
 model_info = get_model_info("EfficientNet")
 
-if model is None:
+if not check_model_exists("EfficientNet"):
     st.error("Model not found! Please check model path.")
     st.stop()
 
@@ -87,6 +85,10 @@ Training Time: 15-20 min ⚡
     - Resource constraints
     """)
 
+# Model readiness (only shown with POTHOLE_PRELOAD=1) and memory use
+render_preload_status()
+render_registry_status()
+
 # Main content tabs
 tab1, tab2, tab3, tab4 = st.tabs([
     "📊 Model Performance",
@@ -194,7 +196,16 @@ with tab2:
     )
     
     if uploaded_file is not None:
-        pil_image = Image.open(uploaded_file)
+        import matplotlib.pyplot as plt
+        from utils import load_efficientnet_model, predict_with_gradcam
+        
+        model = load_efficientnet_model()
+        try:
+            image_ctx = ImageContext.from_upload(uploaded_file)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+        pil_image = image_ctx.image
         
         with st.spinner("Processing image..."):
             # Step 1: Display original
@@ -208,7 +219,7 @@ with tab2:
             st.markdown("---")
             st.markdown("### <i class='fa-solid fa-magnifying-glass-chart'></i> Step 2: Image Analysis", unsafe_allow_html=True)
             
-            stats = compute_image_stats(pil_image)
+            stats = compute_image_stats(image_ctx)
             col1, col2, col3, col4 = st.columns(4)
             col1.metric("Width", f"{stats['width']}px")
             col2.metric("Height", f"{stats['height']}px")
@@ -220,7 +231,7 @@ with tab2:
             st.markdown("### <i class='fa-solid fa-bullseye'></i> Step 3: Model Prediction", unsafe_allow_html=True)
             
             pred_label, pred_conf, preds, heatmap, overlay = predict_with_gradcam(
-                model, pil_image, CLASS_NAMES, 
+                model, image_ctx, CLASS_NAMES, 
                 last_conv_layer=model_info['last_conv_layer'],
                 model_type="EfficientNet"
             )
@@ -295,11 +306,19 @@ with tab3:
     camera_image = st.camera_input("Take a photo")
     
     if camera_image is not None:
-        pil_image = Image.open(camera_image)
+        from utils import load_efficientnet_model, predict_with_gradcam
+        
+        model = load_efficientnet_model()
+        try:
+            image_ctx = ImageContext.from_upload(camera_image)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+        pil_image = image_ctx.image
         
         with st.spinner("Analyzing..."):
             pred_label, pred_conf, preds, heatmap, overlay = predict_with_gradcam(
-                model, pil_image, CLASS_NAMES,
+                model, image_ctx, CLASS_NAMES,
                 last_conv_layer=model_info['last_conv_layer'],
                 model_type="EfficientNet"
             )
@@ -328,48 +347,27 @@ with tab4:
     uploaded_zip = st.file_uploader("Upload ZIP file containing images", type=["zip"])
     
     if uploaded_zip is not None:
-        images = []
-        image_names = []
+        # Only member names are read here; images are decoded while streaming
+        image_names = list_zip_images(uploaded_zip)
         
-        with zipfile.ZipFile(uploaded_zip, 'r') as z:
-            for fname in z.namelist():
-                if fname.lower().endswith(('.jpg', '.png', '.jpeg')):
-                    with z.open(fname) as f:
-                        images.append(Image.open(BytesIO(f.read())).copy())
-                        image_names.append(os.path.basename(fname))
-        
-        if len(images) > 0:
-            st.success(f"✅ {len(images)} images loaded successfully!")
+        if len(image_names) > 0:
+            st.success(f"✅ {len(image_names)} images found in archive!")
+            
+            options = render_batch_options()
             
             if st.button("🚀 Start Batch Analysis", use_container_width=True):
-                progress_bar = st.progress(0)
-                results = []
+                import matplotlib.pyplot as plt
+                from utils import load_efficientnet_model, run_batch_analysis
                 
-                for idx, (img, name) in enumerate(zip(images, image_names)):
-                    from utils.inference import predict_image
-                    pred_label, pred_conf, preds = predict_image(
-                        model, img, CLASS_NAMES, model_type="EfficientNet"
-                    )
-                    results.append({
-                        "image_name": name,
-                        "prediction": pred_label,
-                        "confidence": pred_conf,
-                        "prob_nopothole": preds[0],
-                        "prob_pothole": preds[1]
-                    })
-                    progress_bar.progress((idx + 1) / len(images))
-                
-                df_results = pd.DataFrame(results)
-                
-                # Results table
-                st.markdown("---")
-                st.markdown("### <i class='fa-solid fa-table'></i> Batch Results", unsafe_allow_html=True)
-                st.dataframe(df_results, use_container_width=True)
+                run = run_batch_analysis(load_efficientnet_model(), "EfficientNet", uploaded_zip, image_names, options)
+                df_results = run.results
                 
                 # Statistics
                 st.markdown("---")
                 st.markdown("### <i class='fa-solid fa-chart-pie'></i> Batch Statistics", unsafe_allow_html=True)
                 
+                render_stage_summary(run)
+                
                 col1, col2 = st.columns(2)
                 
                 with col1:
@@ -403,15 +401,8 @@ with tab4:
                     st.pyplot(fig2)
                     plt.close()
                 
-                # Download results
-                csv = df_results.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Results (CSV)",
-                    data=csv,
-                    file_name="efficientnet_batch_results.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+                # Download results (written incrementally while scoring)
+                render_batch_downloads(run, "efficientnet")
         else:
             st.warning("No valid images found in ZIP file")
 
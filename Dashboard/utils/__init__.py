@@ -1,52 +1,156 @@
 """
 Utils package for Pothole Detection Dashboard
+
+Names are loaded lazily on first access, so importing a light module
+(e.g. utils.styling on the Home page) does not pull in TensorFlow.
 """
 
-from .model_loader import (
-    load_purecnn_model,
-    load_resnet_model,
-    load_efficientnet_model,
-    get_model_info,
-    check_model_exists,
-    CLASS_NAMES
-)
+import importlib
+
+_LAZY_IMPORTS = {
+    'model_loader': [
+        'load_purecnn_model',
+        'load_resnet_model',
+        'load_efficientnet_model',
+        'load_student_model',
+        'get_model_info',
+        'check_model_exists',
+        'get_inference_fn',
+        'get_model_mtime',
+        'get_model_path',
+        'get_input_size',
+        'get_resolution_path',
+        'get_registry',
+        'get_resident_models',
+        'render_registry_status',
+        'ModelRegistry',
+        'MODEL_SPECS',
+        'CLASS_NAMES'
+    ],
+    'inference': [
+        'predict_image',
+        'predict_images',
+        'preprocess_image',
+        'run_inference',
+        'load_inference_model',
+        'compute_image_stats',
+        'generate_interpretation',
+        'CONFIDENCE_THRESHOLD'
+    ],
+    'bn_folding': [
+        'ChannelShift',
+        'fold_batchnorm'
+    ],
+    'backends': [
+        'InferenceBackend',
+        'KerasBackend',
+        'TFLiteBackend',
+        'ONNXBackend',
+        'BACKENDS',
+        'get_backend',
+        'get_backend_config',
+        'register_backend',
+        'as_keras_model',
+        'get_model_identity',
+        'get_onnx_path'
+    ],
+    'cascade': [
+        'CascadeModel',
+        'CascadeStage',
+        'parse_stages',
+        'get_cascade_config',
+        'summarize_stages'
+    ],
+    'gradcam': [
+        'predict_with_gradcam',
+        'make_gradcam_heatmap',
+        'make_gradcam_heatmaps',
+        'generate_gradcam_overlay',
+        'generate_gradcam_overlays',
+        'explain_images',
+        'explain_by_model'
+    ],
+    'preload': [
+        'is_preload_enabled',
+        'start_preload',
+        'render_preload_status',
+        'warmup_model'
+    ],
+    'batch': [
+        'list_zip_images',
+        'iter_zip_members',
+        'decode_members',
+        'stream_predictions',
+        'stream_zip_predictions',
+        'make_result_row',
+        'result_columns',
+        'BatchChunk',
+        'ThroughputMeter',
+        'ResultWriter',
+        'MAX_EXPLAINED_HITS',
+        'BatchOptions',
+        'BatchRun',
+        'render_batch_options',
+        'run_batch_analysis',
+        'render_stage_summary',
+        'render_batch_downloads'
+    ],
+    'decode': [
+        'decode_image',
+        'DISPLAY_MAX_SIDE',
+        'BATCH_MAX_SIDE'
+    ],
+    'image_context': [
+        'ImageContext',
+        'as_image_context'
+    ],
+    'preprocessing': [
+        'preprocess_batch',
+        'get_preprocessor',
+        'register_preprocessor'
+    ],
+    'tflite_backend': [
+        'TFLiteModel',
+        'get_tflite_path',
+        'check_tflite_exists',
+        'TFLITE_VARIANTS'
+    ],
+    'result_cache': [
+        'ResultCache',
+        'get_result_cache'
+    ],
+    'job_store': [
+        'JobStore',
+        'BatchJob',
+        'archive_fingerprint',
+        'get_job_store'
+    ],
+    'styling': [
+        'get_base_css',
+        'get_purecnn_theme',
+        'get_resnet_theme',
+        'get_efficientnet_theme',
+        'get_home_theme'
+    ]
+}
 
-from .inference import (
-    predict_image,
-    compute_image_stats,
-    generate_interpretation
-)
+_NAME_TO_MODULE = {
+    name: module_name
+    for module_name, names in _LAZY_IMPORTS.items()
+    for name in names
+}
 
-from .gradcam import (
-    predict_with_gradcam,
-    make_gradcam_heatmap,
-    generate_gradcam_overlay
-)
+__all__ = list(_NAME_TO_MODULE)
 
-from .styling import (
-    get_base_css,
-    get_purecnn_theme,
-    get_resnet_theme,
-    get_efficientnet_theme,
-    get_home_theme
-)
+def __getattr__(name):
+    """Import the owning submodule on first access"""
+    module_name = _NAME_TO_MODULE.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
 
-__all__ = [
-    'load_purecnn_model',
-    'load_resnet_model',
-    'load_efficientnet_model',
-    'get_model_info',
-    'check_model_exists',
-    'CLASS_NAMES',
-    'predict_image',
-    'compute_image_stats',
-    'generate_interpretation',
-    'predict_with_gradcam',
-    'make_gradcam_heatmap',
-    'generate_gradcam_overlay',
-    'get_base_css',
-    'get_purecnn_theme',
-    'get_resnet_theme',
-    'get_efficientnet_theme',
-    'get_home_theme'
-]
\ No newline at end of file
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
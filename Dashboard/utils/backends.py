@@ -0,0 +1,199 @@
+"""
+Pluggable inference backends
+One predict contract over Keras, the TFLite interpreter and ONNX Runtime, selected per model
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .model_loader import MODEL_SPECS, get_inference_fn, get_model_path, get_resolution_path, load_model_file
+from .tflite_backend import TFLiteModel, get_tflite_path
+
+class InferenceBackend(ABC):
+    """
+    Runs a model on preprocessed batches
+
+    Every backend receives the same float32 (N, h, w, 3) batch from
+    the preprocessing registry and returns float32 (N, num_classes)
+    probabilities, so callers never depend on the runtime.
+    """
+
+    name = None
+    supports_gradcam = False
+    # File the runtime loaded
+    path = None
+
+    def __init__(self, model_name, variant=None, num_threads=None):
+        self.model_name = model_name
+        self.variant = variant
+        self.num_threads = num_threads
+
+    @abstractmethod
+    def predict(self, img_batch):
+        """float32 (N, num_classes) probabilities for a preprocessed batch"""
+
+    @property
+    def keras_model(self):
+        """Keras model of the same weights (for Grad-CAM)"""
+        return load_model_file(self.model_name)
+
+    def describe(self):
+        return self.name
+
+class KerasBackend(InferenceBackend):
+    """Compiled Keras forward pass; the model is looked up in the registry per call"""
+
+    name = "keras"
+    supports_gradcam = True
+
+    @property
+    def path(self):
+        """Registry file (resolution variant, folded graph or trained model)"""
+        return get_model_path(self.model_name)
+
+    def predict(self, img_batch):
+        model = load_model_file(self.model_name)
+        if model is None:
+            raise FileNotFoundError(f"Model not found: {self.path}")
+        return get_inference_fn(model)(np.asarray(img_batch, dtype=np.float32)).numpy()
+
+class TFLiteBackend(InferenceBackend):
+    """Exported TFLite variant on the interpreter (XNNPACK)"""
+
+    name = "tflite"
+
+    def __init__(self, model_name, variant=None, num_threads=None):
+        super().__init__(model_name, variant or "int8", num_threads)
+        self.path = get_tflite_path(model_name, self.variant)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"TFLite model not found: {self.path} (run export_tflite.py)")
+        self._model = TFLiteModel(self.path, num_threads=num_threads)
+
+    def predict(self, img_batch):
+        return self._model.predict(img_batch)
+
+    def describe(self):
+        return f"tflite ({self.variant})"
+
+def get_onnx_path(model_name):
+    """Path of the offline ONNX export (e.g. final_model_fixed.onnx)"""
+    stem, _ = os.path.splitext(get_resolution_path(model_name))
+    return f"{stem}.onnx"
+
+class ONNXBackend(InferenceBackend):
+    """
+    ONNX Runtime session on the CPU execution provider
+
+    The model is exported offline with NHWC input kept, e.g.
+    ``python -m tf2onnx.convert --saved-model <dir> --output <stem>.onnx``.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name, variant=None, num_threads=None):
+        super().__init__(model_name, variant, num_threads)
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The onnx backend requires onnxruntime (pip install onnxruntime)")
+
+        self.path = get_onnx_path(model_name)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"ONNX model not found: {self.path}")
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+        self._input_name = self._session.get_inputs()[0].name
+
+    def predict(self, img_batch):
+        outputs = self._session.run(None, {self._input_name: np.asarray(img_batch, dtype=np.float32)})
+        return np.asarray(outputs[0], dtype=np.float32)
+
+# Backend implementations by name
+BACKENDS = {
+    "keras": KerasBackend,
+    "tflite": TFLiteBackend,
+    "onnx": ONNXBackend
+}
+
+def register_backend(name, backend_cls):
+    """Register an InferenceBackend subclass under a config name"""
+    BACKENDS[name] = backend_cls
+
+def get_backend_config(model_name):
+    """
+    Configured backend for a model as (name, variant)
+
+    POTHOLE_BACKEND_<MODEL> (e.g. POTHOLE_BACKEND_EFFICIENTNET=tflite:int8)
+    overrides POTHOLE_BACKEND, which overrides the model spec's "backend".
+    """
+    value = (
+        os.environ.get(f"POTHOLE_BACKEND_{model_name.upper()}")
+        or os.environ.get("POTHOLE_BACKEND")
+        or MODEL_SPECS[model_name].get("backend", "keras")
+    )
+    name, _, variant = value.strip().lower().partition(":")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name} (expected one of {', '.join(BACKENDS)})")
+    return name, variant or None
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_backend(model_name, backend=None, variant=None, num_threads=None):
+    """
+    Get the inference backend for a model (cached per configuration)
+
+    Args:
+        model_name: Registered model name
+        backend: Backend name (None = configured backend)
+        variant: Backend variant, e.g. the TFLite "int8" / "float16" / "dynamic"
+        num_threads: Runtime threads (None = POTHOLE_BACKEND_THREADS or the runtime default)
+    """
+    if backend is None:
+        backend, configured_variant = get_backend_config(model_name)
+        variant = variant or configured_variant
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    if num_threads is None and os.environ.get("POTHOLE_BACKEND_THREADS"):
+        num_threads = int(os.environ["POTHOLE_BACKEND_THREADS"])
+
+    key = (model_name, backend, variant, num_threads)
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = BACKENDS[backend](model_name, variant=variant, num_threads=num_threads)
+        return _backends[key]
+
+def get_model_identity(model, model_type):
+    """
+    Name and mtime of the files behind a model's results
+
+    Follows the file the active backend actually loaded: the registry file
+    for Keras (so a resolution variant or the folded graph gets its own
+    identity) and the exported file plus variant for TFLite / ONNX, whose
+    Grad-CAM still comes from the Keras weights. Used to key cached and
+    stored results.
+
+    Returns:
+        (identity string, latest mtime of those files, None if any is missing)
+    """
+    paths = [get_model_path(model_type)]
+    name = model_type
+    if isinstance(model, InferenceBackend) and not model.supports_gradcam:
+        paths.append(model.path)
+        name = f"{model_type}-{model.name}-{model.variant}"
+
+    mtimes = [os.path.getmtime(path) if path and os.path.exists(path) else None for path in paths]
+    identity = f"{name}[{'|'.join(str(path) for path in paths)}]"
+    return identity, None if None in mtimes else max(mtimes)
+
+def as_keras_model(model):
+    """Keras model behind a backend (Keras models pass through)"""
+    if isinstance(model, InferenceBackend):
+        return model.keras_model
+    return model
@@ -0,0 +1,510 @@
+"""
+Streaming batch analysis
+Iterates ZIP archives lazily, decodes in a small thread pool and scores fixed-size batches
+"""
+
+import os
+import tempfile
+import time
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+from .decode import decode_image, BATCH_MAX_SIDE
+from .inference import predict_images
+from .cascade import CascadeModel, summarize_stages
+from .model_loader import CLASS_NAMES
+
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.jpeg')
+
+# Grad-CAM overlays kept for display in the batch tab (at the model's input size)
+MAX_EXPLAINED_HITS = 64
+
+# Batch tab settings: Grad-CAM for POTHOLE hits, the cascade to score with
+# (None = the page's own model) and whether previously skipped images are retried
+BatchOptions = namedtuple("BatchOptions", ["explain_hits", "cascade", "retry_skipped"])
+
+# Outcome of a batch tab run: results DataFrame, the ResultWriter holding the
+# exports and the cascade used (None = the page's own model)
+BatchRun = namedtuple("BatchRun", ["results", "writer", "cascade"])
+
+# One scored batch: result rows, the decoded images (for optional Grad-CAM,
+# dropped by the caller once used; None for rows restored from a job store),
+# the "name: error" messages of members that failed to decode, the member
+# names of the rows, the inference time in seconds and the member names of
+# the skipped members
+BatchChunk = namedtuple(
+    "BatchChunk", ["results", "images", "skipped", "names", "seconds", "skipped_names"],
+    defaults=((), 0.0, ())
+)
+
+def list_zip_images(zip_source):
+    """Names of image members in a ZIP archive (nothing is decoded)"""
+    with zipfile.ZipFile(zip_source, 'r') as z:
+        return [name for name in z.namelist() if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+def iter_zip_members(zip_source, names=None):
+    """Yield (name, bytes) for image members, reading one member at a time"""
+    with zipfile.ZipFile(zip_source, 'r') as z:
+        if names is None:
+            names = [name for name in z.namelist() if name.lower().endswith(IMAGE_EXTENSIONS)]
+        for name in names:
+            with z.open(name) as f:
+                yield name, f.read()
+
+def decode_members(members, num_workers=4, max_side=BATCH_MAX_SIDE):
+    """
+    Decode (name, bytes) pairs in a thread pool, in order
+
+    At most ``2 * num_workers`` members are read ahead, so memory stays
+    bounded no matter how large the archive is. A member whose data is an
+    OSError (the file could not be read) is yielded as failed.
+
+    Yields:
+        (name, image, error) with image None when reading or decoding failed
+    """
+    def decode(name, data):
+        if isinstance(data, OSError):
+            return name, None, data.strerror or str(data)
+        try:
+            return name, decode_image(BytesIO(data), max_side=max_side), None
+        except ValueError as e:
+            return name, None, str(e)
+
+    window = max(2 * num_workers, 1)
+    with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="decode") as pool:
+        pending = deque()
+        for name, data in members:
+            pending.append(pool.submit(decode, name, data))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def make_result_row(name, pred_label, pred_conf, preds, class_names, stage=None):
+    """Result row for one image (one prob_<class> column per class, plus the cascade stage)"""
+    row = {
+        "image_name": os.path.basename(name),
+        "prediction": pred_label,
+        "confidence": float(pred_conf)
+    }
+    for class_name, prob in zip(class_names, preds):
+        row[f"prob_{class_name.lower()}"] = float(prob)
+    if stage is not None:
+        row["stage"] = stage
+    return row
+
+def result_columns(class_names, stage=False):
+    """Columns of make_result_row rows, in order (``stage``: include the cascade stage column)"""
+    columns = ["image_name", "prediction", "confidence"]
+    columns += [f"prob_{class_name.lower()}" for class_name in class_names]
+    if stage:
+        columns.append("stage")
+    return columns
+
+def stream_predictions(model, decoded, class_names, model_type="PureCNN", batch_size=32):
+    """
+    Score a stream of decoded images in fixed-size batches
+
+    Args:
+        model: Trained model (or a CascadeModel, which adds a "stage" column)
+        decoded: Iterable of (name, image, error) from decode_members
+        class_names: List of class names
+        model_type: Type of model for preprocessing
+        batch_size: Number of images per forward pass
+
+    Yields:
+        BatchChunk per batch
+    """
+    names, images, skipped, skipped_names = [], [], [], []
+
+    def flush():
+        start = time.perf_counter()
+        if isinstance(model, CascadeModel):
+            predictions = model.predict_images(images, class_names, batch_size=len(images))
+        else:
+            predictions = predict_images(model, images, class_names, model_type, batch_size=len(images))
+        results = [
+            make_result_row(name, label, conf, preds, class_names, *stage)
+            for name, (label, conf, preds, *stage) in zip(names, predictions)
+        ] if images else []
+        return BatchChunk(results, images, skipped, names, time.perf_counter() - start, skipped_names)
+
+    for name, image, error in decoded:
+        if image is None:
+            skipped.append(f"{os.path.basename(name)}: {error}")
+            skipped_names.append(name)
+            continue
+        names.append(name)
+        images.append(image)
+        if len(images) == batch_size:
+            yield flush()
+            names, images, skipped, skipped_names = [], [], [], []
+
+    if images or skipped:
+        yield flush()
+
+def stream_zip_predictions(model, zip_source, class_names, model_type="PureCNN",
+                           batch_size=32, num_workers=4, names=None, job=None):
+    """
+    Score every image in a ZIP archive with bounded memory
+
+    Members are read lazily, decoded in a thread pool of ``num_workers``
+    and scored ``batch_size`` at a time. Only the current batch (plus a
+    small read-ahead window) is ever held in memory.
+
+    With a ``job`` (BatchJob from job_store), members stored by an earlier
+    run are not read again (see ``job.completed_rows()`` and
+    ``job.skipped_rows()``), every scored batch and every member that
+    failed to decode is persisted, and images whose content was already
+    scored are not run again.
+
+    Yields:
+        BatchChunk per batch
+    """
+    if job is None:
+        members = iter_zip_members(zip_source, names)
+        decoded = decode_members(members, num_workers=num_workers)
+        yield from stream_predictions(model, decoded, class_names, model_type, batch_size)
+        return
+
+    def with_reused(chunk):
+        reused = job.take_reused()
+        if not reused:
+            return chunk
+        return chunk._replace(
+            results=chunk.results + reused, images=list(chunk.images) + [None] * len(reused)
+        )
+
+    if names is None:
+        names = list_zip_images(zip_source)
+    members = job.pending(iter_zip_members(zip_source, job.remaining(names)))
+    decoded = decode_members(members, num_workers=num_workers)
+    for chunk in stream_predictions(model, decoded, class_names, model_type, batch_size):
+        job.record(chunk)
+        yield with_reused(chunk)
+
+    reused = job.take_reused()
+    if reused:
+        yield BatchChunk(reused, [None] * len(reused), [])
+    job.finish()
+
+class ThroughputMeter:
+    """Running images/s and ETA for a batch run"""
+
+    def __init__(self, total, done=0):
+        self.total = total
+        self.done = done
+        self._initial = done
+        self.start = time.perf_counter()
+
+    def update(self, n):
+        """Count n more members (scored, reused or skipped; never beyond total)"""
+        self.done = min(self.done + n, self.total)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def rate(self):
+        """Images per second so far (excluding images done before the start)"""
+        return (self.done - self._initial) / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """Seconds remaining at the current rate (None until known)"""
+        if not self.rate:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+    def summary(self):
+        eta = self.eta
+        eta_text = "--" if eta is None else f"{int(eta // 60)}m {int(eta % 60):02d}s"
+        return f"{self.done}/{self.total} images · {self.rate:.1f} images/s · ETA {eta_text}"
+
+class ResultWriter:
+    """
+    Progressive CSV / Parquet export of batch results
+
+    Rows are appended to spooled temp files as each batch completes
+    (kept in memory up to ``max_memory`` bytes, then spilled to disk),
+    so the export never has to be rebuilt from a DataFrame at the end
+    and a failure part-way keeps everything written so far.
+
+    ``columns`` fixes the exported columns (default: those of the first
+    batch); every batch is aligned to them, so rows missing a column (e.g.
+    "stage" in a cascade export) get an empty value and unknown keys are
+    dropped. ``csv_file`` / ``parquet_file`` take binary file objects to
+    write to instead of temp files (e.g. output files of the CLI).
+    """
+
+    def __init__(self, columns=None, csv=True, parquet=True, max_memory=8 * 1024 * 1024,
+                 csv_file=None, parquet_file=None):
+        def target(enabled, f):
+            if f is not None:
+                return f
+            return tempfile.SpooledTemporaryFile(max_size=max_memory, mode="w+b") if enabled else None
+
+        self.columns = list(columns) if columns is not None else None
+        self.rows_written = 0
+        self._closed = False
+        self._csv_file = target(csv, csv_file)
+        self._parquet_file = target(parquet, parquet_file)
+        self._parquet_writer = None
+
+    def write(self, rows):
+        """Append result rows (list of dicts)"""
+        if self._closed:
+            raise ValueError("ResultWriter is closed (no rows can be written after close() or parquet_bytes())")
+        if not rows:
+            return
+        if self.columns is None:
+            self.columns = list(pd.DataFrame(rows[:1]).columns)
+        df = pd.DataFrame(rows).reindex(columns=self.columns)
+        if self._csv_file is not None:
+            self._csv_file.write(df.to_csv(index=False, header=self.rows_written == 0).encode("utf-8"))
+
+        if self._parquet_file is not None:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet_writer is None:
+                schema = pa.Table.from_pandas(df, preserve_index=False).schema
+                # Columns still empty in the first batch (e.g. "stage") hold strings
+                for column in df.columns[df.isna().all()]:
+                    index = schema.get_field_index(column)
+                    schema = schema.set(index, pa.field(column, pa.string()))
+                self._parquet_writer = pq.ParquetWriter(self._parquet_file, schema)
+            table = pa.Table.from_pandas(df, schema=self._parquet_writer.schema, preserve_index=False)
+            self._parquet_writer.write_table(table)
+
+        self.rows_written += len(rows)
+
+    def close(self):
+        """Finish the Parquet footer (the CSV needs no finalization); no rows can be written afterwards"""
+        self._closed = True
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    @staticmethod
+    def _read_all(f):
+        position = f.tell()
+        f.seek(0)
+        data = f.read()
+        f.seek(position)
+        return data
+
+    def csv_bytes(self):
+        """CSV export (None if disabled)"""
+        if self._csv_file is None:
+            return None
+        return self._read_all(self._csv_file)
+
+    def parquet_bytes(self):
+        """Parquet export (None if disabled or nothing was written)"""
+        if self._parquet_file is None or self.rows_written == 0:
+            return None
+        self.close()
+        return self._read_all(self._parquet_file)
+
+def render_batch_options():
+    """
+    Batch tab checkboxes (Grad-CAM for hits, cascade mode, retry skipped images)
+
+    An invalid POTHOLE_CASCADE only disables cascade mode.
+
+    Returns:
+        BatchOptions
+    """
+    explain_hits = st.checkbox("🔥 Explain all POTHOLE hits (Grad-CAM)")
+
+    # Cheap first stage, low-confidence images escalated (POTHOLE_CASCADE)
+    try:
+        cascade = CascadeModel()
+    except ValueError as e:
+        st.warning(f"⚠️ Cascade mode unavailable (invalid POTHOLE_CASCADE): {e}")
+        use_cascade = st.checkbox("⚡ Cascade mode", value=False, disabled=True)
+    else:
+        use_cascade = st.checkbox(
+            f"⚡ Cascade mode: {' → '.join(cascade.stage_names)}",
+            help=f"Every image is scored by {cascade.stage_names[0]}; only images below the stage's "
+                 f"confidence threshold are escalated to the next model ({cascade.name}, "
+                 f"configured with POTHOLE_CASCADE)."
+        )
+
+    retry_skipped = st.checkbox(
+        "🔁 Retry images skipped by an earlier run",
+        help="Unreadable images are recorded in the job and not decoded again when it resumes."
+    )
+    return BatchOptions(explain_hits, cascade if use_cascade else None, retry_skipped)
+
+def run_batch_analysis(model, model_type, uploaded_zip, image_names, options):
+    """
+    Score an uploaded archive as a resumable job in the batch tab
+
+    Renders the job status, progress, the results table (refreshed while
+    scoring), skipped images and the Grad-CAM overlays of POTHOLE hits,
+    each explained by the model that decided it. Stops the page when
+    nothing could be scored.
+
+    Args:
+        model: Page model (or backend) used when no cascade is selected
+        model_type: Page model name
+        uploaded_zip: Uploaded ZIP file
+        image_names: Image member names (list_zip_images)
+        options: BatchOptions from render_batch_options
+
+    Returns:
+        BatchRun
+    """
+    from .backends import get_model_identity
+    from .gradcam import explain_by_model
+    from .job_store import archive_fingerprint, get_job_store
+
+    cascade = options.cascade
+    # Stored results follow the files the active backends loaded
+    scorer, (job_model, job_mtime) = model, get_model_identity(model, model_type)
+    if cascade is not None:
+        missing = cascade.missing()
+        if missing:
+            st.error(f"Cascade model not found: {', '.join(missing)}")
+            st.stop()
+        scorer, (job_model, job_mtime) = cascade, cascade.identity()
+
+    # Results are persisted per image, so a resubmitted archive resumes
+    job = get_job_store().open_job(
+        archive_fingerprint(uploaded_zip, image_names), job_model,
+        job_mtime, len(image_names), archive_name=uploaded_zip.name,
+        retry_skipped=options.retry_skipped
+    )
+    if job.completed:
+        st.info(f"♻️ Resuming job {job.job_id}: {job.completed} of {len(image_names)} images already processed")
+    else:
+        st.caption(f"Job ID: {job.job_id}")
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    # Results table, filled in as batches complete
+    st.markdown("---")
+    st.markdown("### <i class='fa-solid fa-table'></i> Batch Results", unsafe_allow_html=True)
+    table_placeholder = st.empty()
+
+    results = job.completed_rows()
+    skipped = job.skipped_rows()
+    hit_overlays = []
+    writer = ResultWriter(result_columns(CLASS_NAMES, stage=cascade is not None))
+    writer.write(results)
+    meter = ThroughputMeter(len(image_names), done=job.completed)
+    last_render = 0.0
+    batch_error = None
+
+    try:
+        for chunk in stream_zip_predictions(
+            scorer, uploaded_zip, CLASS_NAMES, model_type=model_type,
+            names=image_names, job=job
+        ):
+            results.extend(chunk.results)
+            skipped.extend(chunk.skipped)
+            writer.write(chunk.results)
+            meter.update(len(chunk.results) + len(chunk.skipped))
+
+            # Grad-CAM for POTHOLE hits while the batch is still decoded
+            hits = [
+                i for i, r in enumerate(chunk.results)
+                if r["prediction"] == "POTHOLE" and chunk.images[i] is not None
+            ]
+            hits = hits[:max(MAX_EXPLAINED_HITS - len(hit_overlays), 0)]
+            if options.explain_hits and hits:
+                # Each hit is explained by the model that decided it (its cascade stage)
+                explained = explain_by_model(
+                    [chunk.images[i] for i in hits],
+                    [chunk.results[i].get("stage") or model_type for i in hits],
+                    pred_indices=[CLASS_NAMES.index("POTHOLE")] * len(hits)
+                )
+                hit_overlays.extend(
+                    (chunk.results[i]["image_name"], overlay, explainer)
+                    for i, (overlay, explainer) in zip(hits, explained)
+                )
+
+            progress_bar.progress(min(meter.done / len(image_names), 1.0))
+            if cascade is not None:
+                escalated = summarize_stages((r.get("stage") for r in results), cascade.stage_names)["escalated"]
+                status_text.caption(f"⏱️ {meter.summary()} · {escalated:.1%} escalated")
+            else:
+                status_text.caption(f"⏱️ {meter.summary()}")
+
+            # Redraw the table at most once per second
+            if meter.elapsed - last_render >= 1.0:
+                table_placeholder.dataframe(pd.DataFrame(results), use_container_width=True)
+                last_render = meter.elapsed
+    except Exception as e:
+        # Keep what was scored so far (table and downloads)
+        batch_error = e
+
+    if batch_error is not None:
+        st.error(f"❌ Batch analysis stopped after {meter.done} images: {batch_error}")
+
+    if skipped:
+        st.warning(f"⚠️ Skipped {len(skipped)} unreadable or oversized images")
+
+    if not results:
+        st.warning("No valid images found in ZIP file")
+        st.stop()
+
+    df_results = pd.DataFrame(results)
+    table_placeholder.dataframe(df_results, use_container_width=True)
+
+    # Grad-CAM for POTHOLE hits
+    if options.explain_hits and hit_overlays:
+        st.markdown("---")
+        st.markdown("### <i class='fa-solid fa-eye'></i> XAI - POTHOLE Hits", unsafe_allow_html=True)
+
+        n_hits = int((df_results["prediction"] == "POTHOLE").sum())
+        if n_hits > len(hit_overlays):
+            st.caption(f"Showing the first {len(hit_overlays)} of {n_hits} POTHOLE hits")
+        if cascade is not None:
+            st.caption("Each overlay is computed by the model that decided the image")
+        cols = st.columns(4)
+        for n, (name, overlay, explainer) in enumerate(hit_overlays):
+            cols[n % 4].image(overlay, caption=f"{name} · Grad-CAM: {explainer}", use_container_width=True)
+
+    return BatchRun(df_results, writer, cascade)
+
+def render_stage_summary(run):
+    """Escalated fraction and images decided per stage (cascade runs only)"""
+    if run.cascade is None or "stage" not in run.results:
+        return
+    summary = summarize_stages(run.results["stage"], run.cascade.stage_names)
+    stage_cols = st.columns(len(run.cascade.stages) + 1)
+    stage_cols[0].metric("Escalated", f"{summary['escalated']:.1%}")
+    for stage_col, (stage_name, count) in zip(stage_cols[1:], summary["counts"].items()):
+        stage_col.metric(f"Decided by {stage_name}", f"{count:,}")
+
+def render_batch_downloads(run, prefix):
+    """CSV / Parquet download buttons (files named after the page, or "cascade")"""
+    prefix = "cascade" if run.cascade is not None else prefix
+    dl_col1, dl_col2 = st.columns(2)
+    with dl_col1:
+        st.download_button(
+            label="📥 Download Results (CSV)",
+            data=run.writer.csv_bytes(),
+            file_name=f"{prefix}_batch_results.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    parquet_data = run.writer.parquet_bytes()
+    if parquet_data is not None:
+        with dl_col2:
+            st.download_button(
+                label="📥 Download Results (Parquet)",
+                data=parquet_data,
+                file_name=f"{prefix}_batch_results.parquet",
+                mime="application/vnd.apache.parquet",
+                use_container_width=True
+            )
@@ -0,0 +1,125 @@
+"""
+BatchNorm folding for sequential models
+Rewrites a trained model into an inference-only graph without Dropout and with BatchNorm folded into its neighbours
+"""
+
+import numpy as np
+from tensorflow import keras
+from tensorflow.keras import layers
+
+class ChannelShift(layers.Layer):
+    """Adds a constant per-channel offset (the part of a BatchNorm that cannot be folded)"""
+
+    def __init__(self, units, **kwargs):
+        super().__init__(**kwargs)
+        self.units = units
+
+    def build(self, input_shape):
+        self.shift = self.add_weight(name="shift", shape=(self.units,), initializer="zeros", trainable=False)
+        super().build(input_shape)
+
+    def call(self, inputs):
+        return inputs + self.shift
+
+    def get_config(self):
+        return {**super().get_config(), "units": self.units}
+
+def _batchnorm_affine(bn):
+    """BatchNorm in inference mode as y = a * x + c"""
+    gamma, beta, mean, variance = bn.get_weights()
+    a = gamma / np.sqrt(variance + bn.epsilon)
+    return a, beta - a * mean
+
+def _fold_shift(layer, weights, shift):
+    """Fold an input offset into a Dense / valid Conv2D bias (exact)"""
+    kernel, bias = weights
+    if isinstance(layer, layers.Dense):
+        return [kernel, bias + shift @ kernel]
+    return [kernel, bias + np.einsum("hwio,i->o", kernel, shift)]
+
+def fold_batchnorm(model):
+    """
+    Build an inference-only copy of a Sequential model
+
+    Dropout is dropped. A BatchNorm after a linear Conv2D / Dense is folded
+    into its weights. A BatchNorm after a ReLU layer (conv -> relu -> BN, as
+    in PureCNN) folds its scale back through the ReLU when every scale is
+    positive; its offset is carried forward through MaxPooling / Flatten
+    into the next Dense or 'valid' Conv2D bias, or kept as a ChannelShift
+    where zero padding makes that inexact. Any other BatchNorm is kept.
+
+    Args:
+        model: Trained keras.Sequential model
+
+    Returns:
+        (folded model, number of BatchNorm layers folded)
+    """
+    if not isinstance(model, keras.Sequential):
+        raise ValueError("Only Sequential models can be folded")
+
+    emitted = []        # [layer class, config, weights]
+    shift = None        # Pending per-channel offset (or tiled per-feature after Flatten)
+    shift_name = None
+    folded = 0
+
+    def flush_shift():
+        nonlocal shift
+        if shift is not None:
+            emitted.append([ChannelShift, {"name": f"{shift_name}_shift", "units": len(shift)}, [shift]])
+            shift = None
+
+    for layer in model.layers:
+        if isinstance(layer, (layers.Dropout, layers.InputLayer)):
+            continue
+
+        if isinstance(layer, layers.BatchNormalization):
+            previous = emitted[-1] if emitted else None
+            a, c = _batchnorm_affine(layer)
+            foldable = (
+                shift is None and previous is not None
+                and previous[0] in (layers.Conv2D, layers.Dense)
+                and previous[1].get("use_bias", True)
+            )
+            activation = previous[1].get("activation") if foldable else None
+            if foldable and activation == "linear":
+                kernel, bias = previous[2]
+                previous[2] = [kernel * a, bias * a + c]
+            elif foldable and activation == "relu" and np.all(a > 0):
+                # a * relu(x) + c == relu(a * x) + c for a > 0
+                kernel, bias = previous[2]
+                previous[2] = [kernel * a, bias * a]
+                shift, shift_name = c, layer.name
+            else:
+                flush_shift()
+                emitted.append([layer.__class__, layer.get_config(), layer.get_weights()])
+                continue
+            folded += 1
+            continue
+
+        config, weights = layer.get_config(), layer.get_weights()
+        if shift is not None:
+            if isinstance(layer, layers.MaxPooling2D):
+                pass            # max(x + c) == max(x) + c
+            elif isinstance(layer, layers.Flatten):
+                spatial = int(np.prod(layer.input_shape[1:-1]))
+                shift = np.tile(shift, spatial)
+            elif isinstance(layer, layers.Dense) or (
+                isinstance(layer, layers.Conv2D) and config.get("padding") == "valid"
+            ):
+                weights = _fold_shift(layer, weights, shift)
+                shift = None
+            else:
+                flush_shift()
+
+        emitted.append([layer.__class__, config, weights])
+
+    flush_shift()
+
+    folded_model = keras.Sequential([keras.Input(model.input_shape[1:])], name=f"{model.name}_folded")
+    for layer_cls, config, weights in emitted:
+        config = {k: v for k, v in config.items() if k not in ("batch_input_shape", "input_shape")}
+        new_layer = layer_cls.from_config(config)
+        folded_model.add(new_layer)
+        if weights:
+            new_layer.set_weights(weights)
+    return folded_model, folded
@@ -0,0 +1,168 @@
+"""
+Confidence-gated model cascade
+Scores every image with a cheap model first and escalates only low-confidence images to the next stage
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from .backends import get_backend, get_model_identity
+from .inference import CONFIDENCE_THRESHOLD, _decode_predictions
+from .model_loader import MODEL_SPECS, check_model_exists
+from .preprocessing import preprocess_batch
+
+# Used when POTHOLE_CASCADE is unset
+DEFAULT_CASCADE = "PureCNN:0.7,ResNet50"
+
+# One stage: the model and the top-class confidence needed to accept its
+# prediction (None on the final stage, which decides everything left)
+CascadeStage = namedtuple("CascadeStage", ["model_name", "threshold"])
+
+def parse_stages(value):
+    """
+    Stages from a "Model[:threshold],..." string
+
+    e.g. "PureCNN:0.7,ResNet50" or "EfficientNet:0.9,ResNet50". Gating
+    stages without a threshold use CONFIDENCE_THRESHOLD; the threshold of
+    the final stage is ignored. Each stage runs on its configured backend
+    (POTHOLE_BACKEND_<MODEL>, e.g. tflite:int8 for a quantized EfficientNet).
+    """
+    entries = [entry.strip() for entry in value.split(",") if entry.strip()]
+    if not entries:
+        raise ValueError("A cascade needs at least one stage")
+
+    stages = []
+    for i, entry in enumerate(entries):
+        name, _, threshold = entry.partition(":")
+        if name not in MODEL_SPECS:
+            raise ValueError(f"Unknown model in cascade: {name} (expected one of {', '.join(MODEL_SPECS)})")
+        if i == len(entries) - 1:
+            stages.append(CascadeStage(name, None))
+        else:
+            stages.append(CascadeStage(name, float(threshold) if threshold else CONFIDENCE_THRESHOLD))
+    return stages
+
+def get_cascade_config():
+    """Configured cascade stages (POTHOLE_CASCADE, else DEFAULT_CASCADE)"""
+    return parse_stages(os.environ.get("POTHOLE_CASCADE") or DEFAULT_CASCADE)
+
+class CascadeModel:
+    """
+    Runs models in order on the images the previous stage was unsure about
+
+    Every image is scored by the first stage. Images whose top-class
+    confidence is below the stage threshold (for two classes, a margin
+    below 2 * threshold - 1) are preprocessed for and scored by the next
+    stage, and so on; the final stage decides whatever is left. Each
+    prediction records the stage that decided it.
+    """
+
+    def __init__(self, stages=None):
+        stages = get_cascade_config() if stages is None else stages
+        self.stages = [stage if isinstance(stage, CascadeStage) else CascadeStage(*stage) for stage in stages]
+        self.stages[-1] = self.stages[-1]._replace(threshold=None)
+
+    @property
+    def name(self):
+        """Identifier of the stage configuration, e.g. "Cascade[PureCNN@0.7>ResNet50]" """
+        parts = [
+            stage.model_name if stage.threshold is None else f"{stage.model_name}@{stage.threshold:g}"
+            for stage in self.stages
+        ]
+        return f"Cascade[{'>'.join(parts)}]"
+
+    @property
+    def stage_names(self):
+        return [stage.model_name for stage in self.stages]
+
+    def missing(self):
+        """Stage models whose files (or configured backend exports) do not exist"""
+        missing = []
+        for name in self.stage_names:
+            try:
+                if check_model_exists(name) and get_backend(name):
+                    continue
+            except (FileNotFoundError, ImportError):
+                pass
+            missing.append(name)
+        return missing
+
+    def identity(self):
+        """
+        Name and mtime keying the cascade's stored results
+
+        Combines the stage configuration with get_model_identity of each
+        stage's active backend, so switching a stage to another backend or
+        variant (POTHOLE_BACKEND_<MODEL>) starts a new job instead of reusing
+        results of the old one.
+
+        Returns:
+            (identity string, latest mtime of the stage files, None if any is missing)
+        """
+        identities = [get_model_identity(get_backend(name), name) for name in self.stage_names]
+        mtimes = [mtime for _, mtime in identities]
+        stages = ";".join(identity for identity, _ in identities)
+        return f"{self.name}{{{stages}}}", None if None in mtimes else max(mtimes)
+
+    def describe(self):
+        return " → ".join(
+            f"{stage.model_name} [{get_backend(stage.model_name).describe()}]"
+            + ("" if stage.threshold is None else f" (< {stage.threshold:.0%} escalates)")
+            for stage in self.stages
+        )
+
+    def predict_images(self, images, class_names, batch_size=32):
+        """
+        Run the cascade over many images
+
+        Args:
+            images: Iterable of PIL images
+            class_names: List of class names
+            batch_size: Number of images per first-stage forward pass
+
+        Yields:
+            (pred_label, pred_conf, preds, stage) for each image, in input
+            order, where stage is the name of the deciding model
+        """
+        images = list(images)
+        for start in range(0, len(images), batch_size):
+            yield from self._predict_batch(images[start:start + batch_size], class_names)
+
+    def _predict_batch(self, images, class_names):
+        probs = np.empty((len(images), len(class_names)), dtype=np.float32)
+        decided_by = np.zeros(len(images), dtype=np.int64)
+        pending = np.arange(len(images))
+
+        for i, stage in enumerate(self.stages):
+            img_batch = preprocess_batch([images[j] for j in pending], stage.model_name)
+            preds = get_backend(stage.model_name).predict(img_batch)
+            if stage.threshold is None:
+                accept = np.ones(len(pending), dtype=bool)
+            else:
+                accept = preds.max(axis=1) >= stage.threshold
+            probs[pending[accept]] = preds[accept]
+            decided_by[pending[accept]] = i
+            pending = pending[~accept]
+            if not len(pending):
+                break
+
+        for preds, i in zip(probs, decided_by):
+            yield (*_decode_predictions(preds, class_names), self.stages[i].model_name)
+
+def summarize_stages(decided_by, stage_names):
+    """
+    Images decided per stage and the fraction escalated past the first stage
+
+    Args:
+        decided_by: Deciding stage name per image (e.g. the "stage" column)
+        stage_names: Stage model names, in cascade order
+
+    Returns:
+        dict with "counts" (stage name -> images) and "escalated" (fraction)
+    """
+    decided_by = list(decided_by)
+    counts = {name: decided_by.count(name) for name in stage_names}
+    escalated = 1 - counts[stage_names[0]] / len(decided_by) if decided_by else 0.0
+    return {"counts": counts, "escalated": escalated}
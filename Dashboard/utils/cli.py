@@ -0,0 +1,215 @@
+"""
+Headless batch inference
+Scores a directory, glob, ZIP archive or manifest file from the command line
+
+Usage (from the Dashboard folder):
+    python -m utils.cli EfficientNet /data/survey.zip -o results.parquet
+    python -m utils.cli PureCNN "frames/**/*.jpg" --batch-size 64 --workers 8
+    python -m utils.cli EfficientNet frames/ --backend tflite --tflite-variant int8 --threads 4
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+from .batch import (
+    IMAGE_EXTENSIONS, ResultWriter, ThroughputMeter,
+    decode_members, iter_zip_members, list_zip_images, result_columns, stream_predictions
+)
+from .decode import BATCH_MAX_SIDE
+from .backends import BACKENDS, get_backend_config
+from .inference import load_inference_model
+from .model_loader import CLASS_NAMES, MODEL_SPECS, check_model_exists, get_model_path
+from .tflite_backend import TFLITE_VARIANTS
+
+MANIFEST_EXTENSIONS = ('.txt', '.lst', '.csv')
+
+def list_directory_images(directory):
+    """Image files under a directory (recursive, sorted)"""
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(paths)
+
+def read_manifest(manifest_path):
+    """
+    Image paths listed in a manifest file
+
+    Plain text manifests have one path per line. CSV manifests use the
+    ``path`` (or ``image``) column, else the first column. Relative paths
+    are resolved against the manifest's folder.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="") as f:
+        if manifest_path.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            column = next(
+                (c for c in ("path", "image", "image_path") if c in (reader.fieldnames or [])),
+                reader.fieldnames[0] if reader.fieldnames else None
+            )
+            entries = [row[column] for row in reader] if column else []
+        else:
+            entries = [line for line in f if not line.lstrip().startswith("#")]
+
+    entries = [e.strip() for e in entries if e and e.strip()]
+    return [e if os.path.isabs(e) else os.path.join(base, e) for e in entries]
+
+def iter_files(paths):
+    """
+    Yield (path, bytes) for image files, one at a time
+
+    A file that cannot be read (e.g. a stale manifest entry) yields its
+    OSError instead of bytes, so it is reported as a skipped row.
+    """
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            data = e
+        yield path, data
+
+def resolve_source(source):
+    """
+    Turn a source argument into (total, members)
+
+    members yields (name, bytes) lazily; source may be a directory, a ZIP
+    archive, a manifest file or a glob pattern.
+    """
+    if os.path.isdir(source):
+        paths = list_directory_images(source)
+    elif source.lower().endswith(".zip") and os.path.isfile(source):
+        names = list_zip_images(source)
+        return len(names), iter_zip_members(source, names)
+    elif source.lower().endswith(MANIFEST_EXTENSIONS) and os.path.isfile(source):
+        paths = read_manifest(source)
+    elif os.path.isfile(source):
+        paths = [source]
+    else:
+        paths = sorted(
+            p for p in glob.glob(source, recursive=True) if p.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    return len(paths), iter_files(paths)
+
+def open_writer(output):
+    """ResultWriter streaming straight into the output file (CSV or Parquet)"""
+    columns = result_columns(CLASS_NAMES) + ["path"]
+    f = open(output, "wb")
+    if output.lower().endswith(".parquet"):
+        return f, ResultWriter(columns, csv=False, parquet_file=f)
+    return f, ResultWriter(columns, parquet=False, csv_file=f)
+
+def format_summary(meter, batch_seconds, batch_sizes, skipped, load_seconds):
+    """Throughput and latency summary printed at the end of a run"""
+    lines = [
+        f"Images scored:   {sum(batch_sizes)} ({len(skipped)} skipped)",
+        f"Model load:      {load_seconds:.2f} s",
+        f"Wall time:       {meter.elapsed:.2f} s",
+        f"Throughput:      {meter.rate:.1f} images/s"
+    ]
+    if batch_seconds:
+        batch_ms = 1000 * np.asarray(batch_seconds)
+        per_image_ms = batch_ms / np.maximum(np.asarray(batch_sizes), 1)
+        lines += [
+            f"Batch latency:   p50 {np.percentile(batch_ms, 50):.1f} ms · "
+            f"p95 {np.percentile(batch_ms, 95):.1f} ms · max {batch_ms.max():.1f} ms",
+            f"Per image:       mean {per_image_ms.mean():.2f} ms · p95 {np.percentile(per_image_ms, 95):.2f} ms"
+        ]
+    return "\n".join(lines)
+
+def run(model_name, source, output, batch_size=32, num_workers=4, max_side=BATCH_MAX_SIDE, quiet=False,
+        backend=None, variant=None, num_threads=None):
+    """
+    Score every image in ``source`` and write results to ``output``
+
+    Returns:
+        Number of images scored
+    """
+    if backend is None:
+        backend, configured_variant = get_backend_config(model_name)
+        variant = variant or configured_variant
+    if backend == "keras" and not check_model_exists(model_name):
+        raise FileNotFoundError(f"Model not found: {get_model_path(model_name)}")
+
+    total, members = resolve_source(source)
+    if total == 0:
+        raise ValueError(f"No images found in {source}")
+
+    start = time.perf_counter()
+    model = load_inference_model(model_name, backend, variant, num_threads)
+    load_seconds = time.perf_counter() - start
+
+    meter = ThroughputMeter(total)
+    batch_seconds, batch_sizes, skipped = [], [], []
+    decoded = decode_members(members, num_workers=num_workers, max_side=max_side)
+
+    f, writer = open_writer(output)
+    try:
+        for chunk in stream_predictions(model, decoded, CLASS_NAMES, model_name, batch_size):
+            for name, row in zip(chunk.names, chunk.results):
+                row["path"] = name
+            writer.write(chunk.results)
+            skipped.extend(chunk.skipped)
+            if chunk.results:
+                batch_seconds.append(chunk.seconds)
+                batch_sizes.append(len(chunk.results))
+            meter.update(len(chunk.results) + len(chunk.skipped))
+            if not quiet:
+                print(f"\r{meter.summary()}", end="", file=sys.stderr, flush=True)
+    finally:
+        writer.close()
+        f.close()
+        if not quiet:
+            print(file=sys.stderr)
+
+    for message in skipped:
+        print(f"⚠️ Skipped {message}", file=sys.stderr)
+
+    print("=" * 60)
+    print(f"{model_name} [{model.describe()}] batch inference → {output}")
+    print("=" * 60)
+    print(format_summary(meter, batch_seconds, batch_sizes, skipped, load_seconds))
+    return sum(batch_sizes)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.cli",
+        description="Headless pothole detection over a directory, glob, ZIP archive or manifest file"
+    )
+    parser.add_argument("model", choices=list(MODEL_SPECS), help="Model to run")
+    parser.add_argument("source", help="Directory, glob pattern, .zip archive or manifest (.txt/.lst/.csv)")
+    parser.add_argument("-o", "--output", default="batch_results.csv",
+                        help="Output file; .parquet writes Parquet, anything else CSV (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per forward pass (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4, help="Decode threads (default: %(default)s)")
+    parser.add_argument("--max-side", type=int, default=BATCH_MAX_SIDE,
+                        help="Longest side images are decoded at (default: %(default)s)")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=None,
+                        help="Inference backend (default: the model's configured backend)")
+    parser.add_argument("--tflite-variant", choices=TFLITE_VARIANTS, default=None,
+                        help="Exported TFLite variant for --backend tflite (default: int8)")
+    parser.add_argument("--threads", type=int, default=None, help="TFLite / ONNX Runtime threads")
+    parser.add_argument("-q", "--quiet", action="store_true", help="No progress line")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        scored = run(
+            args.model, args.source, args.output,
+            batch_size=args.batch_size, num_workers=args.workers,
+            max_side=args.max_side, quiet=args.quiet, backend=args.backend,
+            variant=args.tflite_variant, num_threads=args.threads
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0 if scored else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Image decoding for uploads
+Decodes large JPEGs at reduced resolution and guards against decompression bombs
+"""
+
+import warnings
+
+from PIL import Image
+
+# Largest image accepted (pixels); dashcam stills are ~12MP
+MAX_IMAGE_PIXELS = 64_000_000
+
+# Longest side of the decoded copy kept for display, stats and overlays
+DISPLAY_MAX_SIDE = 1280
+
+# Longest side for batch analysis, where only the model input and small
+# thumbnails are needed
+BATCH_MAX_SIDE = 448
+
+def decode_image(source, max_side=DISPLAY_MAX_SIDE, max_pixels=MAX_IMAGE_PIXELS):
+    """
+    Decode an uploaded image into a bounded-size RGB copy
+
+    Only the header is read before the size check. JPEGs are then decoded
+    with PIL draft mode, which downscales by 1/2, 1/4 or 1/8 in the DCT
+    domain, so a 12MP still never exists at full resolution in memory.
+    The result is thumbnailed to ``max_side`` and the original size is
+    kept in ``image.info["original_size"]``.
+
+    Args:
+        source: File path or file-like object
+        max_side: Longest side of the returned image
+        max_pixels: Reject images with more pixels than this
+
+    Returns:
+        PIL Image (RGB, longest side <= max_side)
+
+    Raises:
+        ValueError: If the file is not an image or is too large
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            img = Image.open(source)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ValueError(f"Image too large: {e}")
+    except OSError as e:
+        raise ValueError(f"Cannot decode image: {e}")
+
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ValueError(
+            f"Image too large: {width}x{height} exceeds the {max_pixels:,} pixel limit"
+        )
+
+    image_format = img.format
+    scale = max_side / max(width, height)
+    if scale < 1 and image_format == "JPEG":
+        # Pick the smallest DCT scale that still covers max_side
+        img.draft("RGB", (max(int(width * scale), 1), max(int(height * scale), 1)))
+
+    try:
+        img = img.convert("RGB")
+        img.thumbnail((max_side, max_side))
+    except OSError as e:
+        raise ValueError(f"Cannot decode image: {e}")
+
+    img.format = image_format
+    img.info["original_size"] = (width, height)
+    return img
@@ -7,69 +7,180 @@ import numpy as np
 import cv2
 import tensorflow as tf
 from tensorflow.keras.models import Model
+from .model_loader import cached_for_model
+from .backends import InferenceBackend, as_keras_model, get_model_identity
+from .result_cache import ResultCache, get_result_cache
+from .image_context import as_image_context
 
-def make_gradcam_heatmap(img_array, model, last_conv_layer_name, pred_index=None):
+def find_conv_layer(model, last_conv_layer_name):
     """
-    Generate Grad-CAM heatmap
+    Resolve the Grad-CAM target layer
+    
+    Looks the layer up by name, including inside nested base models
+    (e.g. the ResNet50/EfficientNet backbone of a transfer learning model),
+    and falls back to the last layer with 'conv' in its name.
+    
+    Returns:
+        owner: Model that directly contains the layer
+        layer: The resolved layer
+    """
+    def search(container):
+        for layer in reversed(container.layers):
+            if layer.name == last_conv_layer_name:
+                return container, layer
+            if isinstance(layer, Model):
+                found = search(layer)
+                if found is not None:
+                    return found
+        return None
+    
+    def search_conv(container):
+        for layer in reversed(container.layers):
+            if isinstance(layer, Model):
+                found = search_conv(layer)
+                if found is not None:
+                    return found
+            elif 'conv' in layer.name.lower():
+                return container, layer
+        return None
+    
+    found = search(model) or search_conv(model)
+    if found is None:
+        raise ValueError(f"No convolutional layer found in model")
+    return found
+
+def build_gradcam_model(model, last_conv_layer_name):
+    """
+    Build model mapping input to (last conv activations, predictions)
     
     Args:
-        img_array: Preprocessed image array
         model: Trained model
         last_conv_layer_name: Name of last conv layer
-        pred_index: Class index (None = use predicted class)
     
     Returns:
-        heatmap: Numpy array of heatmap
+        grad_model: Keras model with two outputs
     """
-    # Get the last convolutional layer
-    try:
-        last_conv_layer = model.get_layer(last_conv_layer_name)
-    except:
-        # Try to find the last conv layer automatically
-        for layer in reversed(model.layers):
-            if 'conv' in layer.name.lower():
-                last_conv_layer = layer
-                break
-        else:
-            raise ValueError(f"No convolutional layer found in model")
+    owner, last_conv_layer = find_conv_layer(model, last_conv_layer_name)
+    
+    if owner is model:
+        return Model(
+            inputs=[model.input],
+            outputs=[last_conv_layer.output, model.output]
+        )
     
-    # Create gradient model
-    grad_model = Model(
-        inputs=[model.input],
-        outputs=[last_conv_layer.output, model.output]
+    # Layer lives inside a nested base model: expose it from the base,
+    # then replay the top layers on the base output
+    base_grad_model = Model(
+        inputs=owner.inputs,
+        outputs=[last_conv_layer.output, owner.output]
     )
+    inputs = tf.keras.Input(shape=model.input_shape[1:])
+    x = inputs
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.InputLayer):
+            continue
+        if layer is owner:
+            conv_outputs, x = base_grad_model(x)
+        else:
+            x = layer(x)
+    return Model(inputs=inputs, outputs=[conv_outputs, x])
+
+def get_gradcam_fn(model, last_conv_layer_name):
+    """
+    Get compiled Grad-CAM step (cached per model and layer name)
     
-    # Compute gradient
-    with tf.GradientTape() as tape:
-        conv_outputs, predictions = grad_model(img_array)
+    The gradient model and the tf.function wrapping the gradient step are
+    built once per (model, layer name) and kept with the loaded model.
+    The step takes an (N, h, w, 3) float32 batch at the model's input size and N int32 class
+    indices (-1 = use predicted class) and returns the class probabilities
+    and the N normalized heatmaps from a single taped forward pass.
+    Non-Keras backends resolve to the Keras model of the same weights.
+    """
+    model = as_keras_model(model)
+    
+    def build():
+        grad_model = build_gradcam_model(model, last_conv_layer_name)
         
-        if pred_index is None:
-            pred_index = tf.argmax(predictions[0])
+        @tf.function(input_signature=[
+            tf.TensorSpec((None, *model.input_shape[1:]), tf.float32),
+            tf.TensorSpec((None,), tf.int32)
+        ])
+        def gradcam_step(img_batch, pred_indices):
+            with tf.GradientTape() as tape:
+                # Frozen backbones have no trainable weights to record from
+                tape.watch(img_batch)
+                conv_outputs, predictions = grad_model(img_batch, training=False)
+                
+                pred_indices = tf.where(
+                    pred_indices < 0,
+                    tf.argmax(predictions, axis=1, output_type=tf.int32),
+                    pred_indices
+                )
+                class_channel = tf.gather(predictions, pred_indices, axis=1, batch_dims=1)
+            
+            # Compute gradients (images are independent, so one backward
+            # pass over the summed scores gives every per-image gradient)
+            grads = tape.gradient(class_channel, conv_outputs)
+            
+            # Global average pooling per image
+            pooled_grads = tf.reduce_mean(grads, axis=(1, 2))
+            
+            # Weight the channels
+            heatmaps = tf.einsum("nhwc,nc->nhw", conv_outputs, pooled_grads)
+            
+            # Normalize each heatmap
+            heatmaps = tf.maximum(heatmaps, 0)
+            heatmaps = heatmaps / (tf.reduce_max(heatmaps, axis=(1, 2), keepdims=True) + 1e-8)
+            
+            return predictions, heatmaps
         
-        class_channel = predictions[:, pred_index]
+        return gradcam_step
     
-    # Compute gradients
-    grads = tape.gradient(class_channel, conv_outputs)
+    return cached_for_model(model, ("gradcam", last_conv_layer_name), build)
+
+def make_gradcam_heatmap(img_array, model, last_conv_layer_name, pred_index=None):
+    """
+    Generate Grad-CAM heatmap
     
-    # Global average pooling
-    pooled_grads = tf.reduce_mean(grads, axis=(0, 1, 2))
+    Args:
+        img_array: Preprocessed image array
+        model: Trained model
+        last_conv_layer_name: Name of last conv layer
+        pred_index: Class index (None = use predicted class)
     
-    # Weight the channels
-    conv_outputs = conv_outputs[0]
-    heatmap = conv_outputs @ pooled_grads[..., tf.newaxis]
-    heatmap = tf.squeeze(heatmap)
+    Returns:
+        heatmap: Numpy array of heatmap
+    """
+    pred_indices = None if pred_index is None else [pred_index]
+    return make_gradcam_heatmaps(img_array, model, last_conv_layer_name, pred_indices)[0]
+
+def make_gradcam_heatmaps(img_batch, model, last_conv_layer_name, pred_indices=None):
+    """
+    Generate Grad-CAM heatmaps for a batch of images
+    
+    Args:
+        img_batch: Preprocessed (N, h, w, 3) image batch
+        model: Trained model
+        last_conv_layer_name: Name of last conv layer
+        pred_indices: Class index per image (None = use predicted classes)
     
-    # Normalize
-    heatmap = tf.maximum(heatmap, 0) / (tf.reduce_max(heatmap) + 1e-8)
+    Returns:
+        heatmaps: Numpy array of shape (N, h, w)
+    """
+    gradcam_step = get_gradcam_fn(model, last_conv_layer_name)
+    img_batch = np.asarray(img_batch, dtype=np.float32)
+    if pred_indices is None:
+        pred_indices = np.full(len(img_batch), -1, dtype=np.int32)
     
-    return heatmap.numpy()
+    _, heatmaps = gradcam_step(img_batch, np.asarray(pred_indices, dtype=np.int32))
+    return heatmaps.numpy()
 
-def generate_gradcam_overlay(pil_image, heatmap, alpha=0.4):
+def generate_gradcam_overlay(image, heatmap, alpha=0.4):
     """
     Generate Grad-CAM overlay on original image
     
     Args:
-        pil_image: Original PIL image
+        image: Original PIL image or ImageContext
         heatmap: Grad-CAM heatmap
         alpha: Overlay transparency
     
@@ -77,8 +188,8 @@ def generate_gradcam_overlay(pil_image, heatmap, alpha=0.4):
         heatmap_img: Colored heatmap
         overlay: Overlay image
     """
-    # Convert PIL to numpy
-    img = np.array(pil_image.convert("RGB"))
+    # RGB array (memoized on the context)
+    img = as_image_context(image).rgb
     
     # Resize heatmap to match image
     heatmap_resized = cv2.resize(heatmap, (img.shape[1], img.shape[0]))
@@ -93,17 +204,123 @@ def generate_gradcam_overlay(pil_image, heatmap, alpha=0.4):
     
     return heatmap_resized, overlay
 
-def predict_with_gradcam(model, pil_image, class_names, last_conv_layer, 
-                         model_type="PureCNN"):
+def generate_gradcam_overlays(pil_images, heatmaps, alpha=0.4, size=None):
+    """
+    Generate Grad-CAM overlays for a batch of images
+    
+    Args:
+        pil_images: List of original PIL images
+        heatmaps: Grad-CAM heatmaps, one per image
+        alpha: Overlay transparency
+        size: Optional (width, height) to resize every image to; lets the
+              colormap and blending run once over the whole batch
+    
+    Returns:
+        heatmap_imgs: Colored heatmaps
+        overlays: Overlay images
+    """
+    if size is None:
+        results = [generate_gradcam_overlay(img, hm, alpha) for img, hm in zip(pil_images, heatmaps)]
+        return [r[0] for r in results], [r[1] for r in results]
+    
+    width, height = size
+    imgs = np.stack([np.array(img.convert("RGB").resize(size)) for img in pil_images])
+    heatmaps_resized = np.stack([cv2.resize(hm, size) for hm in heatmaps])
+    heatmaps_resized = np.uint8(255 * heatmaps_resized)
+    
+    # Apply colormap to all heatmaps at once (stacked vertically)
+    heatmap_color = cv2.applyColorMap(heatmaps_resized.reshape(-1, width), cv2.COLORMAP_JET)
+    heatmap_color = cv2.cvtColor(heatmap_color, cv2.COLOR_BGR2RGB).reshape(imgs.shape)
+    
+    # Create overlays
+    overlays = alpha * heatmap_color.astype(np.float32) + (1 - alpha) * imgs.astype(np.float32)
+    overlays = np.clip(np.rint(overlays), 0, 255).astype(np.uint8)
+    
+    return list(heatmaps_resized), list(overlays)
+
+def explain_images(model, images, last_conv_layer, model_type="PureCNN",
+                   pred_indices=None, batch_size=16, size=None):
+    """
+    Batched Grad-CAM overlays for many images
+    
+    Args:
+        model: Trained model
+        images: List of PIL images
+        last_conv_layer: Name of last conv layer
+        model_type: Type of model for preprocessing
+        pred_indices: Class index per image (None = use predicted classes)
+        batch_size: Number of images per taped forward/backward pass
+        size: (width, height) of the returned overlays (None = the model's input size)
+    
+    Yields:
+        overlay for each image, in input order
+    """
+    from .preprocessing import get_target_size, preprocess_batch
+    
+    size = size or get_target_size(model_type)
+    for start in range(0, len(images), batch_size):
+        chunk = images[start:start + batch_size]
+        img_batch = preprocess_batch(chunk, model_type)
+        chunk_indices = None if pred_indices is None else pred_indices[start:start + batch_size]
+        
+        heatmaps = make_gradcam_heatmaps(img_batch, model, last_conv_layer, chunk_indices)
+        _, overlays = generate_gradcam_overlays(chunk, heatmaps, size=size)
+        yield from overlays
+
+def explain_by_model(images, model_names, pred_indices=None, batch_size=16):
+    """
+    Batched Grad-CAM overlays, each image explained by its own model
+
+    Used for cascade results, where the deciding model (the "stage" column)
+    differs per image: images are grouped per model and explained with that
+    model's weights and Grad-CAM layer.
+
+    Args:
+        images: List of PIL images
+        model_names: Model name per image (e.g. the "stage" of each row)
+        pred_indices: Class index per image (None = use predicted classes)
+        batch_size: Number of images per taped forward/backward pass
+
+    Returns:
+        List of (overlay, model name), in input order
+    """
+    from .model_loader import get_model_info, load_model_file
+
+    explained = [None] * len(images)
+    for name in dict.fromkeys(model_names):
+        idx = [i for i, n in enumerate(model_names) if n == name]
+        model = load_model_file(name)
+        if model is None:
+            raise FileNotFoundError(f"Model not found: {name}")
+        overlays = explain_images(
+            model, [images[i] for i in idx],
+            last_conv_layer=get_model_info(name)["last_conv_layer"],
+            model_type=name,
+            pred_indices=None if pred_indices is None else [pred_indices[i] for i in idx],
+            batch_size=batch_size
+        )
+        for i, overlay in zip(idx, overlays):
+            explained[i] = (overlay, name)
+    return explained
+
+def predict_with_gradcam(model, image, class_names, last_conv_layer, 
+                         model_type="PureCNN", gradcam=True, image_bytes=None):
     """
     Combined prediction + Grad-CAM generation
     
+    Probabilities, conv activations and gradients all come from one taped
+    forward pass, so the network only runs once per image. When the raw
+    upload bytes are known, results are served from the shared result cache.
+    
     Args:
         model: Trained model
-        pil_image: PIL Image
+        image: PIL Image or ImageContext
         class_names: List of class names
         last_conv_layer: Name of last conv layer
         model_type: Type of model for preprocessing
+        gradcam: If False, skip the tape and return None for heatmap/overlay
+        image_bytes: Raw uploaded file bytes, used as the cache key
+                     (defaults to the ImageContext's bytes)
     
     Returns:
         pred_label: Predicted class
@@ -112,33 +329,67 @@ def predict_with_gradcam(model, pil_image, class_names, last_conv_layer,
         heatmap: Grad-CAM heatmap
         overlay: Overlay image
     """
-    from .inference import (preprocess_image_purecnn, 
-                           preprocess_image_resnet, 
-                           preprocess_image_efficientnet)
+    context = as_image_context(image)
+    if image_bytes is None:
+        image_bytes = context.image_bytes
+    
+    cache, cache_key = None, None
+    if gradcam and image_bytes is not None:
+        cache = get_result_cache()
+        cache_key = ResultCache.make_key(image_bytes, *get_model_identity(model, model_type))
+        entry = cache.get(cache_key)
+        if entry is not None:
+            preds, heatmap, overlay = entry["preds"], entry["heatmap"], entry["overlay"]
+            pred_idx = np.argmax(preds)
+            return class_names[pred_idx], preds[pred_idx], preds, heatmap, overlay
+    
+    preds, heatmap, overlay, ok = _predict_with_gradcam(
+        model, context, last_conv_layer, model_type, gradcam
+    )
+    
+    if cache is not None and ok:
+        cache.put(cache_key, {"preds": preds, "heatmap": heatmap, "overlay": overlay})
     
-    # Preprocess based on model type
-    if model_type == "PureCNN":
-        img_array = preprocess_image_purecnn(pil_image)
-    elif model_type == "ResNet50":
-        img_array = preprocess_image_resnet(pil_image)
-    else:
-        img_array = preprocess_image_efficientnet(pil_image)
-    
-    # Predict
-    preds = model.predict(img_array, verbose=0)[0]
     pred_idx = np.argmax(preds)
     pred_label = class_names[pred_idx]
     pred_conf = preds[pred_idx]
     
-    # Generate Grad-CAM
+    return pred_label, pred_conf, preds, heatmap, overlay
+
+def _predict_with_gradcam(model, context, last_conv_layer, model_type, gradcam):
+    """Uncached prediction + Grad-CAM, returns (preds, heatmap, overlay, ok)"""
+    from .inference import run_inference
+    
+    # Preprocess based on model type
+    img_array = context.model_input(model_type)
+    
+    if not gradcam:
+        preds = run_inference(model, img_array)[0]
+        return preds, None, None, True
+    
+    # Backends without gradients predict themselves; the Keras model only
+    # explains their predicted class
+    backend_preds = None
+    if isinstance(model, InferenceBackend) and not model.supports_gradcam:
+        backend_preds = run_inference(model, img_array)[0]
+    
+    # Predict + Grad-CAM in one pass
     try:
-        heatmap = make_gradcam_heatmap(img_array, model, last_conv_layer, pred_index=pred_idx)
-        heatmap_img, overlay = generate_gradcam_overlay(pil_image, heatmap)
+        gradcam_step = get_gradcam_fn(model, last_conv_layer)
+        pred_index = -1 if backend_preds is None else int(np.argmax(backend_preds))
+        preds, heatmaps = gradcam_step(
+            np.asarray(img_array, dtype=np.float32),
+            np.array([pred_index], dtype=np.int32)
+        )
+        preds, heatmap = preds.numpy()[0], heatmaps.numpy()[0]
+        if backend_preds is not None:
+            preds = backend_preds
+        heatmap_img, overlay = generate_gradcam_overlay(context, heatmap)
+        return preds, heatmap, overlay, True
     except Exception as e:
         print(f"Grad-CAM generation failed: {e}")
         # Return dummy heatmap if fails
+        preds = run_inference(model, img_array)[0] if backend_preds is None else backend_preds
         heatmap = np.zeros((7, 7))
-        heatmap_img = np.zeros((224, 224))
-        overlay = np.array(pil_image.convert("RGB"))
-    
-    return pred_label, pred_conf, preds, heatmap, overlay
\ No newline at end of file
+        overlay = np.array(context.rgb)
+        return preds, heatmap, overlay, False
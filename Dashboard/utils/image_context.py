@@ -0,0 +1,96 @@
+"""
+Per-upload image context
+Decodes an upload once and memoizes every derived array
+"""
+
+from functools import cached_property
+from io import BytesIO
+
+import numpy as np
+
+from .decode import decode_image, DISPLAY_MAX_SIDE
+
+class ImageContext:
+    """
+    Decoded image shared by stats, preprocessing, prediction and overlays
+
+    The RGB array, the model input per preprocessing family, display
+    thumbnails and the image stats are computed on first use and reused,
+    so one upload is never converted twice.
+    """
+
+    def __init__(self, image, image_bytes=None):
+        self.image = image if image.mode == "RGB" else image.convert("RGB")
+        self.image_bytes = image_bytes
+        self.format = image.format
+        self.original_size = image.info.get("original_size", image.size)
+        self._model_inputs = {}
+        self._thumbnails = {}
+
+    @classmethod
+    def from_upload(cls, uploaded_file, max_side=DISPLAY_MAX_SIDE):
+        """
+        Decode an uploaded file (Streamlit UploadedFile, bytes or file object)
+
+        Raises:
+            ValueError: If the file is not an image or is too large
+        """
+        if isinstance(uploaded_file, bytes):
+            data = uploaded_file
+        elif hasattr(uploaded_file, "getvalue"):
+            data = uploaded_file.getvalue()
+        else:
+            data = uploaded_file.read()
+        return cls(decode_image(BytesIO(data), max_side=max_side), image_bytes=data)
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @cached_property
+    def rgb(self):
+        """uint8 (h, w, 3) array of the decoded image (read-only)"""
+        array = np.asarray(self.image)
+        array.flags.writeable = False
+        return array
+
+    def model_input(self, model_type, target_size=None):
+        """Preprocessed (1, h, w, 3) float32 model input for a model family"""
+        from .preprocessing import get_target_size, preprocess_batch
+
+        target_size = target_size or get_target_size(model_type)
+        key = (model_type, tuple(target_size))
+        if key not in self._model_inputs:
+            self._model_inputs[key] = preprocess_batch([self.image], model_type, target_size)
+        return self._model_inputs[key]
+
+    def thumbnail(self, max_side=512):
+        """Display thumbnail with the given longest side"""
+        if max_side not in self._thumbnails:
+            thumb = self.image.copy()
+            thumb.thumbnail((max_side, max_side))
+            self._thumbnails[max_side] = thumb
+        return self._thumbnails[max_side]
+
+    @cached_property
+    def stats(self):
+        """Image statistics for EDA"""
+        img_array = self.rgb
+        width, height = self.original_size
+
+        return {
+            "width": width,
+            "height": height,
+            "channels": img_array.shape[2] if len(img_array.shape) == 3 else 1,
+            "mean_brightness": float(np.mean(img_array)),
+            "std_brightness": float(np.std(img_array)),
+            "min_pixel": int(np.min(img_array)),
+            "max_pixel": int(np.max(img_array)),
+            "format": self.format if self.format else "Unknown"
+        }
+
+def as_image_context(image):
+    """Wrap a PIL image in an ImageContext (contexts pass through)"""
+    if isinstance(image, ImageContext):
+        return image
+    return ImageContext(image)
@@ -3,72 +3,117 @@ Inference utilities for predictions
 Handles image preprocessing and predictions
 """
 
+from functools import partial
 import numpy as np
-import cv2
 from PIL import Image
-from tensorflow.keras.applications.resnet50 import preprocess_input as resnet_preprocess
-from tensorflow.keras.applications.efficientnet import preprocess_input as efficient_preprocess
+from .model_loader import get_inference_fn, load_model_file
+from .preprocessing import get_preprocessor, get_target_size, preprocess_batch
+from .image_context import as_image_context
+from .backends import InferenceBackend, get_backend
 
-def preprocess_image_purecnn(pil_image, target_size=(224, 224)):
+# Confidence below this is flagged as unreliable (and escalated by the cascade)
+CONFIDENCE_THRESHOLD = 0.7
+
+def preprocess_image(pil_image, model_type, target_size=None):
+    """Preprocess single image into a (1, h, w, 3) float32 batch (None = the model's input size)"""
+    return preprocess_batch([pil_image], model_type, target_size)
+
+def preprocess_image_purecnn(pil_image, target_size=None):
     """Preprocess for PureCNN - simple normalization"""
-    img = pil_image.convert("RGB")
-    img = img.resize(target_size)
-    img_array = np.array(img) / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
-    return img_array
+    return preprocess_image(pil_image, "PureCNN", target_size)
 
-def preprocess_image_resnet(pil_image, target_size=(224, 224)):
+def preprocess_image_resnet(pil_image, target_size=None):
     """Preprocess for ResNet50"""
-    img = pil_image.convert("RGB")
-    img = img.resize(target_size)
-    img_array = np.array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = resnet_preprocess(img_array)
-    return img_array
-
-def preprocess_image_efficientnet(pil_image, target_size=(224, 224)):
+    return preprocess_image(pil_image, "ResNet50", target_size)
+
+def preprocess_image_efficientnet(pil_image, target_size=None):
     """Preprocess for EfficientNet"""
-    img = pil_image.convert("RGB")
-    img = img.resize(target_size)
-    img_array = np.array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = efficient_preprocess(img_array)
-    return img_array
-
-def predict_image(model, pil_image, class_names, model_type="PureCNN"):
-    """Run prediction on single image"""
-    # Choose preprocessing based on model type
-    if model_type == "PureCNN":
-        img_array = preprocess_image_purecnn(pil_image)
-    elif model_type == "ResNet50":
-        img_array = preprocess_image_resnet(pil_image)
-    else:  # EfficientNet
-        img_array = preprocess_image_efficientnet(pil_image)
+    return preprocess_image(pil_image, "EfficientNet", target_size)
+
+def get_preprocess_fn(model_type):
+    """Get single-image preprocessing function for model type"""
+    get_preprocessor(model_type)
+    return partial(preprocess_image, model_type=model_type)
+
+def load_inference_model(model_name, backend=None, variant=None, num_threads=None):
+    """
+    Load a model for an inference backend
     
-    # Predict
-    preds = model.predict(img_array, verbose=0)[0]
+    Args:
+        model_name: Registered model name
+        backend: "keras", "tflite" or "onnx" (None = configured backend)
+        variant: Backend variant, e.g. TFLite "dynamic" / "float16" / "int8"
+        num_threads: Runtime threads (None = runtime default)
+    
+    Returns:
+        InferenceBackend usable with run_inference / predict_image / predict_images
+    """
+    return get_backend(model_name, backend, variant, num_threads)
+
+def run_inference(model, img_array):
+    """Run compiled forward pass on a preprocessed (N, h, w, 3) batch"""
+    img_batch = np.asarray(img_array, dtype=np.float32)
+    if isinstance(model, InferenceBackend):
+        return model.predict(img_batch)
+    return get_inference_fn(model)(img_batch).numpy()
+
+def _decode_predictions(preds, class_names):
+    """Turn a probability vector into (label, confidence, probabilities)"""
     pred_idx = np.argmax(preds)
     pred_label = class_names[pred_idx]
     pred_conf = preds[pred_idx]
-    
     return pred_label, pred_conf, preds
 
-def compute_image_stats(pil_image):
-    """Compute image statistics for EDA"""
-    img_array = np.array(pil_image.convert("RGB"))
+def predict_image(model, image, class_names, model_type="PureCNN"):
+    """Run prediction on single image (PIL image or ImageContext)"""
+    # Preprocessing for the model type (memoized on the context)
+    img_array = as_image_context(image).model_input(model_type)
+    
+    # Predict
+    preds = run_inference(model, img_array)[0]
+    return _decode_predictions(preds, class_names)
+
+def predict_images(model, images, class_names, model_type="PureCNN", batch_size=32):
+    """
+    Run batched prediction on many images
+    
+    Images are preprocessed and stacked into chunks of ``batch_size`` so
+    each chunk costs a single forward pass instead of one per image.
     
-    stats = {
-        "width": pil_image.size[0],
-        "height": pil_image.size[1],
-        "channels": img_array.shape[2] if len(img_array.shape) == 3 else 1,
-        "mean_brightness": float(np.mean(img_array)),
-        "std_brightness": float(np.std(img_array)),
-        "min_pixel": int(np.min(img_array)),
-        "max_pixel": int(np.max(img_array)),
-        "format": pil_image.format if pil_image.format else "Unknown"
-    }
+    Args:
+        model: Trained model
+        images: Iterable of PIL images
+        class_names: List of class names
+        model_type: Type of model for preprocessing
+        batch_size: Number of images per forward pass
     
-    return stats
+    Yields:
+        (pred_label, pred_conf, preds) for each image, in input order
+    """
+    get_preprocessor(model_type)
+    width, height = get_target_size(model_type)
+    buffer = np.empty((batch_size, height, width, 3), dtype=np.float32)
+    batch = []
+    
+    for pil_image in images:
+        batch.append(pil_image)
+        if len(batch) == batch_size:
+            yield from _predict_batch(model, batch, class_names, model_type, buffer)
+            batch = []
+    
+    if batch:
+        yield from _predict_batch(model, batch, class_names, model_type, buffer)
+
+def _predict_batch(model, batch, class_names, model_type, buffer):
+    """Preprocess a list of images into buffer and run one forward pass"""
+    img_batch = preprocess_batch(batch, model_type, out=buffer)
+    preds_batch = run_inference(model, img_batch)
+    for preds in preds_batch:
+        yield _decode_predictions(preds, class_names)
+
+def compute_image_stats(image):
+    """Compute image statistics for EDA (PIL image or ImageContext)"""
+    return as_image_context(image).stats
 
 def generate_interpretation(pred_label, pred_conf, model_name):
     """Generate text interpretation of prediction"""
@@ -109,7 +154,7 @@ The **{model_name}** model has classified this as **NO POTHOLE** with **{pred_co
 """
     
     # Add confidence warning if low
-    if pred_conf < 0.7:
+    if pred_conf < CONFIDENCE_THRESHOLD:
         base_text += f"""
 
 <i class="fa-solid fa-exclamation-circle"></i> **Note:** The model's confidence is relatively low ({pred_conf:.1%}). 
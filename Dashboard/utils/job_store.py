@@ -0,0 +1,287 @@
+"""
+Resumable batch jobs
+Persists per-image batch results to SQLite so interrupted runs continue where they stopped
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+
+import streamlit as st
+
+from .model_loader import BASE_DIR
+
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, "batch_jobs.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    archive_name TEXT,
+    model_name TEXT NOT NULL,
+    model_mtime INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    job_id TEXT NOT NULL,
+    member_name TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    model_mtime INTEGER NOT NULL,
+    prediction TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    probabilities TEXT NOT NULL,
+    inference_ms REAL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, member_name)
+);
+CREATE TABLE IF NOT EXISTS skipped (
+    job_id TEXT NOT NULL,
+    member_name TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'skipped',
+    error TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, member_name)
+);
+CREATE INDEX IF NOT EXISTS results_by_hash ON results (content_hash, model_name, model_mtime);
+"""
+
+def archive_fingerprint(zip_source, names=None):
+    """
+    Identify a ZIP archive from its central directory
+
+    Member names, sizes and CRC-32s are hashed, so the same archive
+    re-uploaded gets the same fingerprint without reading any image data.
+    """
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(zip_source, 'r') as z:
+        infos = z.infolist() if names is None else [z.getinfo(name) for name in names]
+        for info in infos:
+            digest.update(f"{info.filename}\0{info.file_size}\0{info.CRC}\n".encode("utf-8"))
+    if hasattr(zip_source, "seek"):
+        zip_source.seek(0)
+    return digest.hexdigest()
+
+def content_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+class JobStore:
+    """
+    SQLite store of batch jobs and their per-image results
+
+    One row per scored image: member name, content hash, probabilities,
+    model name and mtime, and inference time. Images that could not be
+    decoded get a "skipped" row with the error instead. Rows are committed
+    after every batch, so a dropped session loses at most the batch in flight.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    @staticmethod
+    def make_job_id(fingerprint, model_name, model_mtime):
+        """Job ID from archive fingerprint and model identity"""
+        key = f"{fingerprint}_{model_name}_{int(model_mtime or 0)}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    def open_job(self, fingerprint, model_name, model_mtime, total, archive_name=None,
+                 retry_skipped=False):
+        """
+        Create the job, or reopen it if this archive was submitted before
+
+        Members skipped by an earlier run stay skipped unless
+        ``retry_skipped`` is set, in which case they are decoded again.
+        """
+        job_id = self.make_job_id(fingerprint, model_name, model_mtime)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, 'running', ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET status = 'running', updated_at = excluded.updated_at",
+                (job_id, archive_name, model_name, int(model_mtime or 0), total, now, now)
+            )
+            if retry_skipped:
+                self._conn.execute("DELETE FROM skipped WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+        return BatchJob(self, job_id, model_name, int(model_mtime or 0))
+
+    def job_rows(self, job_id):
+        """Stored results of a job, in the order they were scored"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT * FROM results WHERE job_id = ? ORDER BY rowid", (job_id,)
+            ).fetchall()
+
+    def skipped_rows(self, job_id):
+        """Skipped members of a job, in the order they were recorded"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT * FROM skipped WHERE job_id = ? ORDER BY rowid", (job_id,)
+            ).fetchall()
+
+    def find(self, content_hash, model_name, model_mtime):
+        """Any stored result for this image content and model (None if unscored)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT * FROM results WHERE content_hash = ? AND model_name = ? AND model_mtime = ? LIMIT 1",
+                (content_hash, model_name, model_mtime)
+            ).fetchone()
+
+    def add_results(self, records):
+        """Insert result records (tuples in ``results`` column order)"""
+        if not records:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records
+            )
+            self._conn.commit()
+
+    def add_skipped(self, records):
+        """Insert skipped members as (job_id, member_name, error, created_at) tuples"""
+        if not records:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO skipped (job_id, member_name, error, created_at) VALUES (?, ?, ?, ?)",
+                records
+            )
+            self._conn.commit()
+
+    def set_status(self, job_id, status):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                (status, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def get_job(self, job_id):
+        """Job record as a dict (None if unknown)"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+class BatchJob:
+    """
+    One batch run over an archive, backed by a JobStore
+
+    Members already stored for this job (scored or skipped) are not read
+    again. Members whose content was scored before by the same model (in
+    any job) reuse that result instead of running inference again.
+    """
+
+    def __init__(self, store, job_id, model_name, model_mtime):
+        self.store = store
+        self.job_id = job_id
+        self.model_name = model_name
+        self.model_mtime = model_mtime
+        self._done = {row["member_name"] for row in store.job_rows(job_id)}
+        self._skipped = {row["member_name"]: row["error"] for row in store.skipped_rows(job_id)}
+        self._done.update(self._skipped)
+        self._hashes = {}
+        self._reused = []
+
+    @property
+    def completed(self):
+        """Number of members already stored for this job (scored or skipped)"""
+        return len(self._done)
+
+    @staticmethod
+    def _to_result_row(row):
+        result = {
+            "image_name": os.path.basename(row["member_name"]),
+            "prediction": row["prediction"],
+            "confidence": row["confidence"]
+        }
+        result.update(json.loads(row["probabilities"]))
+        return result
+
+    def completed_rows(self):
+        """Result rows (make_result_row format) already stored for this job"""
+        return [self._to_result_row(row) for row in self.store.job_rows(self.job_id)]
+
+    def skipped_rows(self):
+        """Skip messages ("name: error") of the members skipped so far"""
+        return list(self._skipped.values())
+
+    def remaining(self, names):
+        """Member names not yet stored for this job"""
+        return [name for name in names if name not in self._done]
+
+    def pending(self, members):
+        """
+        Filter (name, bytes) pairs down to those that need inference
+
+        Content already scored by this model is copied into the job
+        and collected for ``take_reused`` instead of being yielded.
+        """
+        for name, data in members:
+            if isinstance(data, OSError):
+                # Unreadable; decode_members reports it as skipped
+                yield name, data
+                continue
+            digest = content_hash(data)
+            stored = self.store.find(digest, self.model_name, self.model_mtime)
+            if stored is None:
+                self._hashes[name] = digest
+                yield name, data
+                continue
+
+            record = (self.job_id, name, *tuple(stored)[2:9], time.time())
+            self.store.add_results([record])
+            self._done.add(name)
+            self._reused.append(self._to_result_row(stored) | {"image_name": os.path.basename(name)})
+
+    def take_reused(self):
+        """Result rows reused from earlier runs since the last call"""
+        reused, self._reused = self._reused, []
+        return reused
+
+    def record(self, chunk):
+        """Persist a scored BatchChunk"""
+        per_image_ms = 1000 * chunk.seconds / max(len(chunk.results), 1)
+        now = time.time()
+        records = []
+        for name, row in zip(chunk.names, chunk.results):
+            # The cascade stage rides along with the probabilities
+            probabilities = {k: v for k, v in row.items() if k.startswith("prob_") or k == "stage"}
+            records.append((
+                self.job_id, name, self._hashes.pop(name), self.model_name, self.model_mtime,
+                row["prediction"], row["confidence"], json.dumps(probabilities), per_image_ms, now
+            ))
+        self.store.add_results(records)
+        self._done.update(chunk.names)
+
+        skipped = dict(zip(chunk.skipped_names, chunk.skipped))
+        for name in skipped:
+            self._hashes.pop(name, None)
+        self.store.add_skipped([(self.job_id, name, error, now) for name, error in skipped.items()])
+        self._skipped.update(skipped)
+        self._done.update(skipped)
+
+    def finish(self):
+        """Mark the job done ("completed_with_errors" if any member was skipped)"""
+        self.store.set_status(self.job_id, "completed_with_errors" if self._skipped else "completed")
+
+@st.cache_resource
+def get_job_store():
+    """
+    Get the shared job store (one per process)
+
+    The database path is configurable through POTHOLE_JOB_DB.
+    """
+    return JobStore(os.environ.get("POTHOLE_JOB_DB") or DEFAULT_DB_PATH)
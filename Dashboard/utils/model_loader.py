@@ -1,91 +1,412 @@
 """
 Model loading utilities with caching
-Loads trained models for inference
+Loads trained models for inference (TensorFlow is imported on first load)
 """
 
+import gc
+import logging
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import numpy as np
 import streamlit as st
-from tensorflow.keras.models import load_model
 
 # Model paths (relative to Dashboard folder)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
 
 PURECNN_MODEL = os.path.join(PROJECT_ROOT, "PureCNN", "Model", "final_model_fixed.keras")
+PURECNN_FOLDED_MODEL = os.path.join(PROJECT_ROOT, "PureCNN", "Model", "final_model_folded.keras")
 RESNET_MODEL = os.path.join(PROJECT_ROOT, "ResNet50", "Model", "resnet50_final_fixed.keras")
 EFFICIENT_MODEL = os.path.join(PROJECT_ROOT, "EfficientNet", "Model", "efficientnet_final_fixed.keras")
+STUDENT_MODEL = os.path.join(PROJECT_ROOT, "StudentCNN", "Model", "student_final.keras")
+
+logger = logging.getLogger(__name__)
 
 CLASS_NAMES = ["NOPOTHOLE", "POTHOLE"]
+INPUT_SHAPE = (224, 224, 3)
 
-@st.cache_resource
-def load_purecnn_model():
-    """Load PureCNN model (cached)"""
-    if not os.path.exists(PURECNN_MODEL):
-        st.error(f"Model not found: {PURECNN_MODEL}")
+# Model metadata, one entry per registered model
+MODEL_SPECS = {
+    "PureCNN": {
+        "path": PURECNN_MODEL,
+        "inference_path": PURECNN_FOLDED_MODEL,
+        "architecture": "Custom CNN (3 Conv + 2 Dense)",
+        "input_size": (224, 224, 3),
+        "parameters": "~2M",
+        "preprocessing": "Simple normalization (÷255)",
+        "last_conv_layer": "conv2d_2",
+        "training_epochs": 20,
+        "learning_rate": 0.001,
+        "optimizer": "Adam",
+        "batch_size": 32,
+        "backend": "keras"
+    },
+    "ResNet50": {
+        "path": RESNET_MODEL,
+        "architecture": "ResNet50 (Transfer Learning)",
+        "input_size": (224, 224, 3),
+        "parameters": "~23M",
+        "preprocessing": "ResNet preprocessing",
+        "last_conv_layer": "conv5_block3_out",
+        "training_epochs": 15,
+        "learning_rate": 0.0001,
+        "optimizer": "Adam",
+        "batch_size": 32,
+        "backend": "keras"
+    },
+    "EfficientNet": {
+        "path": EFFICIENT_MODEL,
+        "architecture": "EfficientNetB0 (Transfer Learning)",
+        "input_size": (224, 224, 3),
+        "parameters": "~4M",
+        "preprocessing": "EfficientNet preprocessing",
+        "last_conv_layer": "top_activation",
+        "training_epochs": 8,
+        "learning_rate": 0.0001,
+        "optimizer": "Adam",
+        "batch_size": 32,
+        "backend": "keras"
+    },
+    "StudentCNN": {
+        "path": STUDENT_MODEL,
+        "architecture": "Depthwise-separable CNN distilled from ResNet50 + EfficientNet",
+        "input_size": (224, 224, 3),
+        "parameters": "~0.1M",
+        "preprocessing": "Simple normalization (÷255)",
+        "last_conv_layer": "top_relu",
+        "training_epochs": 15,
+        "learning_rate": 0.001,
+        "optimizer": "Adam",
+        "batch_size": 32,
+        "backend": "keras",
+        "teachers": ["ResNet50", "EfficientNet"],
+        "optional": True    # Trained by distill_student.py
+    }
+}
+
+MODEL_PATHS = {name: spec["path"] for name, spec in MODEL_SPECS.items()}
+
+def get_resolution_path(model_name, size=None):
+    """
+    Trained model file for an input resolution (None = the active one)
+    
+    Variants are written next to the trained model by train_resolutions.py
+    (e.g. efficientnet_final_fixed_160px.keras); the native size is the
+    trained model itself. TFLite / ONNX exports are named after this file.
+    """
+    spec = MODEL_SPECS[model_name]
+    if size is None:
+        size = get_input_size(model_name)[0]
+    if size == spec["input_size"][0]:
+        return spec["path"]
+    stem, ext = os.path.splitext(spec["path"])
+    return f"{stem}_{size}px{ext}"
+
+def get_input_size(model_name):
+    """
+    Active (height, width, channels) input size of a model
+    
+    POTHOLE_RESOLUTION_<MODEL> (e.g. POTHOLE_RESOLUTION_EFFICIENTNET=160)
+    overrides POTHOLE_RESOLUTION. A requested size without a trained
+    variant falls back to the native size of the spec.
+    """
+    native = tuple(MODEL_SPECS[model_name]["input_size"])
+    value = (
+        os.environ.get(f"POTHOLE_RESOLUTION_{model_name.upper()}")
+        or os.environ.get("POTHOLE_RESOLUTION")
+    )
+    if not value:
+        return native
+    size = int(value)
+    if size == native[0] or not os.path.exists(get_resolution_path(model_name, size)):
+        return native
+    return (size, size, native[2])
+
+# Objects derived from each loaded model (compiled functions, gradient models)
+_model_caches = weakref.WeakKeyDictionary()
+_model_caches_lock = threading.Lock()
+
+def _get_rss_bytes():
+    """Resident set size of this process (None if unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
         return None
-    return load_model(PURECNN_MODEL)
+
+def _weights_bytes(model):
+    return int(sum(np.prod(w.shape) * w.dtype.size for w in model.weights))
+
+class ModelRegistry:
+    """
+    Loaded models under a RAM budget
+    
+    Models are loaded on first use. Each model's footprint is measured as
+    the process RSS growth while it loads (or its weight bytes when other
+    loads overlap). When loading a model would exceed the budget, the least
+    recently used resident models are evicted first.
+    """
+    
+    def __init__(self, specs, budget_bytes=None):
+        self.specs = specs
+        self.budget_bytes = budget_bytes
+        self._resident = OrderedDict()  # name -> model, in LRU order
+        self._footprints = {}           # name -> measured bytes (kept after eviction)
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in specs}
+        self._loads_in_progress = 0
+    
+    def path(self, model_name):
+        """
+        File the model is loaded from
+        
+        A resolution variant (see get_input_size) replaces the trained
+        model when selected. At the native size, the folded inference graph
+        (see fold_batchnorm.py) replaces it once exported, unless
+        POTHOLE_FOLDED=0.
+        """
+        spec = self.specs[model_name]
+        if get_input_size(model_name) != tuple(spec["input_size"]):
+            return get_resolution_path(model_name)
+        inference_path = spec.get("inference_path")
+        if inference_path and os.environ.get("POTHOLE_FOLDED", "1") != "0" and os.path.exists(inference_path):
+            return inference_path
+        return spec["path"]
+    
+    def exists(self, model_name):
+        """Check if model file exists"""
+        return model_name in self.specs and os.path.exists(self.path(model_name))
+    
+    def info(self, model_name):
+        """Model metadata plus residency and measured footprint"""
+        spec = self.specs.get(model_name)
+        if spec is None:
+            return {}
+        with self._lock:
+            footprint = self._footprints.get(model_name)
+            return {
+                **spec,
+                "input_size": get_input_size(model_name),
+                "resident": model_name in self._resident,
+                "footprint_mb": None if footprint is None else footprint / 1024 ** 2
+            }
+    
+    def get(self, model_name):
+        """Get model, loading it (and evicting others) if needed; None if missing"""
+        with self._lock:
+            if model_name in self._resident:
+                return self._touch(model_name)
+        
+        if not self.exists(model_name):
+            return None
+        
+        # One loader per model; concurrent callers wait here for the result
+        with self._load_locks[model_name]:
+            with self._lock:
+                if model_name in self._resident:
+                    return self._touch(model_name)
+                self._make_room(self._estimate_bytes(model_name), keep=model_name)
+                self._loads_in_progress += 1
+            
+            try:
+                model, footprint = self._load(model_name)
+            finally:
+                with self._lock:
+                    self._loads_in_progress -= 1
+            
+            with self._lock:
+                self._resident[model_name] = model
+                self._footprints[model_name] = footprint
+                self._make_room(0, keep=model_name)
+                return self._touch(model_name)
+    
+    def _touch(self, model_name):
+        self._resident.move_to_end(model_name)
+        self._last_used[model_name] = time.time()
+        return self._resident[model_name]
+    
+    def _load(self, model_name):
+        from tensorflow.keras.models import load_model
+        from .bn_folding import ChannelShift
+        
+        rss_before = _get_rss_bytes()
+        model = load_model(self.path(model_name), custom_objects={"ChannelShift": ChannelShift})
+        rss_after = _get_rss_bytes()
+        
+        footprint = _weights_bytes(model)
+        with self._lock:
+            measured_alone = self._loads_in_progress == 1
+        if measured_alone and rss_before is not None and rss_after is not None:
+            footprint = max(footprint, rss_after - rss_before)
+        return model, footprint
+    
+    def _estimate_bytes(self, model_name):
+        """Expected footprint: last measurement, else file size on disk"""
+        if model_name in self._footprints:
+            return self._footprints[model_name]
+        return os.path.getsize(self.path(model_name))
+    
+    def _resident_bytes(self):
+        return sum(self._footprints.get(name, 0) for name in self._resident)
+    
+    def _make_room(self, incoming_bytes, keep=None):
+        """Evict LRU models until incoming_bytes fits in the budget (lock held)"""
+        if self.budget_bytes is None:
+            return
+        for name in list(self._resident):
+            if self._resident_bytes() + incoming_bytes <= self.budget_bytes:
+                break
+            if name != keep:
+                self._evict(name)
+    
+    def _evict(self, model_name):
+        model = self._resident.pop(model_name)
+        with _model_caches_lock:
+            _model_caches.pop(model, None)
+        del model
+        gc.collect()
+        logger.info("Evicted %s from model registry", model_name)
+    
+    def evict(self, model_name):
+        """Drop a resident model"""
+        with self._lock:
+            if model_name in self._resident:
+                self._evict(model_name)
+    
+    def report(self):
+        """Resident models with sizes, most recently used first"""
+        with self._lock:
+            return [
+                {
+                    "model": name,
+                    "footprint_mb": self._footprints.get(name, 0) / 1024 ** 2,
+                    "last_used": self._last_used.get(name)
+                }
+                for name in reversed(self._resident)
+            ]
+    
+    def resident_mb(self):
+        with self._lock:
+            return self._resident_bytes() / 1024 ** 2
 
 @st.cache_resource
-def load_resnet_model():
-    """Load ResNet50 model (cached)"""
-    if not os.path.exists(RESNET_MODEL):
-        st.error(f"Model not found: {RESNET_MODEL}")
+def get_registry():
+    """
+    Get the shared model registry (one per process)
+    
+    The RAM budget is set through POTHOLE_MODEL_BUDGET_MB (unset = no limit).
+    """
+    budget_mb = os.environ.get("POTHOLE_MODEL_BUDGET_MB")
+    budget_bytes = int(float(budget_mb) * 1024 ** 2) if budget_mb else None
+    return ModelRegistry(MODEL_SPECS, budget_bytes)
+
+def load_model_file(model_name):
+    """Load model through the registry (None if missing)"""
+    return get_registry().get(model_name)
+
+def _load_model(model_name):
+    """Load model, waiting on the background preload when it is enabled"""
+    if not get_registry().exists(model_name):
+        st.error(f"Model not found: {get_model_path(model_name)}")
         return None
-    return load_model(RESNET_MODEL)
+    
+    from .preload import is_preload_enabled, start_preload
+    if is_preload_enabled():
+        start_preload().wait(model_name)
+    
+    # Non-Keras runtimes (see backends.py) come back as InferenceBackend
+    from .backends import get_backend, get_backend_config
+    if get_backend_config(model_name)[0] != "keras":
+        return get_backend(model_name)
+    return load_model_file(model_name)
+
+def load_purecnn_model():
+    """Load PureCNN model (via registry)"""
+    return _load_model("PureCNN")
+
+def load_resnet_model():
+    """Load ResNet50 model (via registry)"""
+    return _load_model("ResNet50")
 
-@st.cache_resource
 def load_efficientnet_model():
-    """Load EfficientNet model (cached)"""
-    if not os.path.exists(EFFICIENT_MODEL):
-        st.error(f"Model not found: {EFFICIENT_MODEL}")
-        return None
-    return load_model(EFFICIENT_MODEL)
+    """Load EfficientNet model (via registry)"""
+    return _load_model("EfficientNet")
+
+def load_student_model():
+    """Load distilled StudentCNN model (via registry)"""
+    return _load_model("StudentCNN")
+
+def cached_for_model(model, key, build):
+    """Get object derived from a loaded model, building it once per (model, key)"""
+    with _model_caches_lock:
+        cache = _model_caches.setdefault(model, {"lock": threading.RLock(), "items": {}})
+    
+    # Per-model lock, so different models can build concurrently
+    with cache["lock"]:
+        items = cache["items"]
+        if key not in items:
+            items[key] = build()
+        return items[key]
+
+def get_inference_fn(model):
+    """
+    Get compiled forward pass for a loaded model (cached per model)
+    
+    The tf.function has a fixed (None, h, w, 3) float32 input signature
+    taken from the model, so it is traced once per model and reused for
+    every call and batch size instead of rebuilding the Keras predict loop
+    each time.
+    """
+    import tensorflow as tf
+    
+    def build():
+        model_ref = weakref.ref(model)
+        
+        @tf.function(input_signature=[tf.TensorSpec((None, *model.input_shape[1:]), tf.float32)])
+        def infer(img_batch):
+            return model_ref()(img_batch, training=False)
+        
+        return infer
+    
+    return cached_for_model(model, "inference", build)
 
 def get_model_info(model_name):
-    """Get model metadata"""
-    model_configs = {
-        "PureCNN": {
-            "architecture": "Custom CNN (3 Conv + 2 Dense)",
-            "input_size": (224, 224, 3),
-            "parameters": "~2M",
-            "preprocessing": "Simple normalization (÷255)",
-            "last_conv_layer": "conv2d_2",
-            "training_epochs": 20,
-            "learning_rate": 0.001,
-            "optimizer": "Adam",
-            "batch_size": 32
-        },
-        "ResNet50": {
-            "architecture": "ResNet50 (Transfer Learning)",
-            "input_size": (224, 224, 3),
-            "parameters": "~23M",
-            "preprocessing": "ResNet preprocessing",
-            "last_conv_layer": "conv5_block3_out",
-            "training_epochs": 15,
-            "learning_rate": 0.0001,
-            "optimizer": "Adam",
-            "batch_size": 32
-        },
-        "EfficientNet": {
-            "architecture": "EfficientNetB0 (Transfer Learning)",
-            "input_size": (224, 224, 3),
-            "parameters": "~4M",
-            "preprocessing": "EfficientNet preprocessing",
-            "last_conv_layer": "top_activation",
-            "training_epochs": 8,
-            "learning_rate": 0.0001,
-            "optimizer": "Adam",
-            "batch_size": 32
-        }
-    }
-    return model_configs.get(model_name, {})
+    """Get model metadata (with registry residency and footprint)"""
+    return get_registry().info(model_name)
 
 def check_model_exists(model_name):
     """Check if model file exists"""
-    paths = {
-        "PureCNN": PURECNN_MODEL,
-        "ResNet50": RESNET_MODEL,
-        "EfficientNet": EFFICIENT_MODEL
-    }
-    path = paths.get(model_name)
-    return os.path.exists(path) if path else False
\ No newline at end of file
+    return get_registry().exists(model_name)
+
+def get_model_path(model_name):
+    """Get the file a model is loaded from (None if unknown)"""
+    if model_name not in MODEL_SPECS:
+        return None
+    return get_registry().path(model_name)
+
+def get_model_mtime(model_name):
+    """Get model file modification time (None if missing)"""
+    path = get_model_path(model_name)
+    if not path or not os.path.exists(path):
+        return None
+    return os.path.getmtime(path)
+
+def get_resident_models():
+    """Resident models and their measured sizes"""
+    return get_registry().report()
+
+def render_registry_status():
+    """Show resident models and memory use in the sidebar"""
+    registry = get_registry()
+    budget = registry.budget_bytes
+    budget_text = f"{budget / 1024 ** 2:.0f} MB" if budget else "unlimited"
+    
+    with st.sidebar:
+        st.markdown("### <i class='fa-solid fa-memory'></i> Resident Models", unsafe_allow_html=True)
+        for entry in registry.report():
+            st.caption(f"**{entry['model']}**: {entry['footprint_mb']:.0f} MB")
+        st.caption(f"Total {registry.resident_mb():.0f} MB / budget {budget_text}")
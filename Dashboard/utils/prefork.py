@@ -0,0 +1,375 @@
+"""
+Pre-fork multi-process serving
+Forks inference workers with pinned TF thread pools behind a least-loaded dispatcher
+
+Usage (from the Dashboard folder):
+    python -m utils.prefork --workers 8 --intra-op-threads 4 --port 8080
+
+The TF 2.15 runtime is not fork-safe (a child forked after the first op
+hangs on its own first op), so the parent only imports TensorFlow, Keras
+and the preprocessing stack, whose pages the workers then share
+copy-on-write, and builds no graphs. Each worker configures its thread
+pools and builds its models after the fork.
+
+Weights are shared for models served through the TFLite backend
+(POTHOLE_BACKEND_<MODEL>=tflite): the parent maps each flatbuffer and
+pulls it into the page cache before forking, and every worker's
+interpreter maps the same file pages. With --shared-weights the workers
+also skip the XNNPACK delegate, which would otherwise repack a private
+copy of the weights per worker. Keras models keep their weights in TF
+variables, which are private to each worker.
+
+The parent accepts connections and forwards each request to the worker
+with the fewest requests in flight.
+"""
+
+import argparse
+import asyncio
+import json
+import mmap
+import os
+import signal
+import sys
+import tempfile
+import time
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from .backends import get_backend_config
+from .model_loader import MODEL_SPECS, check_model_exists
+from .tflite_backend import get_tflite_path
+from .serving import (
+    DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, HTTPError,
+    InferenceServer, read_headers, read_request, warm_up, write_response
+)
+
+def process_memory(pid):
+    """
+    RSS, PSS and shared memory of a process in MB (Linux only)
+
+    PSS splits shared pages between the processes mapping them, so the
+    sum of PSS over all workers is their real combined footprint.
+    """
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty"):
+                    memory[key] = int(value.split()[0]) / 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    return {
+        "rss_mb": round(memory.get("Rss", 0), 1),
+        "pss_mb": round(memory.get("Pss", 0), 1),
+        "shared_mb": round(memory.get("Shared_Clean", 0) + memory.get("Shared_Dirty", 0), 1)
+    }
+
+def preimport():
+    """Import the heavy modules (no TF ops) so forked workers share their pages"""
+    import cv2
+    import tensorflow as tf
+    from tensorflow import keras
+
+    from . import inference, preprocessing
+
+def map_shared_weights(model_names):
+    """
+    Map the TFLite flatbuffers of the served models before forking
+
+    Each file is mapped read-only and read through once, so its pages are
+    in the page cache and the workers' interpreters (which map the same
+    file) share one copy.
+
+    Returns:
+        (list of (model name, mmap), names of models whose weights stay private)
+    """
+    mappings, private = [], []
+    for name in model_names:
+        backend, variant = get_backend_config(name)
+        path = get_tflite_path(name, variant or "int8") if backend == "tflite" else None
+        if path is None or not os.path.exists(path):
+            private.append(name)
+            continue
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mapping, "madvise"):
+            mapping.madvise(mmap.MADV_WILLNEED)
+        for offset in range(0, len(mapping), mmap.PAGESIZE):
+            mapping[offset]
+        mappings.append((name, mapping))
+    return mappings, private
+
+def default_intra_op_threads(num_workers):
+    """Split the cores evenly between workers"""
+    return max((os.cpu_count() or 1) // num_workers, 1)
+
+def run_worker(index, socket_path, model_names, args):
+    """Worker process body: pin threads, load models, serve on a Unix socket"""
+    if args.pin_cpus and hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        per_worker = max(len(cpus) // args.workers, 1)
+        start = (index * per_worker) % len(cpus)
+        os.sched_setaffinity(0, cpus[start:start + per_worker])
+
+    import tensorflow as tf
+
+    # Must happen before the first op initializes the TF runtime
+    tf.config.threading.set_intra_op_parallelism_threads(args.intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(args.inter_op_threads)
+
+    warm_up(model_names)
+    server = InferenceServer(model_names, args.max_batch_size, args.max_wait_ms, args.decode_workers)
+    asyncio.run(server.serve(unix_path=socket_path))
+
+class WorkerLink:
+    """Keep-alive connections from the dispatcher to one worker"""
+
+    def __init__(self, index, pid, socket_path):
+        self.index = index
+        self.pid = pid
+        self.socket_path = socket_path
+        self.in_flight = 0
+        self.forwarded = 0
+        self.alive = True
+        self._idle = []
+
+    async def forward(self, method, target, body):
+        """Send one request, return (status, body bytes)"""
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path)
+
+        self.in_flight += 1
+        try:
+            head = f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n"
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError(f"Worker {self.index} closed the connection")
+            status = HTTPStatus(int(status_line.split()[1]))
+            headers = await read_headers(reader)
+            response = await reader.readexactly(int(headers.get("content-length", 0)))
+        except Exception:
+            writer.close()
+            raise
+        finally:
+            self.in_flight -= 1
+
+        self._idle.append((reader, writer))
+        return status, response
+
+class Dispatcher:
+    """
+    Front HTTP server balancing requests across worker processes
+
+    /health and /stats are answered here; /stats merges every worker's
+    batcher counters and adds per-worker RSS / PSS. Everything else goes
+    to the live worker with the fewest requests in flight.
+    """
+
+    def __init__(self, workers, model_names):
+        self.workers = workers
+        self.model_names = model_names
+
+    def _pick_worker(self):
+        live = [w for w in self.workers if w.alive]
+        if not live:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "No live workers")
+        return min(live, key=lambda w: w.in_flight)
+
+    async def stats(self):
+        merged = {"workers": [], "batchers": {}}
+        for worker in self.workers:
+            entry = {"index": worker.index, "pid": worker.pid, "alive": worker.alive,
+                     "forwarded": worker.forwarded, **process_memory(worker.pid)}
+            if worker.alive:
+                try:
+                    _, body = await worker.forward("GET", "/stats", b"")
+                    worker_stats = json.loads(body)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                    worker_stats = {}
+                merged.setdefault("max_batch_size", worker_stats.get("max_batch_size"))
+                merged.setdefault("max_wait_ms", worker_stats.get("max_wait_ms"))
+                for key, counters in worker_stats.get("batchers", {}).items():
+                    total = merged["batchers"].setdefault(key, {"requests": 0, "batches": 0})
+                    total["requests"] += counters["requests"]
+                    total["batches"] += counters["batches"]
+            merged["workers"].append(entry)
+
+        for total in merged["batchers"].values():
+            total["mean_batch_size"] = round(total["requests"] / total["batches"], 2) if total["batches"] else 0.0
+        merged["total_rss_mb"] = round(sum(w.get("rss_mb", 0) for w in merged["workers"]), 1)
+        merged["total_pss_mb"] = round(sum(w.get("pss_mb", 0) for w in merged["workers"]), 1)
+        return merged
+
+    async def dispatch(self, request):
+        path = urlsplit(request.target).path.rstrip("/")
+        if request.method == "GET" and path == "/health":
+            live = sum(w.alive for w in self.workers)
+            return HTTPStatus.OK, {"status": "ok" if live else "down", "models": self.model_names,
+                                   "workers": len(self.workers), "live_workers": live}
+        if request.method == "GET" and path == "/stats":
+            return HTTPStatus.OK, await self.stats()
+
+        worker = self._pick_worker()
+        worker.forwarded += 1
+        try:
+            return await worker.forward(request.method, request.target, request.body)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+            if not _pid_alive(worker.pid):
+                worker.alive = False
+            raise HTTPError(HTTPStatus.BAD_GATEWAY, f"Worker {worker.index} failed: {e}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    await write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                try:
+                    status, payload = await self.dispatch(request)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+
+                await write_response(writer, status, payload, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+def _pid_alive(pid):
+    try:
+        return os.waitpid(pid, os.WNOHANG) == (0, 0)
+    except ChildProcessError:
+        return False
+
+def wait_for_workers(workers, timeout=600):
+    """Block until every worker socket accepts connections"""
+    async def ping(worker):
+        while True:
+            if not _pid_alive(worker.pid):
+                raise RuntimeError(f"Worker {worker.index} exited during startup")
+            try:
+                await worker.forward("GET", "/health", b"")
+                return
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                await asyncio.sleep(0.2)
+
+    async def ping_all():
+        await asyncio.wait_for(asyncio.gather(*(ping(w) for w in workers)), timeout)
+
+    asyncio.run(ping_all())
+    # Connections opened on the startup loop cannot be reused on the serving loop
+    for worker in workers:
+        worker._idle.clear()
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.prefork",
+        description="Pre-fork multi-process pothole inference service"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes (default: %(default)s)")
+    parser.add_argument("--intra-op-threads", type=int, default=None,
+                        help="TF intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--inter-op-threads", type=int, default=1,
+                        help="TF inter-op threads per worker (default: %(default)s)")
+    parser.add_argument("--pin-cpus", action="store_true", help="Pin each worker to its own slice of cores")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS), default=None,
+                        help="Models to serve (default: every model whose file exists)")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--decode-workers", type=int, default=2, help="Decode threads per worker")
+    parser.add_argument("--shared-weights", action="store_true",
+                        help="Run TFLite models without XNNPACK so workers read one shared copy of the weights")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.intra_op_threads is None:
+        args.intra_op_threads = default_intra_op_threads(args.workers)
+
+    model_names = args.models or [name for name in MODEL_SPECS if check_model_exists(name)]
+    if not model_names:
+        print("❌ No model files found")
+        return 1
+
+    if args.shared_weights:
+        # Inherited by the workers before their interpreters are built
+        os.environ["POTHOLE_TFLITE_XNNPACK"] = "0"
+    preimport()
+    mappings, private = map_shared_weights(model_names)
+    for name, mapping in mappings:
+        print(f"✅ {name}: {len(mapping) / 1024 ** 2:.1f} MB of TFLite weights mapped for sharing")
+    for name in private:
+        print(f"⚠️ {name}: weights are private to each worker (serve it with POTHOLE_BACKEND_{name.upper()}=tflite to share)")
+    socket_dir = tempfile.mkdtemp(prefix="pothole-workers-")
+    workers = []
+    for index in range(args.workers):
+        socket_path = os.path.join(socket_dir, f"worker-{index}.sock")
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(index, socket_path, model_names, args)
+            except KeyboardInterrupt:
+                pass
+            except Exception as e:
+                print(f"❌ Worker {index}: {e}", file=sys.stderr)
+                status = 1
+            finally:
+                os._exit(status)
+        workers.append(WorkerLink(index, pid, socket_path))
+
+    def shutdown(*_):
+        for worker in workers:
+            try:
+                os.kill(worker.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, lambda *_: (shutdown(), sys.exit(0)))
+    try:
+        start = time.perf_counter()
+        wait_for_workers(workers)
+        print("=" * 60)
+        print(f"{args.workers} workers ready in {time.perf_counter() - start:.1f} s "
+              f"(intra-op {args.intra_op_threads}, inter-op {args.inter_op_threads})")
+        total_pss = 0.0
+        for worker in workers:
+            memory = process_memory(worker.pid)
+            total_pss += memory.get("pss_mb", 0)
+            print(f"   worker {worker.index} (pid {worker.pid}): RSS {memory.get('rss_mb', '?')} MB · "
+                  f"PSS {memory.get('pss_mb', '?')} MB · shared {memory.get('shared_mb', '?')} MB")
+        print(f"   total worker PSS {total_pss:.1f} MB")
+        print(f"Serving {', '.join(model_names)} on http://{args.host}:{args.port}")
+        print("=" * 60)
+        asyncio.run(Dispatcher(workers, model_names).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        shutdown()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
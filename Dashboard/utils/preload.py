@@ -0,0 +1,131 @@
+"""
+Background model preload and warmup
+Loads all models concurrently at startup and traces their inference graphs
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import streamlit as st
+
+from .model_loader import (
+    MODEL_PATHS, MODEL_SPECS, INPUT_SHAPE, check_model_exists, get_model_info, load_model_file
+)
+
+STATUS_ICONS = {
+    "queued": "⏳",
+    "loading": "📥",
+    "warming up": "🔥",
+    "ready": "✅",
+    "failed": "❌"
+}
+
+def is_preload_enabled():
+    """Preload is opt-in through POTHOLE_PRELOAD=1"""
+    return os.environ.get("POTHOLE_PRELOAD", "").lower() in ("1", "true", "yes")
+
+class Preloader:
+    """
+    Loads models in a thread pool and warms them up
+
+    Each model is loaded through the model registry, then a dummy
+    batch at its input size is run through the compiled forward pass and the
+    Grad-CAM step so the first real prediction does not pay for tracing.
+    """
+
+    def __init__(self, model_names):
+        self._status = {name: "queued" for name in model_names}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(model_names), 1),
+            thread_name_prefix="model-preload"
+        )
+        self._futures = {
+            name: self._executor.submit(self._load_and_warm, name)
+            for name in model_names
+        }
+
+    def _set_status(self, model_name, status):
+        with self._lock:
+            self._status[model_name] = status
+
+    def _load_and_warm(self, model_name):
+        try:
+            self._set_status(model_name, "loading")
+            model = load_model_file(model_name)
+            if model is None:
+                raise FileNotFoundError(f"Model not found: {MODEL_PATHS.get(model_name)}")
+
+            self._set_status(model_name, "warming up")
+            info = get_model_info(model_name)
+            warmup_model(model, info.get("last_conv_layer"), info["input_size"])
+
+            # The registry owns the model; don't keep it alive from here
+            self._set_status(model_name, "ready")
+        except Exception as e:
+            with self._lock:
+                self._status[model_name] = "failed"
+                self._errors[model_name] = str(e)
+            raise
+
+    def wait(self, model_name):
+        """Block until the model is loaded and warmed up"""
+        future = self._futures.get(model_name)
+        if future is None:
+            return
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Preload of {model_name} failed: {e}")
+
+    def status(self):
+        """Get {model_name: status} snapshot"""
+        with self._lock:
+            return dict(self._status)
+
+    def errors(self):
+        """Get {model_name: error message} for failed models"""
+        with self._lock:
+            return dict(self._errors)
+
+    def is_ready(self):
+        return all(future.done() for future in self._futures.values())
+
+def warmup_model(model, last_conv_layer=None, input_size=INPUT_SHAPE):
+    """Trace the compiled inference (and Grad-CAM) functions with a dummy batch"""
+    from .inference import run_inference
+    from .gradcam import make_gradcam_heatmap
+
+    dummy = np.zeros((1, *input_size), dtype=np.float32)
+    run_inference(model, dummy)
+    if last_conv_layer:
+        try:
+            make_gradcam_heatmap(dummy, model, last_conv_layer)
+        except Exception as e:
+            print(f"Grad-CAM warmup failed: {e}")
+
+@st.cache_resource
+def start_preload():
+    """Start loading all models in the background (once per process, optional models only if trained)"""
+    return Preloader([
+        name for name in MODEL_PATHS
+        if not MODEL_SPECS[name].get("optional") or check_model_exists(name)
+    ])
+
+def render_preload_status():
+    """Show model readiness in the sidebar (no-op unless preload is enabled)"""
+    if not is_preload_enabled():
+        return
+
+    preloader = start_preload()
+    errors = preloader.errors()
+
+    with st.sidebar:
+        st.markdown("### <i class='fa-solid fa-server'></i> Model Readiness", unsafe_allow_html=True)
+        for model_name, status in preloader.status().items():
+            st.caption(f"{STATUS_ICONS.get(status, '')} **{model_name}**: {status}")
+            if model_name in errors:
+                st.caption(f"↳ {errors[model_name]}")
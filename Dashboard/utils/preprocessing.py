@@ -0,0 +1,94 @@
+"""
+Batched preprocessing kernels
+Fills a float32 (N, h, w, 3) batch from images with per-family normalization
+"""
+
+import numpy as np
+
+from .model_loader import INPUT_SHAPE, MODEL_SPECS, get_input_size
+
+# ImageNet channel means in BGR order (ResNet "caffe" preprocessing)
+CAFFE_MEAN_BGR = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+def normalize_scale(batch_u8, out):
+    """PureCNN / StudentCNN: simple normalization (÷255)"""
+    return np.divide(batch_u8, np.float32(255.0), out=out, dtype=np.float32)
+
+def normalize_caffe(batch_u8, out):
+    """ResNet50: RGB -> BGR, then subtract ImageNet channel means"""
+    return np.subtract(batch_u8[..., ::-1], CAFFE_MEAN_BGR, out=out, dtype=np.float32)
+
+def normalize_passthrough(batch_u8, out):
+    """EfficientNet: raw 0-255 values (rescaling is part of the model)"""
+    out[...] = batch_u8
+    return out
+
+# Normalization per model family
+PREPROCESSORS = {
+    "PureCNN": normalize_scale,
+    "ResNet50": normalize_caffe,
+    "EfficientNet": normalize_passthrough,
+    "StudentCNN": normalize_scale
+}
+
+def get_preprocessor(model_type):
+    """Get normalization kernel for model type"""
+    try:
+        return PREPROCESSORS[model_type]
+    except KeyError:
+        raise ValueError(f"No preprocessing registered for model type: {model_type}")
+
+def register_preprocessor(model_type, normalize):
+    """Register normalization kernel for a new model type"""
+    PREPROCESSORS[model_type] = normalize
+
+def get_target_size(model_type):
+    """PIL (width, height) of a model's active input size (224x224 for unregistered types)"""
+    height, width = get_input_size(model_type)[:2] if model_type in MODEL_SPECS else INPUT_SHAPE[:2]
+    return width, height
+
+def load_batch(pil_images, target_size=INPUT_SHAPE[:2], out=None):
+    """
+    Resize images into a uint8 (N, h, w, 3) batch
+
+    Args:
+        pil_images: List of PIL images
+        target_size: (width, height) of the model input
+        out: Optional preallocated uint8 buffer with at least N rows
+
+    Returns:
+        uint8 batch of N images
+    """
+    width, height = target_size
+    if out is None:
+        out = np.empty((len(pil_images), height, width, 3), dtype=np.uint8)
+    out = out[:len(pil_images)]
+
+    for i, pil_image in enumerate(pil_images):
+        img = pil_image if pil_image.mode == "RGB" else pil_image.convert("RGB")
+        img = img.resize(target_size)
+        out[i] = np.asarray(img)
+    return out
+
+def preprocess_batch(pil_images, model_type, target_size=None, out=None):
+    """
+    Preprocess images into a float32 model input batch
+
+    Decoded pixels are gathered into one uint8 batch, then the model's
+    normalization runs once as a single vectorized op over the batch.
+
+    Args:
+        pil_images: List of PIL images
+        model_type: Type of model for preprocessing
+        target_size: (width, height) of the model input (None = the model's active input size)
+        out: Optional preallocated float32 buffer with at least N rows
+
+    Returns:
+        float32 batch of shape (N, h, w, 3)
+    """
+    normalize = get_preprocessor(model_type)
+    batch_u8 = load_batch(pil_images, target_size or get_target_size(model_type))
+
+    if out is None:
+        out = np.empty(batch_u8.shape, dtype=np.float32)
+    return normalize(batch_u8, out[:len(batch_u8)])
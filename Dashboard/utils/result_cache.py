@@ -0,0 +1,176 @@
+"""
+Prediction + heatmap cache
+Content-addressed LRU cache so reruns and repeated uploads skip inference
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+# Defaults, overridable through environment variables
+DEFAULT_MAX_MB = 256
+DEFAULT_DISK_MAX_MB = 2048
+
+class ResultCache:
+    """
+    Byte-budgeted LRU cache of prediction results
+
+    Entries are dicts of numpy arrays (probabilities, low-res heatmap,
+    overlay) keyed by the hash of the image bytes, the model name and the
+    model file mtime, so retraining a model invalidates its entries.
+
+    With ``cache_dir`` set, entries are also written to disk as .npz files.
+    Writes go through a temp file + rename, so several worker processes
+    can share one directory and the cache survives restarts.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, cache_dir=None,
+                 disk_max_bytes=DEFAULT_DISK_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_bytes, model_name, model_mtime):
+        """Build cache key from image content and model identity"""
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return f"{digest}_{model_name}_{int(model_mtime or 0)}"
+
+    @staticmethod
+    def _entry_bytes(entry):
+        return sum(np.asarray(v).nbytes for v in entry.values())
+
+    def get(self, key):
+        """Get cached entry (None on miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        """Store entry (dict of numpy arrays)"""
+        entry = {k: np.asarray(v) for k, v in entry.items()}
+        with self._lock:
+            self._insert(key, entry)
+        self._write_disk(key, entry)
+
+    def _insert(self, key, entry):
+        size = self._entry_bytes(entry)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self.current_bytes -= self._entry_bytes(self._entries.pop(key))
+        self._entries[key] = entry
+        self.current_bytes += size
+
+        # Evict least recently used entries until within budget
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= self._entry_bytes(evicted)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with np.load(self._disk_path(key)) as data:
+                return {k: data[k] for k in data.files}
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        tmp_path = os.path.join(self.cache_dir, f".{key}.{uuid.uuid4().hex}.tmp.npz")
+        try:
+            np.savez(tmp_path, **entry)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"Result cache write failed: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove oldest disk entries until within the disk budget"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz") or name.startswith("."):
+                continue
+            try:
+                st_file = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            files.append((st_file.st_mtime, st_file.st_size, name))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        """Get cache counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits
+            }
+
+    def clear(self):
+        """Drop all in-memory entries"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+@st.cache_resource
+def get_result_cache():
+    """
+    Get the shared result cache (one per process)
+
+    Configured through POTHOLE_CACHE_MB, POTHOLE_CACHE_DIR (enables the
+    on-disk tier) and POTHOLE_CACHE_DISK_MB.
+    """
+    return ResultCache(
+        max_bytes=int(float(os.environ.get("POTHOLE_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+        cache_dir=os.environ.get("POTHOLE_CACHE_DIR") or None,
+        disk_max_bytes=int(float(os.environ.get("POTHOLE_CACHE_DISK_MB", DEFAULT_DISK_MAX_MB)) * 1024 * 1024)
+    )
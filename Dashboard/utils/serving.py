@@ -0,0 +1,436 @@
+"""
+Micro-batching HTTP inference service
+Collects concurrent single-image requests into dynamic batches, one forward pass per batch
+
+Usage (from the Dashboard folder):
+    python -m utils.serving --port 8080 --max-batch-size 32 --max-wait-ms 5
+
+Endpoints:
+    POST /predict/<model>[?gradcam=1]   raw image bytes in the body
+    GET  /models, /stats, /health
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .backends import get_backend, get_backend_config
+from .decode import decode_image, BATCH_MAX_SIDE
+from .model_loader import (
+    CLASS_NAMES, MODEL_SPECS, _get_rss_bytes,
+    check_model_exists, get_model_info, get_model_path, load_model_file
+)
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Largest request body accepted (bytes)
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+# One parsed HTTP request
+Request = namedtuple("Request", ["method", "target", "headers", "body", "keep_alive"])
+
+class HTTPError(Exception):
+    """Request failure reported to the client as a JSON error"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class MicroBatcher:
+    """
+    Dynamic batching queue for one model
+
+    The first request of a batch waits at most ``max_wait_ms`` for others
+    to join (or until ``max_batch_size`` are queued). The batch then runs
+    as one forward pass on the model's own inference thread, and every
+    caller gets its own row back. Requests that arrive while a batch is
+    running form the next batch, so batches grow with concurrency.
+    """
+
+    def __init__(self, model_name, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, gradcam=False):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.gradcam = gradcam
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"infer-{model_name}")
+        self._task = None
+
+    async def submit(self, image):
+        """Queue one decoded image and wait for its result dict"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """Wait for the first request, then gather more until full or the wait expires"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # Anything already queued joins without waiting
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._run_batch(batch)
+            except Exception as e:
+                # Fail this batch only; the loop keeps serving the next one
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _run_batch(self, batch):
+        """Forward one collected batch and resolve its futures"""
+        start = time.perf_counter()
+        outputs = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._forward, [image for image, _, _ in batch]
+        )
+
+        inference_ms = 1000 * (time.perf_counter() - start)
+        self.requests += len(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        for (_, future, queued_at), output in zip(batch, outputs):
+            # The client may have disconnected meanwhile
+            if future.done():
+                continue
+            output.update(
+                batch_size=len(batch),
+                queue_ms=round(1000 * (start - queued_at), 2),
+                inference_ms=round(inference_ms, 2)
+            )
+            future.set_result(output)
+
+    def _forward(self, images):
+        """One forward (and optional Grad-CAM) pass over a batch (inference thread)"""
+        from .inference import run_inference
+        from .preprocessing import get_target_size, preprocess_batch
+
+        try:
+            backend = get_backend(self.model_name)
+        except (FileNotFoundError, ImportError) as e:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+
+        img_batch = preprocess_batch(images, self.model_name)
+        if self.gradcam:
+            from .gradcam import get_gradcam_fn, generate_gradcam_overlays
+
+            # Looked up per batch so the registry can still evict idle models
+            model = load_model_file(self.model_name)
+            if model is None:
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, f"Model {self.model_name} could not be loaded")
+
+            # Backends without gradients predict; Keras explains their predicted classes
+            pred_indices = np.full(len(images), -1, dtype=np.int32)
+            if not backend.supports_gradcam:
+                preds = run_inference(backend, img_batch)
+                pred_indices = preds.argmax(axis=1).astype(np.int32)
+
+            gradcam_step = get_gradcam_fn(model, get_model_info(self.model_name)["last_conv_layer"])
+            keras_preds, heatmaps = gradcam_step(img_batch, pred_indices)
+            if backend.supports_gradcam:
+                preds = keras_preds.numpy()
+            _, overlays = generate_gradcam_overlays(images, heatmaps.numpy(), size=get_target_size(self.model_name))
+        else:
+            try:
+                preds = run_inference(backend, img_batch)
+            except FileNotFoundError as e:
+                raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+            overlays = [None] * len(images)
+
+        outputs = []
+        for probs, overlay in zip(preds, overlays):
+            pred_idx = int(np.argmax(probs))
+            output = {
+                "model": self.model_name,
+                "prediction": CLASS_NAMES[pred_idx],
+                "confidence": float(probs[pred_idx]),
+                "probabilities": {name: float(p) for name, p in zip(CLASS_NAMES, probs)}
+            }
+            if overlay is not None:
+                output["gradcam_overlay_png"] = _encode_png(overlay)
+            outputs.append(output)
+        return outputs
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "queued": self._queue.qsize()
+        }
+
+def _encode_png(rgb):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.fromarray(rgb).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+class InferenceServer:
+    """
+    Minimal HTTP/1.1 server (asyncio streams, keep-alive) in front of
+    one MicroBatcher per (model, gradcam) pair
+    """
+
+    def __init__(self, model_names, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, decode_workers=4):
+        self.model_names = list(model_names)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.started = time.time()
+        self._batchers = {}
+        self._decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="decode")
+
+    def _get_batcher(self, model_name, gradcam):
+        key = (model_name, gradcam)
+        if key not in self._batchers:
+            self._batchers[key] = MicroBatcher(
+                model_name, self.max_batch_size, self.max_wait_ms, gradcam=gradcam
+            )
+        return self._batchers[key]
+
+    async def predict(self, model_name, body, gradcam=False):
+        if model_name not in self.model_names:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown model: {model_name}")
+        if not body:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be an image")
+
+        loop = asyncio.get_running_loop()
+        try:
+            image = await loop.run_in_executor(
+                self._decode_pool, decode_image, BytesIO(body), BATCH_MAX_SIDE
+            )
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        return await self._get_batcher(model_name, gradcam).submit(image)
+
+    def stats(self):
+        rss = _get_rss_bytes()
+        return {
+            "pid": os.getpid(),
+            "rss_mb": round(rss / 1024 / 1024, 1) if rss is not None else None,
+            "uptime_s": round(time.time() - self.started, 1),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batchers": {
+                f"{name}{'+gradcam' if gradcam else ''}": batcher.stats()
+                for (name, gradcam), batcher in self._batchers.items()
+            }
+        }
+
+    async def dispatch(self, method, target, body):
+        """Route one request to (status, JSON payload)"""
+        url = urlsplit(target)
+        path = url.path.rstrip("/")
+        query = parse_qs(url.query)
+
+        if method == "GET" and path == "/health":
+            return HTTPStatus.OK, {"status": "ok", "models": self.model_names}
+        if method == "GET" and path == "/models":
+            return HTTPStatus.OK, {name: public_model_info(name) for name in self.model_names}
+        if method == "GET" and path == "/stats":
+            return HTTPStatus.OK, self.stats()
+        if path.startswith("/predict/"):
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST with the image as the body")
+            gradcam = query.get("gradcam", ["0"])[0].lower() in ("1", "true", "yes")
+            return HTTPStatus.OK, await self.predict(path[len("/predict/"):], body, gradcam)
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {url.path}")
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    await write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                try:
+                    status, payload = await self.dispatch(request.method, request.target, request.body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+                await write_response(writer, status, payload, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080, unix_path=None):
+        """Serve on a TCP port, or on a Unix socket when ``unix_path`` is given"""
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+def public_model_info(model_name):
+    """Model fields safe to expose over HTTP (no filesystem paths)"""
+    backend, variant = get_backend_config(model_name)
+    return {
+        "name": model_name,
+        "input_size": list(get_model_info(model_name)["input_size"]),
+        "backend": backend,
+        "variant": variant,
+        "exists": check_model_exists(model_name)
+    }
+
+async def read_request(reader):
+    """
+    Read one HTTP/1.1 request from a stream
+
+    Returns:
+        Request, or None when the client closed the connection
+
+    Raises:
+        HTTPError: Malformed request line or Content-Length (400), body
+            over MAX_BODY_BYTES (413)
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = await read_headers(reader)
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length must be a number")
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length must not be negative")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+
+    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    return Request(method, target, headers, body, keep_alive)
+
+async def read_headers(reader):
+    """Header lines up to the blank line, as a dict with lower-case keys"""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+async def write_response(writer, status, payload, keep_alive=True):
+    """Write a JSON response (payload may also be pre-encoded bytes)"""
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+def warm_up(model_names):
+    """
+    Load and trace every model before accepting requests
+
+    Non-Keras backends only warm their own runtime; the Keras weights they
+    need for Grad-CAM are loaded on the first Grad-CAM request, so a worker
+    serving TFLite does not hold a private Keras copy of every model.
+    """
+    from .preload import warmup_model
+
+    for name in model_names:
+        try:
+            backend = get_backend(name)
+            if backend.supports_gradcam and load_model_file(name) is None:
+                raise FileNotFoundError(f"Model not found: {get_model_path(name)}")
+        except (FileNotFoundError, ImportError) as e:
+            print(f"❌ {name}: {e}")
+            continue
+        info = get_model_info(name)
+        last_conv_layer = info.get("last_conv_layer") if backend.supports_gradcam else None
+        warmup_model(backend, last_conv_layer, info["input_size"])
+        print(f"✅ {name} [{backend.describe()}]")
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.serving",
+        description="Micro-batching HTTP inference service for the pothole models"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS), default=None,
+                        help="Models to serve (default: every model whose file exists)")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="Largest dynamic batch (default: %(default)s)")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Longest a request waits for a batch to fill (default: %(default)s)")
+    parser.add_argument("--decode-workers", type=int, default=4, help="Decode threads (default: %(default)s)")
+    parser.add_argument("--no-warmup", action="store_true", help="Load models on first request instead")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    model_names = args.models or [name for name in MODEL_SPECS if check_model_exists(name)]
+    if not model_names:
+        print("❌ No model files found")
+        return 1
+
+    if not args.no_warmup:
+        warm_up(model_names)
+
+    server = InferenceServer(model_names, args.max_batch_size, args.max_wait_ms, args.decode_workers)
+    print(f"Serving {', '.join(model_names)} on http://{args.host}:{args.port} "
+          f"(max batch {args.max_batch_size}, max wait {args.max_wait_ms} ms)")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
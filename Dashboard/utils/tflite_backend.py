@@ -0,0 +1,89 @@
+"""
+TFLite inference backend
+Runs exported dynamic-range / float16 / int8 models with the TFLite interpreter (XNNPACK)
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from .model_loader import get_resolution_path
+
+# Exported variants, written next to the Keras model by export_tflite.py
+TFLITE_VARIANTS = ("dynamic", "float16", "int8")
+
+def get_tflite_path(model_name, variant):
+    """Path of an exported TFLite variant (e.g. final_model_fixed_int8.tflite)"""
+    if variant not in TFLITE_VARIANTS:
+        raise ValueError(f"Unknown TFLite variant: {variant} (expected one of {', '.join(TFLITE_VARIANTS)})")
+    stem, _ = os.path.splitext(get_resolution_path(model_name))
+    return f"{stem}_{variant}.tflite"
+
+def check_tflite_exists(model_name, variant):
+    return os.path.exists(get_tflite_path(model_name, variant))
+
+class TFLiteModel:
+    """
+    Batch predictor over a TFLite interpreter
+
+    The builtin op resolver applies the XNNPACK delegate to float and
+    int8 kernels; ``num_threads`` sets its thread pool. XNNPACK repacks
+    the weights into private memory, so with ``use_xnnpack=False`` (or
+    POTHOLE_TFLITE_XNNPACK=0) the builtin kernels read them in place from
+    the memory-mapped model file instead, which processes then share. The
+    input tensor is resized when the batch size changes, and calls are
+    serialized because an interpreter is not thread-safe.
+    """
+
+    def __init__(self, model_path, num_threads=None, use_xnnpack=None):
+        import tensorflow as tf
+
+        if use_xnnpack is None:
+            use_xnnpack = os.environ.get("POTHOLE_TFLITE_XNNPACK", "1") != "0"
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.use_xnnpack = use_xnnpack
+        resolver = (
+            tf.lite.experimental.OpResolverType.AUTO if use_xnnpack
+            else tf.lite.experimental.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        )
+        self._interpreter = tf.lite.Interpreter(
+            model_path=model_path, num_threads=num_threads, experimental_op_resolver_type=resolver
+        )
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = None
+        self._lock = threading.Lock()
+
+    @property
+    def input_dtype(self):
+        return self._input["dtype"]
+
+    def _quantize(self, img_batch):
+        """Float batch to the interpreter's input dtype (identity for float inputs)"""
+        if self._input["dtype"] == np.float32:
+            return np.asarray(img_batch, dtype=np.float32)
+        scale, zero_point = self._input["quantization"]
+        info = np.iinfo(self._input["dtype"])
+        quantized = np.round(np.asarray(img_batch) / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(self._input["dtype"])
+
+    def _dequantize(self, outputs):
+        if self._output["dtype"] == np.float32:
+            return outputs
+        scale, zero_point = self._output["quantization"]
+        return (outputs.astype(np.float32) - zero_point) * scale
+
+    def predict(self, img_batch):
+        """Class probabilities for a preprocessed (N, h, w, 3) batch"""
+        img_batch = self._quantize(img_batch)
+        with self._lock:
+            if self._batch_size != len(img_batch):
+                self._interpreter.resize_tensor_input(self._input["index"], (len(img_batch), *self._input["shape"][1:]))
+                self._interpreter.allocate_tensors()
+                self._batch_size = len(img_batch)
+            self._interpreter.set_tensor(self._input["index"], img_batch)
+            self._interpreter.invoke()
+            outputs = self._interpreter.get_tensor(self._output["index"]).copy()
+        return self._dequantize(outputs)
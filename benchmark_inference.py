@@ -0,0 +1,84 @@
+"""
+Single-image inference latency benchmark
+Compares Keras model.predict against the cached compiled forward pass
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Dashboard"))
+
+from tensorflow import keras
+from utils.model_loader import (PURECNN_MODEL, RESNET_MODEL, EFFICIENT_MODEL,
+                                INPUT_SHAPE, get_inference_fn)
+
+models_to_benchmark = [
+    ("PureCNN", PURECNN_MODEL),
+    ("ResNet50", RESNET_MODEL),
+    ("EfficientNet", EFFICIENT_MODEL),
+]
+
+N_WARMUP = 5
+N_RUNS = 50
+
+def time_calls(fn, img_array, n_warmup=N_WARMUP, n_runs=N_RUNS):
+    """Median latency of fn(img_array) in milliseconds"""
+    for _ in range(n_warmup):
+        fn(img_array)
+
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        fn(img_array)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def benchmark_model(name, path):
+    """Measure before/after single-image latency for one model"""
+    print(f"\n{'='*60}")
+    print(f"Benchmarking: {name}")
+    print(f"{'='*60}")
+
+    if not os.path.exists(path):
+        print(f"❌ Model not found: {path}")
+        return None
+
+    try:
+        model = keras.models.load_model(path, compile=False)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return None
+
+    img_array = np.random.rand(1, *INPUT_SHAPE).astype(np.float32)
+    infer = get_inference_fn(model)
+
+    predict_ms = time_calls(lambda x: model.predict(x, verbose=0), img_array)
+    compiled_ms = time_calls(lambda x: infer(x).numpy(), img_array)
+
+    print(f"   model.predict:     {predict_ms:8.2f} ms")
+    print(f"   compiled function: {compiled_ms:8.2f} ms")
+    return predict_ms, compiled_ms
+
+def main():
+    print("\n" + "="*60)
+    print("INFERENCE LATENCY BENCHMARK")
+    print("="*60)
+    print(f"Median of {N_RUNS} single-image calls after {N_WARMUP} warmup calls.")
+
+    results = {}
+    for name, path in models_to_benchmark:
+        timing = benchmark_model(name, path)
+        if timing is not None:
+            results[name] = timing
+
+    print("\n" + "="*60)
+    print(f"{'Model':<15}{'predict (ms)':>15}{'compiled (ms)':>15}{'speedup':>10}")
+    print("-"*60)
+    for name, (predict_ms, compiled_ms) in results.items():
+        print(f"{name:<15}{predict_ms:>15.2f}{compiled_ms:>15.2f}{predict_ms / compiled_ms:>9.1f}x")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
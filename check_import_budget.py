@@ -0,0 +1,77 @@
+"""
+Import-time budget check for the Home page
+Runs the top-level imports of Dashboard.py in a fresh interpreter and fails
+if they take too long or pull in TensorFlow / OpenCV / matplotlib
+"""
+
+import ast
+import json
+import os
+import subprocess
+import sys
+
+DASHBOARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Dashboard")
+HOME_PAGE = os.path.join(DASHBOARD_DIR, "Dashboard.py")
+
+# Budget for the Home page imports (seconds, median of N_RUNS fresh interpreters)
+IMPORT_BUDGET_S = 2.5
+N_RUNS = 3
+
+# Modules that only the model pages should load
+FORBIDDEN_MODULES = ["tensorflow", "keras", "cv2", "matplotlib"]
+
+def get_home_imports():
+    """Source of the top-level import statements in Dashboard.py"""
+    with open(HOME_PAGE, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return "\n".join(
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+def measure_once(import_source):
+    """Import time (seconds) and forbidden modules loaded, in a fresh interpreter"""
+    script = (
+        "import json, sys, time\n"
+        f"sys.path.insert(0, {DASHBOARD_DIR!r})\n"
+        "start = time.perf_counter()\n"
+        f"{import_source}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [m for m in {FORBIDDEN_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps([elapsed, loaded]))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=DASHBOARD_DIR, capture_output=True, text=True, check=True
+    )
+    elapsed, loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed, loaded
+
+def main():
+    print("\n" + "="*60)
+    print("HOME PAGE IMPORT BUDGET")
+    print("="*60)
+
+    import_source = get_home_imports()
+    print(import_source)
+
+    timings = []
+    loaded = []
+    for _ in range(N_RUNS):
+        elapsed, loaded = measure_once(import_source)
+        timings.append(elapsed)
+
+    median_s = sorted(timings)[len(timings) // 2]
+    print("\n" + "-"*60)
+    print(f"Import time: {median_s:.2f} s (budget {IMPORT_BUDGET_S:.2f} s)")
+    print(f"Heavy modules loaded: {', '.join(loaded) or 'none'}")
+
+    ok = median_s <= IMPORT_BUDGET_S and not loaded
+    print("="*60)
+    print("✅ Within budget" if ok else "❌ Over budget")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Structured pruning and weight clustering for PureCNN
+Sweeps channel sparsity (and optional clustering), fine-tunes on the local dataset and reports accuracy, size and latency
+"""
+
+import argparse
+import csv
+import gzip
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Dashboard"))
+
+from tensorflow import keras
+from tensorflow.keras import layers
+from distill_student import evaluate, load_split, predict_uint8
+from export_tflite import DEFAULT_DATASET, time_single
+from utils.model_loader import MODEL_SPECS, PROJECT_ROOT, CLASS_NAMES, get_inference_fn
+from utils.preprocessing import get_preprocessor
+
+MODEL_NAME = "PureCNN"
+PRUNED_MODEL = os.path.join(PROJECT_ROOT, "PureCNN", "Model", "final_model_pruned.keras")
+DEFAULT_REPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "allmodel", "compression_sweep.csv")
+
+SPARSITIES = (0.0, 0.25, 0.5, 0.75)
+EPOCHS = 3
+BATCH_SIZE = 32
+LEARNING_RATE = 1e-4
+KMEANS_ITERATIONS = 20
+
+def channel_importance(layer, next_bn=None):
+    """L1 norm of each output filter / unit, scaled by the following BatchNorm"""
+    kernel = layer.get_weights()[0]
+    importance = np.abs(kernel).reshape(-1, kernel.shape[-1]).sum(axis=0)
+    if next_bn is not None:
+        gamma, _, _, variance = next_bn.get_weights()
+        importance *= np.abs(gamma) / np.sqrt(variance + next_bn.epsilon)
+    return importance
+
+def prune_channels(model, sparsity):
+    """
+    Remove the lowest-magnitude channels of every Conv2D / hidden Dense layer
+
+    The same fraction is removed from each layer. The following
+    BatchNorm, the next layer's input weights and, after Flatten, the
+    matching rows of the first Dense kernel are sliced to match, so the
+    result is a smaller Sequential with the same input and output.
+    """
+    if not isinstance(model, keras.Sequential):
+        raise ValueError("Only Sequential models can be pruned")
+
+    model_layers = [l for l in model.layers if not isinstance(l, layers.InputLayer)]
+    output_layer = model_layers[-1]
+    keep = None         # Kept channel indices of the current activation (None = all)
+    rebuilt = []
+
+    for i, layer in enumerate(model_layers):
+        config, weights = layer.get_config(), layer.get_weights()
+
+        if isinstance(layer, (layers.Conv2D, layers.Dense)):
+            kernel, bias = weights
+            if keep is not None:
+                kernel = kernel[..., keep, :]
+            keep = None
+            if layer is not output_layer and sparsity > 0:
+                following = model_layers[i + 1] if i + 1 < len(model_layers) else None
+                next_bn = following if isinstance(following, layers.BatchNormalization) else None
+                importance = channel_importance(layer, next_bn)
+                n_keep = max(int(round(len(importance) * (1 - sparsity))), 1)
+                keep = np.sort(np.argsort(importance)[::-1][:n_keep])
+                kernel, bias = kernel[..., keep], bias[keep]
+                config["filters" if isinstance(layer, layers.Conv2D) else "units"] = len(keep)
+            weights = [kernel, bias]
+        elif isinstance(layer, layers.BatchNormalization) and keep is not None:
+            weights = [w[keep] for w in weights]
+        elif isinstance(layer, layers.Flatten) and keep is not None:
+            channels = layer.input_shape[-1]
+            spatial = int(np.prod(layer.input_shape[1:-1]))
+            keep = (np.arange(spatial)[:, None] * channels + keep[None, :]).ravel()
+
+        config = {k: v for k, v in config.items() if k not in ("batch_input_shape", "input_shape")}
+        rebuilt.append((layer.__class__.from_config(config), weights))
+
+    pruned = keras.Sequential([keras.Input(model.input_shape[1:])], name=f"{model.name}_pruned")
+    for layer, weights in rebuilt:
+        pruned.add(layer)
+        if weights:
+            layer.set_weights(weights)
+    return pruned
+
+def cluster_weights(model, n_clusters):
+    """
+    Share weights within each Conv2D / Dense kernel (1-D k-means)
+
+    Centroids start evenly spaced between the smallest and largest weight
+    and every weight is replaced by its centroid. The model keeps its
+    float32 format; the gain shows up in the compressed size.
+    """
+    for layer in model.layers:
+        if not isinstance(layer, (layers.Conv2D, layers.Dense)):
+            continue
+        kernel, *rest = layer.get_weights()
+        values = kernel.ravel()
+        centroids = np.linspace(values.min(), values.max(), n_clusters)
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.searchsorted((centroids[1:] + centroids[:-1]) / 2, values)
+            sums = np.bincount(assignment, weights=values, minlength=n_clusters)
+            counts = np.bincount(assignment, minlength=n_clusters)
+            centroids = np.where(counts > 0, sums / np.maximum(counts, 1), centroids)
+        assignment = np.searchsorted((centroids[1:] + centroids[:-1]) / 2, values)
+        layer.set_weights([centroids[assignment].reshape(kernel.shape).astype(kernel.dtype), *rest])
+    return model
+
+class ImageSequence(keras.utils.Sequence):
+    """Normalized image batches with one-hot labels"""
+
+    def __init__(self, images, labels, batch_size=BATCH_SIZE, shuffle=True, model_name=MODEL_NAME):
+        super().__init__()
+        self.images = images
+        self.targets = np.eye(len(CLASS_NAMES), dtype=np.float32)[labels]
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.order = np.arange(len(images))
+        self.normalize = get_preprocessor(model_name)
+        self.on_epoch_end()
+
+    def __len__(self):
+        return int(np.ceil(len(self.images) / self.batch_size))
+
+    def __getitem__(self, index):
+        rows = self.order[index * self.batch_size:(index + 1) * self.batch_size]
+        batch = self.images[rows]
+        return self.normalize(batch, np.empty(batch.shape, dtype=np.float32)), self.targets[rows]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.order)
+
+def fine_tune(model, splits, epochs, batch_size, learning_rate, model_name=MODEL_NAME):
+    if epochs <= 0:
+        return model
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate), loss="categorical_crossentropy",
+                  metrics=["accuracy"])
+    (train_images, train_labels, _), (valid_images, valid_labels, _) = splits["train"], splits["valid"]
+    model.fit(
+        ImageSequence(train_images, train_labels, batch_size, model_name=model_name),
+        validation_data=ImageSequence(valid_images, valid_labels, batch_size, shuffle=False, model_name=model_name),
+        epochs=epochs,
+        callbacks=[keras.callbacks.EarlyStopping(monitor="val_accuracy", mode="max", patience=2,
+                                                 restore_best_weights=True)],
+        verbose=2
+    )
+
+    # Drop the optimizer state so the saved model holds weights only
+    stripped = keras.models.clone_model(model)
+    stripped.set_weights(model.get_weights())
+    return stripped
+
+def file_sizes(model):
+    """Saved .keras size and its gzip size in MB"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.keras")
+        model.save(path)
+        with open(path, "rb") as f:
+            data = f.read()
+    return len(data) / 1024 / 1024, len(gzip.compress(data, compresslevel=6)) / 1024 / 1024
+
+def sweep_row(model, sparsity, clusters, test_images, test_labels):
+    metrics = evaluate(predict_uint8(model, MODEL_NAME, test_images), test_labels)
+    batch = get_preprocessor(MODEL_NAME)(test_images[:1], np.empty(test_images[:1].shape, dtype=np.float32))
+    infer = get_inference_fn(model)
+    size_mb, gzip_mb = file_sizes(model)
+    return {
+        "sparsity": sparsity,
+        "clusters": clusters or "",
+        "parameters": model.count_params(),
+        "size_mb": round(size_mb, 2),
+        "gzip_mb": round(gzip_mb, 2),
+        "accuracy": metrics["Accuracy"],
+        "f1": metrics["F1-Score"],
+        "latency_ms": round(time_single(lambda x: infer(x).numpy(), batch), 2)
+    }
+
+def print_table(rows):
+    print("\n" + "="*84)
+    print(f"{'Sparsity':>9}{'Clusters':>10}{'Params':>13}{'MB':>9}{'gzip MB':>9}"
+          f"{'Accuracy':>10}{'F1':>8}{'ms':>8}{'Speedup':>9}")
+    print("-"*84)
+    base = rows[0]["latency_ms"]
+    for row in rows:
+        print(f"{row['sparsity']:>9.0%}{str(row['clusters'] or '-'):>10}{row['parameters']:>13,}"
+              f"{row['size_mb']:>9.2f}{row['gzip_mb']:>9.2f}{row['accuracy']:>9.2f}%{row['f1']:>8.2f}"
+              f"{row['latency_ms']:>8.2f}{base / row['latency_ms']:>8.1f}x")
+    print("="*84)
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and cluster PureCNN, sweeping sparsity")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET,
+                        help="Dataset root with train/, valid/ and test/ folders (default: %(default)s)")
+    parser.add_argument("--sparsities", nargs="+", type=float, default=list(SPARSITIES),
+                        help="Fraction of channels removed per layer (default: %(default)s)")
+    parser.add_argument("--clusters", type=int, default=None, help="Also cluster each kernel into N shared values")
+    parser.add_argument("--epochs", type=int, default=EPOCHS, help="Fine-tuning epochs per sparsity")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE)
+    parser.add_argument("--export", type=float, default=None, metavar="SPARSITY",
+                        help=f"Save the model at this sparsity to {os.path.relpath(PRUNED_MODEL, PROJECT_ROOT)}")
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="Sweep CSV (default: %(default)s)")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("PURECNN PRUNING & CLUSTERING")
+    print("="*60)
+
+    path = MODEL_SPECS[MODEL_NAME]["path"]
+    if not os.path.exists(path):
+        print(f"❌ Model not found: {path}")
+        return 1
+    if args.export is not None and args.export not in args.sparsities:
+        args.sparsities.append(args.export)
+
+    splits = {split: load_split(args.dataset, split) for split in ("train", "valid", "test")}
+    for split, (images, _, _) in splits.items():
+        if images is None:
+            print(f"❌ No labeled images in {os.path.join(args.dataset, split)}")
+            return 1
+        print(f"{split}: {len(images)} images")
+    test_images, test_labels, _ = splits["test"]
+
+    rows = []
+    for sparsity in sorted(set(args.sparsities)):
+        print(f"\n{'='*60}")
+        print(f"Sparsity {sparsity:.0%}")
+        print(f"{'='*60}")
+        model = keras.models.load_model(path, compile=False)
+        if sparsity > 0:
+            model = fine_tune(prune_channels(model, sparsity), splits, args.epochs,
+                              args.batch_size, args.learning_rate)
+        rows.append(sweep_row(model, sparsity, None, test_images, test_labels))
+        print(f"✅ {rows[-1]['parameters']:,} parameters · accuracy {rows[-1]['accuracy']:.2f}%")
+
+        if args.clusters:
+            model = cluster_weights(model, args.clusters)
+            rows.append(sweep_row(model, sparsity, args.clusters, test_images, test_labels))
+            print(f"✅ Clustered ({args.clusters}) · accuracy {rows[-1]['accuracy']:.2f}% · "
+                  f"gzip {rows[-1]['gzip_mb']:.2f} MB")
+
+        if sparsity == args.export:
+            model.save(PRUNED_MODEL)
+            print(f"✅ Saved to {PRUNED_MODEL}")
+
+    print_table(rows)
+    with open(args.report, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n✅ Sweep saved to {args.report}")
+    if args.export is not None:
+        print("Next: python fold_batchnorm.py --source PureCNN/Model/final_model_pruned.keras")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
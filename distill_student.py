@@ -0,0 +1,287 @@
+"""
+Distill ResNet50 and EfficientNet into a compact depthwise-separable student
+Caches teacher soft labels locally, trains StudentCNN and appends its row to allmodel/comparison.csv
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Dashboard"))
+
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from export_tflite import DEFAULT_DATASET, find_images, time_single
+from utils.decode import decode_image, BATCH_MAX_SIDE
+from utils.model_loader import MODEL_SPECS, CLASS_NAMES, INPUT_SHAPE, PROJECT_ROOT, get_inference_fn
+from utils.preprocessing import get_preprocessor, load_batch
+
+STUDENT_NAME = "StudentCNN"
+TEACHERS = ["ResNet50", "EfficientNet"]
+CACHE_DIR = os.path.join(PROJECT_ROOT, STUDENT_NAME, "cache")
+COMPARISON_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "allmodel", "comparison.csv")
+
+# Model names used in comparison.csv
+COMPARISON_NAMES = {"EfficientNet": "EfficientNetB0"}
+
+EPOCHS = 15
+BATCH_SIZE = 32
+LEARNING_RATE = 0.001
+TEMPERATURE = 4.0
+ALPHA = 0.3     # Weight of the hard-label loss (1 - ALPHA on the teachers)
+
+def build_student(width=32, dropout=0.2):
+    """
+    Depthwise-separable student CNN
+
+    A strided stem conv followed by four separable conv blocks, global
+    average pooling and a linear classifier. Returns the probability
+    model; the training graph uses the logits layer underneath.
+    """
+    inputs = keras.Input(INPUT_SHAPE)
+    x = layers.Conv2D(width, 3, strides=2, padding="same", use_bias=False, name="stem_conv")(inputs)
+    x = layers.BatchNormalization(name="stem_bn")(x)
+    x = layers.ReLU(name="stem_relu")(x)
+
+    for i, filters in enumerate((width * 2, width * 4, width * 8, width * 8)):
+        x = layers.SeparableConv2D(filters, 3, padding="same", use_bias=False, name=f"block{i + 1}_sepconv")(x)
+        x = layers.BatchNormalization(name=f"block{i + 1}_bn")(x)
+        x = layers.ReLU(name="top_relu" if i == 3 else f"block{i + 1}_relu")(x)
+        if i < 3:
+            x = layers.MaxPooling2D(name=f"block{i + 1}_pool")(x)
+
+    x = layers.GlobalAveragePooling2D(name="avg_pool")(x)
+    x = layers.Dropout(dropout, name="dropout")(x)
+    logits = layers.Dense(len(CLASS_NAMES), name="logits")(x)
+    outputs = layers.Softmax(name="probabilities")(logits)
+    return keras.Model(inputs, outputs, name="student_cnn")
+
+def soften(probs, temperature):
+    """Teacher probabilities at a temperature (softmax(logits / T) == p^(1/T) renormalized)"""
+    softened = np.power(np.clip(probs, 1e-7, 1.0), 1.0 / temperature)
+    return softened / softened.sum(axis=1, keepdims=True)
+
+def distillation_loss(alpha, temperature):
+    """
+    Hinton distillation loss over the student logits
+
+    ``y_true`` packs the one-hot label and the softened teacher
+    distribution side by side, so Keras can feed both through ``fit``.
+    """
+    num_classes = len(CLASS_NAMES)
+
+    def loss(y_true, logits):
+        hard, soft = y_true[:, :num_classes], y_true[:, num_classes:]
+        hard_loss = keras.losses.categorical_crossentropy(hard, logits, from_logits=True)
+        soft_loss = keras.losses.kl_divergence(soft, tf.nn.softmax(logits / temperature))
+        return alpha * hard_loss + (1 - alpha) * temperature ** 2 * soft_loss
+
+    return loss
+
+def hard_accuracy(y_true, logits):
+    return keras.metrics.categorical_accuracy(y_true[:, :len(CLASS_NAMES)], logits)
+
+def load_split(dataset, split, target_size=INPUT_SHAPE[:2]):
+    """uint8 images, labels and paths of one dataset split, resized to (width, height)"""
+    items = [(path, label) for path, label in find_images(os.path.join(dataset, split)) if label is not None]
+    if not items:
+        return None, None, []
+    images = [decode_image(path, max_side=BATCH_MAX_SIDE) for path, _ in items]
+    return load_batch(images, target_size), np.array([label for _, label in items]), [path for path, _ in items]
+
+def cache_key(paths, teachers):
+    """Changes when an image or a teacher model changes"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(f"{os.path.basename(path)}:{os.path.getsize(path)}:{os.path.getmtime(path)}".encode())
+    for name in teachers:
+        digest.update(f"{name}:{os.path.getmtime(MODEL_SPECS[name]['path'])}".encode())
+    return digest.hexdigest()
+
+def predict_uint8(model, model_name, batch_u8, chunk=BATCH_SIZE):
+    """Probabilities for a uint8 batch, normalized with the model's own preprocessing"""
+    infer = get_inference_fn(model)
+    normalize = get_preprocessor(model_name)
+    outputs = []
+    for i in range(0, len(batch_u8), chunk):
+        part = batch_u8[i:i + chunk]
+        outputs.append(infer(normalize(part, np.empty(part.shape, dtype=np.float32))).numpy())
+    return np.concatenate(outputs)
+
+def teacher_soft_labels(split, images, paths, teachers, teacher_models):
+    """Mean teacher probabilities for a split, cached under StudentCNN/cache"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    cache_path = os.path.join(CACHE_DIR, f"soft_labels_{split}.npz")
+    key = cache_key(paths, teachers)
+
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if str(cached["key"]) == key:
+            print(f"✅ {split}: soft labels loaded from cache")
+            return cached["probs"]
+
+    probs = np.mean([predict_uint8(teacher_models[name], name, images) for name in teachers], axis=0)
+    np.savez(cache_path, key=key, probs=probs)
+    print(f"✅ {split}: soft labels from {', '.join(teachers)} cached to {cache_path}")
+    return probs
+
+class DistillationSequence(keras.utils.Sequence):
+    """Batches of normalized images with (one-hot | soft label) targets"""
+
+    def __init__(self, images, labels, soft, batch_size=BATCH_SIZE, shuffle=True):
+        super().__init__()
+        self.images = images
+        self.targets = np.concatenate([np.eye(len(CLASS_NAMES))[labels], soft], axis=1).astype(np.float32)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.order = np.arange(len(images))
+        self.normalize = get_preprocessor(STUDENT_NAME)
+        self.on_epoch_end()
+
+    def __len__(self):
+        return int(np.ceil(len(self.images) / self.batch_size))
+
+    def __getitem__(self, index):
+        rows = self.order[index * self.batch_size:(index + 1) * self.batch_size]
+        batch = self.images[rows]
+        return self.normalize(batch, np.empty(batch.shape, dtype=np.float32)), self.targets[rows]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.order)
+
+def evaluate(probs, labels):
+    """Comparison metrics in percent (POTHOLE is the positive class)"""
+    preds = probs.argmax(axis=1)
+    metrics = {
+        "Accuracy": 100 * accuracy_score(labels, preds),
+        "Precision": 100 * precision_score(labels, preds, zero_division=0),
+        "Recall": 100 * recall_score(labels, preds, zero_division=0),
+        "F1-Score": 100 * f1_score(labels, preds, zero_division=0)
+    }
+    metrics = {k: round(v, 2) for k, v in metrics.items()}
+    metrics["Average"] = float(np.mean(list(metrics.values())))
+    return metrics
+
+def measure(model, model_name, images):
+    """Single-image latency (ms) and file size (MB) of a registered model"""
+    batch = get_preprocessor(model_name)(images[:1], np.empty(images[:1].shape, dtype=np.float32))
+    latency = time_single(lambda x: get_inference_fn(model)(x).numpy(), batch)
+    size = os.path.getsize(MODEL_SPECS[model_name]["path"]) / 1024 / 1024
+    return round(latency, 2), round(size, 2)
+
+def update_comparison(csv_path, row, measurements):
+    """Append (or replace) the student row and fill latency / size columns"""
+    df = pd.read_csv(csv_path) if os.path.exists(csv_path) else pd.DataFrame(columns=list(row))
+    df = df[df["Model"] != row["Model"]]
+    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+
+    for column in ("Latency (ms)", "Size (MB)"):
+        if column not in df:
+            df[column] = np.nan
+    for name, (latency, size) in measurements.items():
+        mask = df["Model"] == COMPARISON_NAMES.get(name, name)
+        df.loc[mask, "Latency (ms)"] = latency
+        df.loc[mask, "Size (MB)"] = size
+
+    df.to_csv(csv_path, index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the teacher models into StudentCNN")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET,
+                        help="Dataset root with train/, valid/ and test/ folders (default: %(default)s)")
+    parser.add_argument("--teachers", nargs="+", choices=TEACHERS, default=TEACHERS)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE)
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="Hard-label loss weight (default: %(default)s)")
+    parser.add_argument("--width", type=int, default=32, help="Stem filters; blocks use 2x / 4x / 8x (default: %(default)s)")
+    parser.add_argument("--report", default=COMPARISON_CSV, help="Comparison CSV (default: %(default)s)")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("KNOWLEDGE DISTILLATION")
+    print("="*60)
+
+    missing = [name for name in args.teachers if not os.path.exists(MODEL_SPECS[name]["path"])]
+    if missing:
+        print(f"❌ Teacher model not found: {', '.join(MODEL_SPECS[name]['path'] for name in missing)}")
+        return 1
+
+    splits = {split: load_split(args.dataset, split) for split in ("train", "valid", "test")}
+    for split, (images, _, _) in splits.items():
+        if images is None:
+            print(f"❌ No labeled images in {os.path.join(args.dataset, split)}")
+            return 1
+        print(f"{split}: {len(images)} images")
+
+    teacher_models = {name: keras.models.load_model(MODEL_SPECS[name]["path"], compile=False)
+                      for name in args.teachers}
+    soft = {split: teacher_soft_labels(split, images, paths, args.teachers, teacher_models)
+            for split, (images, _, paths) in splits.items() if split != "test"}
+
+    # Training graph ends at the logits; the saved model ends at the softmax
+    student = build_student(args.width)
+    trainer = keras.Model(student.input, student.get_layer("logits").output)
+    trainer.compile(
+        optimizer=keras.optimizers.Adam(args.learning_rate),
+        loss=distillation_loss(args.alpha, args.temperature),
+        metrics=[hard_accuracy]
+    )
+    print(f"\nStudent: {student.count_params():,} parameters "
+          f"(T={args.temperature}, alpha={args.alpha})")
+
+    train_images, train_labels, _ = splits["train"]
+    valid_images, valid_labels, _ = splits["valid"]
+    trainer.fit(
+        DistillationSequence(train_images, train_labels, soften(soft["train"], args.temperature), args.batch_size),
+        validation_data=DistillationSequence(valid_images, valid_labels, soften(soft["valid"], args.temperature),
+                                             args.batch_size, shuffle=False),
+        epochs=args.epochs,
+        callbacks=[
+            keras.callbacks.EarlyStopping(monitor="val_hard_accuracy", mode="max", patience=3,
+                                          restore_best_weights=True, verbose=1),
+            keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=2, min_lr=1e-7, verbose=1)
+        ],
+        verbose=1
+    )
+
+    out_path = MODEL_SPECS[STUDENT_NAME]["path"]
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    student.save(out_path)
+    print(f"✅ Student saved to {out_path}")
+
+    # Test-set comparison against every other model available locally
+    test_images, test_labels, _ = splits["test"]
+    models = {
+        name: teacher_models[name] if name in teacher_models else keras.models.load_model(spec["path"], compile=False)
+        for name, spec in MODEL_SPECS.items()
+        if name != STUDENT_NAME and os.path.exists(spec["path"])
+    }
+    models[STUDENT_NAME] = student
+    results, measurements = {}, {}
+    for name, model in models.items():
+        results[name] = evaluate(predict_uint8(model, name, test_images), test_labels)
+        measurements[name] = measure(model, name, test_images)
+
+    print("\n" + "="*60)
+    print(f"{'Model':<14}{'Accuracy':>10}{'F1':>8}{'ms':>9}{'MB':>9}{'Params':>12}")
+    print("-"*60)
+    for name, model in models.items():
+        latency, size = measurements[name]
+        print(f"{name:<14}{results[name]['Accuracy']:>9.2f}%{results[name]['F1-Score']:>8.2f}"
+              f"{latency:>9.2f}{size:>9.2f}{model.count_params():>12,}")
+    print("="*60)
+
+    update_comparison(args.report, {"Model": STUDENT_NAME, **results[STUDENT_NAME]}, measurements)
+    print(f"\n✅ Comparison row appended to {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
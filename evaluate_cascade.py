@@ -0,0 +1,126 @@
+"""
+Sweep the confidence threshold of a model cascade
+Reports accuracy, escalation rate and expected CPU latency per threshold against each stage model alone
+"""
+
+import argparse
+import csv
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Dashboard"))
+
+from tensorflow import keras
+from distill_student import evaluate, load_split, predict_uint8
+from export_tflite import DEFAULT_DATASET, time_single
+from utils.cascade import DEFAULT_CASCADE, parse_stages
+from utils.model_loader import get_inference_fn, get_resolution_path
+from utils.preprocessing import get_preprocessor, get_target_size
+
+DEFAULT_REPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "allmodel", "cascade_report.csv")
+THRESHOLDS = (0.6, 0.7, 0.8, 0.9, 0.95)
+
+def simulate(stage_probs, threshold):
+    """
+    Cascade outcome with the same threshold on every gating stage
+
+    Returns:
+        (probabilities, fraction of images reaching each stage)
+    """
+    probs = stage_probs[-1].copy()
+    pending = np.ones(len(probs), dtype=bool)
+    reached = []
+    for preds in stage_probs[:-1]:
+        reached.append(pending.mean())
+        accept = pending & (preds.max(axis=1) >= threshold)
+        probs[accept] = preds[accept]
+        pending &= ~accept
+    reached.append(pending.mean())
+    return probs, reached
+
+def print_table(rows):
+    print("\n" + "="*76)
+    print(f"{'Configuration':<30}{'Accuracy':>10}{'F1':>8}{'Escalated':>11}{'ms/image':>10}{'Speedup':>9}")
+    print("-"*76)
+    for row in rows:
+        print(f"{row['configuration']:<30}{row['accuracy']:>9.2f}%{row['f1']:>8.2f}"
+              f"{row['escalated']:>10.1%}{row['latency_ms']:>10.2f}{row['speedup']:>8.1f}x")
+    print("="*76)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep cascade thresholds on the test split")
+    parser.add_argument("--stages", default=os.environ.get("POTHOLE_CASCADE") or DEFAULT_CASCADE,
+                        help="Stage models in order, e.g. PureCNN,ResNet50 (default: %(default)s)")
+    parser.add_argument("--thresholds", nargs="+", type=float, default=list(THRESHOLDS),
+                        help="Confidence thresholds to sweep (default: %(default)s)")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET,
+                        help="Dataset root with a test/ folder (default: %(default)s)")
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="Report CSV (default: %(default)s)")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("CASCADE THRESHOLD SWEEP")
+    print("="*60)
+
+    stage_names = [stage.model_name for stage in parse_stages(args.stages)]
+    if len(stage_names) < 2:
+        parser.error("--stages needs at least two models")
+    missing = [name for name in stage_names if not os.path.exists(get_resolution_path(name))]
+    if missing:
+        print(f"❌ Model not found: {', '.join(missing)}")
+        return 1
+
+    # Every stage scores the whole test split once; thresholds are then applied offline
+    splits, stage_probs, latencies, labels = {}, [], [], None
+    for name in stage_names:
+        size = get_target_size(name)
+        if size not in splits:
+            splits[size] = load_split(args.dataset, "test", size)
+        images, labels, _ = splits[size]
+        if images is None:
+            print(f"❌ No labeled images in {os.path.join(args.dataset, 'test')}")
+            return 1
+
+        model = keras.models.load_model(get_resolution_path(name), compile=False)
+        stage_probs.append(predict_uint8(model, name, images))
+        batch = get_preprocessor(name)(images[:1], np.empty(images[:1].shape, dtype=np.float32))
+        infer = get_inference_fn(model)
+        latencies.append(time_single(lambda x: infer(x).numpy(), batch))
+        print(f"✅ {name}: {len(images)} test images · {latencies[-1]:.2f} ms/image")
+
+    rows = []
+    for name, probs, latency in zip(stage_names, stage_probs, latencies):
+        metrics = evaluate(probs, labels)
+        rows.append({"configuration": f"{name} only", "threshold": "", "accuracy": metrics["Accuracy"],
+                     "f1": metrics["F1-Score"], "escalated": 0.0, "latency_ms": round(latency, 2)})
+
+    for threshold in sorted(args.thresholds):
+        probs, reached = simulate(stage_probs, threshold)
+        metrics = evaluate(probs, labels)
+        rows.append({
+            "configuration": f"Cascade @ {threshold:g}",
+            "threshold": threshold,
+            "accuracy": metrics["Accuracy"],
+            "f1": metrics["F1-Score"],
+            "escalated": round(reached[1], 4),
+            # Expected cost: each stage's latency times the share of images reaching it
+            "latency_ms": round(float(np.dot(reached, latencies)), 2)
+        })
+
+    final_latency = rows[len(stage_names) - 1]["latency_ms"]
+    for row in rows:
+        row["speedup"] = round(final_latency / row["latency_ms"], 2)
+
+    print_table(rows)
+    with open(args.report, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n✅ Report saved to {args.report}")
+    print(f"\nUse a threshold in the Dashboard with POTHOLE_CASCADE="
+          f"{':<threshold>,'.join(stage_names)}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
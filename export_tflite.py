@@ -0,0 +1,209 @@
+"""
+Export TFLite variants of each model
+Writes dynamic-range, float16 and full-int8 models and compares accuracy and latency against Keras
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Dashboard"))
+
+import tensorflow as tf
+from tensorflow import keras
+from utils.decode import decode_image, BATCH_MAX_SIDE
+from utils.model_loader import MODEL_SPECS, CLASS_NAMES, PROJECT_ROOT, get_inference_fn, get_input_size, get_resolution_path
+from utils.preprocessing import preprocess_batch
+from utils.tflite_backend import TFLITE_VARIANTS, TFLiteModel, get_tflite_path
+
+# Dataset layout used by the training notebooks: <split>/POTHOLE_*.jpg, <split>/NOPOTHOLE_*.jpg
+DEFAULT_DATASET = os.path.join(PROJECT_ROOT, "DatasetUAP")
+DEFAULT_REPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "allmodel", "tflite_report.csv")
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+
+CALIBRATION_SIZE = 200
+EVAL_SIZE = 256
+N_WARMUP = 5
+N_RUNS = 50
+
+def find_images(folder):
+    """(path, label index or None) for images in a folder, labeled by file name prefix"""
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(folder, pattern)))
+    items = []
+    for path in paths:
+        prefix = os.path.basename(path).split("_")[0].upper()
+        items.append((path, CLASS_NAMES.index(prefix) if prefix in CLASS_NAMES else None))
+    return items
+
+def sample(items, n, seed=0):
+    """Reproducible random subset of at most n items"""
+    if len(items) <= n:
+        return items
+    rng = np.random.default_rng(seed)
+    return [items[i] for i in sorted(rng.choice(len(items), n, replace=False))]
+
+def load_batch(items, model_name):
+    """Preprocessed float32 batch for a list of (path, label) items"""
+    images = [decode_image(path, max_side=BATCH_MAX_SIDE) for path, _ in items]
+    return preprocess_batch(images, model_name)
+
+def convert(model, variant, calibration=None):
+    """Convert a Keras model to a TFLite flatbuffer"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        def representative_dataset():
+            for img in calibration:
+                yield [img[None]]
+
+        # Integer-only kernels; input/output stay float32 so the backend
+        # feeds the same preprocessed batch as the Keras model
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    return converter.convert()
+
+def predict_all(predict, batch, chunk=32):
+    return np.concatenate([predict(batch[i:i + chunk]) for i in range(0, len(batch), chunk)])
+
+def time_single(predict, img_batch, n_warmup=N_WARMUP, n_runs=N_RUNS):
+    """Median single-image latency in milliseconds"""
+    single = img_batch[:1]
+    for _ in range(n_warmup):
+        predict(single)
+
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        predict(single)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def compare(name, variant, size_mb, preds, reference, labels, latency_ms):
+    """Report row for one variant against the Keras predictions"""
+    labeled = labels >= 0
+    return {
+        "model": name,
+        "variant": variant,
+        "size_mb": round(size_mb, 2),
+        "accuracy": float(np.mean(preds.argmax(1)[labeled] == labels[labeled])) if labeled.any() else None,
+        "agreement": float(np.mean(preds.argmax(1) == reference.argmax(1))),
+        "max_prob_delta": float(np.max(np.abs(preds - reference))),
+        "latency_ms": round(latency_ms, 2)
+    }
+
+def export_model(name, calibration_items, eval_items, num_threads=None):
+    """Export every variant of one model and compare it with the Keras original"""
+    path = get_resolution_path(name)
+    print(f"\n{'='*60}")
+    print(f"Exporting: {name}")
+    print(f"{'='*60}")
+
+    if not os.path.exists(path):
+        print(f"❌ Model not found: {path}")
+        return []
+
+    try:
+        model = keras.models.load_model(path, compile=False)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return []
+
+    calibration = load_batch(calibration_items, name) if calibration_items else None
+    if eval_items:
+        eval_batch = load_batch(eval_items, name)
+        labels = np.array([-1 if label is None else label for _, label in eval_items])
+    else:
+        # No local images: synthetic inputs still show fidelity and latency
+        rng = np.random.default_rng(0)
+        images = rng.integers(0, 256, (32, *get_input_size(name)), dtype=np.uint8)
+        eval_batch = preprocess_batch([keras.utils.array_to_img(img) for img in images], name)
+        labels = np.full(len(eval_batch), -1)
+        print("⚠️ No evaluation images found, using synthetic inputs (no accuracy)")
+
+    infer = get_inference_fn(model)
+    keras_predict = lambda x: infer(x).numpy()
+    reference = predict_all(keras_predict, eval_batch)
+    rows = [compare(name, "keras", os.path.getsize(path) / 1024 / 1024, reference, reference, labels,
+                    time_single(keras_predict, eval_batch))]
+    print(f"✅ keras: {rows[-1]['latency_ms']:.2f} ms")
+
+    for variant in TFLITE_VARIANTS:
+        if variant == "int8" and calibration is None:
+            print("⚠️ int8: skipped (no calibration images)")
+            continue
+        try:
+            flatbuffer = convert(model, variant, calibration)
+        except Exception as e:
+            print(f"❌ {variant}: {str(e)}")
+            continue
+
+        out_path = get_tflite_path(name, variant)
+        with open(out_path, "wb") as f:
+            f.write(flatbuffer)
+
+        tflite_model = TFLiteModel(out_path, num_threads=num_threads)
+        preds = predict_all(tflite_model.predict, eval_batch)
+        rows.append(compare(name, variant, len(flatbuffer) / 1024 / 1024, preds, reference, labels,
+                            time_single(tflite_model.predict, eval_batch)))
+        print(f"✅ {variant}: {out_path} ({rows[-1]['size_mb']:.2f} MB, {rows[-1]['latency_ms']:.2f} ms)")
+
+    return rows
+
+def print_table(rows):
+    print("\n" + "="*92)
+    print(f"{'Model':<14}{'Variant':<10}{'Size MB':>9}{'Accuracy':>10}{'ΔAcc':>8}"
+          f"{'Agree':>8}{'Max|Δp|':>9}{'ms':>9}{'Speedup':>9}")
+    print("-"*92)
+    for row in rows:
+        base = next(r for r in rows if r["model"] == row["model"] and r["variant"] == "keras")
+        accuracy = "n/a" if row["accuracy"] is None else f"{row['accuracy']:.2%}"
+        delta = "n/a" if row["accuracy"] is None else f"{100 * (row['accuracy'] - base['accuracy']):+.2f}"
+        print(f"{row['model']:<14}{row['variant']:<10}{row['size_mb']:>9.2f}{accuracy:>10}{delta:>8}"
+              f"{row['agreement']:>8.1%}{row['max_prob_delta']:>9.4f}{row['latency_ms']:>9.2f}"
+              f"{base['latency_ms'] / row['latency_ms']:>8.1f}x")
+    print("="*92)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export TFLite variants and compare them with Keras")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET,
+                        help="Dataset root with train/ and test/ folders (default: %(default)s)")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS), default=list(MODEL_SPECS))
+    parser.add_argument("--calibration-size", type=int, default=CALIBRATION_SIZE)
+    parser.add_argument("--eval-size", type=int, default=EVAL_SIZE)
+    parser.add_argument("--threads", type=int, default=None, help="TFLite interpreter threads")
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="CSV report path (default: %(default)s)")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("TFLITE EXPORT")
+    print("="*60)
+
+    calibration_items = sample(find_images(os.path.join(args.dataset, "train")), args.calibration_size)
+    eval_items = sample(find_images(os.path.join(args.dataset, "test")), args.eval_size, seed=1)
+    print(f"Calibration images: {len(calibration_items)} · evaluation images: {len(eval_items)}")
+
+    rows = []
+    for name in args.models:
+        rows.extend(export_model(name, calibration_items, eval_items, args.threads))
+
+    if not rows:
+        print("\n⚠️ Nothing was exported.")
+        return
+
+    print_table(rows)
+    with open(args.report, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n✅ Report saved to {args.report}")
+
+if __name__ == "__main__":
+    main()
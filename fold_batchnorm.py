@@ -0,0 +1,127 @@
+"""
+Export an inference-only PureCNN with BatchNorm folded and Dropout stripped
+The Dashboard loads the folded model instead of the trained one once it exists
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Dashboard"))
+
+from tensorflow import keras
+from export_tflite import DEFAULT_DATASET, find_images, sample, load_batch, predict_all, time_single
+from utils.bn_folding import ChannelShift, fold_batchnorm
+from utils.model_loader import MODEL_SPECS, INPUT_SHAPE, get_inference_fn
+from utils.preprocessing import preprocess_batch
+
+# Largest allowed |Δp| between the trained and the folded model
+TOLERANCE = 1e-4
+SAMPLE_SIZE = 64
+BATCH_SIZE = 32
+
+def load_samples(dataset, model_name, n):
+    """Preprocessed test images, or synthetic inputs when the dataset is missing"""
+    items = sample(find_images(os.path.join(dataset, "test")), n, seed=1)
+    if items:
+        return load_batch(items, model_name)
+
+    print("⚠️ No test images found, using synthetic inputs")
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, (n, *INPUT_SHAPE), dtype=np.uint8)
+    return preprocess_batch([keras.utils.array_to_img(img) for img in images], model_name)
+
+def time_batch(predict, batch, n_runs=10):
+    """Median per-image latency in milliseconds at BATCH_SIZE"""
+    chunk = batch[:BATCH_SIZE]
+    predict(chunk)
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        predict(chunk)
+        timings.append((time.perf_counter() - start) * 1000 / len(chunk))
+    return float(np.median(timings))
+
+def fold_model(model_name, dataset, sample_size, tolerance, source=None):
+    spec = MODEL_SPECS[model_name]
+    source = source or spec["path"]
+    print(f"\n{'='*60}")
+    print(f"Folding: {model_name} ({source})")
+    print(f"{'='*60}")
+
+    if not os.path.exists(source):
+        print(f"❌ Model not found: {source}")
+        return False
+
+    try:
+        model = keras.models.load_model(source, compile=False)
+        folded, n_folded = fold_batchnorm(model)
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return False
+
+    n_batchnorm = sum(isinstance(l, keras.layers.BatchNormalization) for l in model.layers)
+    n_dropout = sum(isinstance(l, keras.layers.Dropout) for l in model.layers)
+    n_shift = sum(isinstance(l, ChannelShift) for l in folded.layers)
+    print(f"✅ Folded {n_folded}/{n_batchnorm} BatchNorm layers, removed {n_dropout} Dropout layers")
+    print(f"   Layers: {len(model.layers)} → {len(folded.layers)} ({n_shift} per-channel offsets kept)")
+
+    # Output parity on sample inputs
+    batch = load_samples(dataset, model_name, sample_size)
+    infer, infer_folded = get_inference_fn(model), get_inference_fn(folded)
+    predict = lambda x: infer(x).numpy()
+    predict_folded = lambda x: infer_folded(x).numpy()
+    reference, preds = predict_all(predict, batch), predict_all(predict_folded, batch)
+    max_delta = float(np.max(np.abs(preds - reference)))
+    agreement = float(np.mean(preds.argmax(1) == reference.argmax(1)))
+    print(f"   Parity on {len(batch)} inputs: max |Δp| {max_delta:.2e} · agreement {agreement:.1%}")
+    if max_delta > tolerance:
+        print(f"❌ Outputs differ by more than {tolerance:g}, not saving")
+        return False
+
+    # Latency
+    single, single_folded = time_single(predict, batch), time_single(predict_folded, batch)
+    per_image, per_image_folded = time_batch(predict, batch), time_batch(predict_folded, batch)
+    print(f"   Single image:    {single:.2f} ms → {single_folded:.2f} ms ({single / single_folded:.2f}x)")
+    print(f"   Batch {BATCH_SIZE} / image: {per_image:.2f} ms → {per_image_folded:.2f} ms "
+          f"({per_image / per_image_folded:.2f}x)")
+
+    out_path = spec["inference_path"]
+    print(f"Saving to: {out_path}")
+    folded.save(out_path)
+    keras.models.load_model(out_path, custom_objects={"ChannelShift": ChannelShift})
+    print("✅ Verification successful!")
+    return True
+
+def main():
+    foldable = [name for name, spec in MODEL_SPECS.items() if spec.get("inference_path")]
+    parser = argparse.ArgumentParser(description="Fold BatchNorm into an inference-only model")
+    parser.add_argument("--models", nargs="+", choices=foldable, default=foldable)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET,
+                        help="Dataset root with a test/ folder (default: %(default)s)")
+    parser.add_argument("--samples", type=int, default=SAMPLE_SIZE, help="Parity check inputs")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Largest allowed probability difference (default: %(default)s)")
+    parser.add_argument("--source", default=None,
+                        help="Model to fold instead of the trained one (e.g. the output of compress_purecnn.py)")
+    args = parser.parse_args()
+    if args.source and len(args.models) != 1:
+        parser.error("--source needs exactly one model in --models")
+
+    print("\n" + "="*60)
+    print("BATCHNORM FOLDING")
+    print("="*60)
+
+    success_count = sum(fold_model(name, args.dataset, args.samples, args.tolerance, args.source)
+                        for name in args.models)
+
+    print("\n" + "="*60)
+    print(f"SUMMARY: {success_count}/{len(args.models)} models folded")
+    print("="*60)
+    if success_count:
+        print("\nThe Dashboard now loads the folded model (set POTHOLE_FOLDED=0 to use the trained one).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Load test for the micro-batching inference service
+Measures throughput, latency and batch size as client concurrency grows (and per-worker memory for pre-fork)
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from io import BytesIO
+from urllib.parse import urlsplit
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_CONCURRENCY = "1,2,4,8,16,32"
+REQUESTS_PER_CLIENT = 20
+
+def make_test_image(size=(640, 480)):
+    """Smooth random JPEG (compresses like a photo, unlike pure noise)"""
+    rng = np.random.default_rng(0)
+    coarse = Image.fromarray(rng.integers(0, 256, (size[1] // 16, size[0] // 16, 3), dtype=np.uint8))
+    buffer = BytesIO()
+    coarse.resize(size, Image.BICUBIC).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def request_json(url, method="GET", path="/", body=None):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+    try:
+        conn.request(method, path, body=body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+def client(url, path, image_bytes, n_requests, latencies, errors):
+    """One keep-alive client sending requests back to back"""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+    headers = {"Content-Type": "application/octet-stream"}
+    try:
+        for _ in range(n_requests):
+            start = time.perf_counter()
+            conn.request("POST", path, body=image_bytes, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors.append(response.status)
+    except (OSError, http.client.HTTPException) as e:
+        errors.append(str(e))
+    finally:
+        conn.close()
+
+def batcher_stats(url, key):
+    _, stats = request_json(url, path="/stats")
+    return stats["batchers"].get(key, {"requests": 0, "batches": 0})
+
+def run_level(url, model, image_bytes, concurrency, requests_per_client, gradcam=False):
+    """Run one concurrency level and summarize it"""
+    path = f"/predict/{model}{'?gradcam=1' if gradcam else ''}"
+    key = f"{model}{'+gradcam' if gradcam else ''}"
+    before = batcher_stats(url, key)
+
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=client, args=(url, path, image_bytes, requests_per_client, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    after = batcher_stats(url, key)
+    batches = after["batches"] - before["batches"]
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95_ms": float(np.percentile(latencies, 95)) if latencies else 0.0,
+        "mean_batch": (after["requests"] - before["requests"]) / batches if batches else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the micro-batching inference service")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--model", default="PureCNN")
+    parser.add_argument("--image", help="Image to send (default: synthetic 640x480 JPEG)")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY,
+                        help="Comma-separated client counts (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_CLIENT,
+                        help="Requests per client per level (default: %(default)s)")
+    parser.add_argument("--gradcam", action="store_true", help="Request Grad-CAM overlays too")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = make_test_image()
+
+    print("\n" + "="*60)
+    print("MICRO-BATCHING SERVICE LOAD TEST")
+    print("="*60)
+
+    try:
+        _, health = request_json(args.url, path="/health")
+    except OSError as e:
+        print(f"❌ Service not reachable at {args.url}: {e}")
+        return 1
+    if args.model not in health.get("models", []):
+        print(f"❌ {args.model} is not served (available: {', '.join(health.get('models', []))})")
+        return 1
+
+    # One request first so model loading and tracing are not measured
+    run_level(args.url, args.model, image_bytes, 1, 2, args.gradcam)
+
+    results = [
+        run_level(args.url, args.model, image_bytes, int(c), args.requests, args.gradcam)
+        for c in args.concurrency.split(",")
+    ]
+
+    _, stats = request_json(args.url, path="/stats")
+    print(f"Model: {args.model}{' + Grad-CAM' if args.gradcam else ''} · "
+          f"max batch {stats['max_batch_size']} · max wait {stats['max_wait_ms']} ms")
+    print("\n" + "="*60)
+    print(f"{'Clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'batch':>8}{'errors':>8}{'scale':>8}")
+    print("-"*60)
+    base = results[0]["throughput"] or 1.0
+    for r in results:
+        print(f"{r['concurrency']:>8}{r['throughput']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['mean_batch']:>8.1f}{r['errors']:>8}{r['throughput'] / base:>7.1f}x")
+    print("="*60)
+
+    # Pre-fork service: memory per worker process
+    _, stats = request_json(args.url, path="/stats")
+    if stats.get("workers"):
+        print(f"{'Worker':>8}{'pid':>10}{'requests':>10}{'RSS MB':>10}{'PSS MB':>10}{'shared MB':>11}")
+        print("-"*60)
+        for w in stats["workers"]:
+            print(f"{w['index']:>8}{w['pid']:>10}{w['forwarded']:>10}{w.get('rss_mb', 0):>10.1f}"
+                  f"{w.get('pss_mb', 0):>10.1f}{w.get('shared_mb', 0):>11.1f}")
+        print(f"{len(stats['workers'])} workers · total RSS {stats['total_rss_mb']:.1f} MB · "
+              f"total PSS {stats['total_pss_mb']:.1f} MB")
+        print("="*60)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+"""
+Shared fixtures for the test suite
+Tests run on tiny synthetic Keras models, so the trained (LFS) models are not needed
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Dashboard")]
+
+def build_tiny_cnn(size=32, name="tiny_cnn", seed=0):
+    """Small PureCNN-style Sequential (conv -> relu -> BN -> pool, Flatten, Dense)"""
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
+    keras.utils.set_random_seed(seed)
+    return keras.Sequential([
+        keras.Input((size, size, 3)),
+        layers.Conv2D(4, 3, activation="relu", padding="same", name="conv2d"),
+        layers.BatchNormalization(name="batch_normalization"),
+        layers.MaxPooling2D(name="max_pooling2d"),
+        layers.Conv2D(8, 3, activation="relu", padding="same", name="conv2d_2"),
+        layers.BatchNormalization(name="batch_normalization_1"),
+        layers.MaxPooling2D(name="max_pooling2d_1"),
+        layers.Flatten(name="flatten"),
+        layers.Dense(8, activation="relu", name="dense"),
+        layers.Dropout(0.5, name="dropout"),
+        layers.Dense(2, activation="softmax", name="dense_1")
+    ], name=name)
+
+@pytest.fixture
+def tiny_cnn():
+    return build_tiny_cnn()
+
+@pytest.fixture
+def pil_images():
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 256, (40 + i, 48, 3), dtype=np.uint8)) for i in range(5)]
+
+@pytest.fixture
+def tiny_registry(tmp_path, monkeypatch):
+    """
+    Register a tiny CNN (32x32 input) under every model name
+
+    Each model gets its own weights and file, the registry and backend
+    caches start empty, and MODEL_SPECS is restored after the test.
+
+    Returns:
+        dict of model name -> saved .keras path
+    """
+    from utils import backends, model_loader
+
+    paths = {}
+    for seed, name in enumerate(model_loader.MODEL_SPECS):
+        paths[name] = str(tmp_path / f"{name.lower()}.keras")
+        build_tiny_cnn(name=f"tiny_{name.lower()}", seed=seed).save(paths[name])
+        monkeypatch.setitem(model_loader.MODEL_SPECS, name, {
+            **model_loader.MODEL_SPECS[name],
+            "path": paths[name],
+            "inference_path": None,
+            "input_size": (32, 32, 3),
+            "last_conv_layer": "conv2d_2",
+            "backend": "keras"
+        })
+        monkeypatch.delenv(f"POTHOLE_BACKEND_{name.upper()}", raising=False)
+        monkeypatch.delenv(f"POTHOLE_RESOLUTION_{name.upper()}", raising=False)
+    for var in ("POTHOLE_BACKEND", "POTHOLE_RESOLUTION", "POTHOLE_CASCADE"):
+        monkeypatch.delenv(var, raising=False)
+
+    model_loader.get_registry.clear()
+    backends._backends.clear()
+    yield paths
+    model_loader.get_registry.clear()
+    backends._backends.clear()
+
+@pytest.fixture
+def image_zip(tmp_path, pil_images):
+    """ZIP with the pil_images as PNGs, one undecodable image and one non-image member"""
+    import io
+    import zipfile
+
+    path = tmp_path / "images.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        for i, image in enumerate(pil_images):
+            buf = io.BytesIO()
+            image.save(buf, format="PNG")
+            z.writestr(f"road/img_{i}.png", buf.getvalue())
+        z.writestr("road/broken.jpg", b"not an image")
+        z.writestr("notes.txt", b"ignored")
+    return str(path)
@@ -0,0 +1,51 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from utils.batch import ResultWriter, list_zip_images, make_result_row, result_columns, stream_zip_predictions
+from utils.inference import predict_images
+from utils.model_loader import CLASS_NAMES
+
+def test_list_zip_images_skips_non_images(image_zip):
+    names = list_zip_images(image_zip)
+    assert "notes.txt" not in names
+    assert len(names) == 6
+
+def test_stream_matches_batched_inference(tiny_registry, tiny_cnn, pil_images, image_zip):
+    chunks = list(stream_zip_predictions(tiny_cnn, image_zip, CLASS_NAMES, "PureCNN", batch_size=2, num_workers=2))
+    results = [row for chunk in chunks for row in chunk.results]
+    expected = list(predict_images(tiny_cnn, pil_images, CLASS_NAMES, "PureCNN"))
+
+    assert [row["image_name"] for row in results] == [f"img_{i}.png" for i in range(len(pil_images))]
+    for row, (label, conf, _) in zip(results, expected):
+        assert row["prediction"] == label
+        assert abs(row["confidence"] - conf) < 1e-5
+
+def test_stream_bounds_batches_and_reports_skipped(tiny_registry, tiny_cnn, image_zip):
+    chunks = list(stream_zip_predictions(tiny_cnn, image_zip, CLASS_NAMES, "PureCNN", batch_size=2))
+
+    assert all(len(chunk.results) <= 2 for chunk in chunks)
+    assert all(len(chunk.images) == len(chunk.results) for chunk in chunks)
+    skipped = [message for chunk in chunks for message in chunk.skipped]
+    assert len(skipped) == 1 and skipped[0].startswith("broken.jpg:")
+    assert [name for chunk in chunks for name in chunk.skipped_names] == ["road/broken.jpg"]
+
+def test_result_writer_aligns_batches_to_columns():
+    writer = ResultWriter(result_columns(CLASS_NAMES, stage=True))
+    writer.write([make_result_row("a.png", "POTHOLE", 0.9, [0.1, 0.9], CLASS_NAMES)])
+    writer.write([make_result_row("b.png", "NOPOTHOLE", 0.6, [0.6, 0.4], CLASS_NAMES, stage="ResNet50") | {"extra": 1}])
+
+    csv = pd.read_csv(BytesIO(writer.csv_bytes()))
+    parquet = pd.read_parquet(BytesIO(writer.parquet_bytes()))
+    for df in (csv, parquet):
+        assert list(df.columns) == result_columns(CLASS_NAMES, stage=True)
+        assert df["image_name"].tolist() == ["a.png", "b.png"]
+        assert pd.isna(df["stage"][0]) and df["stage"][1] == "ResNet50"
+
+def test_result_writer_rejects_writes_after_close():
+    writer = ResultWriter()
+    writer.write([make_result_row("a.png", "POTHOLE", 0.9, [0.1, 0.9], CLASS_NAMES)])
+    writer.parquet_bytes()
+    with pytest.raises(ValueError, match="closed"):
+        writer.write([make_result_row("b.png", "NOPOTHOLE", 0.6, [0.6, 0.4], CLASS_NAMES)])
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from tensorflow import keras
+
+from utils.bn_folding import ChannelShift, fold_batchnorm
+
+def randomize_batchnorm(model, seed=0, negative_scale=False):
+    """Non-trivial trained-looking BN statistics (identity BNs would hide folding errors)"""
+    rng = np.random.default_rng(seed)
+    for layer in model.layers:
+        if isinstance(layer, keras.layers.BatchNormalization):
+            n = layer.gamma.shape[0]
+            gamma = rng.uniform(0.5, 2.0, n)
+            if negative_scale:
+                gamma[0] = -gamma[0]
+            layer.set_weights([gamma, rng.normal(0, 0.5, n), rng.normal(0, 0.5, n), rng.uniform(0.2, 3.0, n)])
+    return model
+
+def test_folded_model_matches_original(tiny_cnn):
+    model = randomize_batchnorm(tiny_cnn)
+    batch = np.random.default_rng(1).random((4, 32, 32, 3), dtype=np.float32)
+
+    folded, n_folded = fold_batchnorm(model)
+
+    assert n_folded == 2
+    assert not any(isinstance(layer, (keras.layers.BatchNormalization, keras.layers.Dropout)) for layer in folded.layers)
+    np.testing.assert_allclose(folded.predict(batch, verbose=0), model.predict(batch, verbose=0), atol=1e-4)
+
+def test_negative_scale_keeps_the_batchnorm(tiny_cnn):
+    model = randomize_batchnorm(tiny_cnn, negative_scale=True)
+    batch = np.random.default_rng(2).random((4, 32, 32, 3), dtype=np.float32)
+
+    folded, n_folded = fold_batchnorm(model)
+
+    assert n_folded < 2
+    np.testing.assert_allclose(folded.predict(batch, verbose=0), model.predict(batch, verbose=0), atol=1e-4)
+
+def test_folded_model_round_trips_through_keras_file(tiny_cnn, tmp_path):
+    model = randomize_batchnorm(tiny_cnn, seed=3)
+    batch = np.random.default_rng(3).random((2, 32, 32, 3), dtype=np.float32)
+    folded, _ = fold_batchnorm(model)
+
+    path = str(tmp_path / "folded.keras")
+    folded.save(path)
+    loaded = keras.models.load_model(path, custom_objects={"ChannelShift": ChannelShift})
+
+    np.testing.assert_allclose(loaded.predict(batch, verbose=0), model.predict(batch, verbose=0), atol=1e-4)
+
+def test_only_sequential_models_fold():
+    inputs = keras.Input((8,))
+    model = keras.Model(inputs, keras.layers.Dense(2)(inputs))
+    with pytest.raises(ValueError):
+        fold_batchnorm(model)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from utils.batch import stream_zip_predictions
+from utils.cascade import CascadeModel, parse_stages, summarize_stages
+from utils.gradcam import explain_by_model, explain_images
+from utils.inference import CONFIDENCE_THRESHOLD, predict_images
+from utils.model_loader import CLASS_NAMES, load_model_file
+
+def stage_predictions(name, images):
+    return [preds for _, _, preds in predict_images(load_model_file(name), images, CLASS_NAMES, name)]
+
+def test_parse_stages():
+    stages = parse_stages("PureCNN:0.8, EfficientNet ,ResNet50:0.9")
+    assert [(s.model_name, s.threshold) for s in stages] == [
+        ("PureCNN", 0.8), ("EfficientNet", CONFIDENCE_THRESHOLD), ("ResNet50", None)
+    ]
+    with pytest.raises(ValueError):
+        parse_stages("PureCNN,VGG16")
+
+def test_low_confidence_images_are_escalated(tiny_registry, pil_images):
+    first = stage_predictions("PureCNN", pil_images)
+    final = stage_predictions("ResNet50", pil_images)
+    threshold = float(np.median([preds.max() for preds in first]))
+
+    cascade = CascadeModel([("PureCNN", threshold), ("ResNet50", None)])
+    results = list(cascade.predict_images(pil_images, CLASS_NAMES, batch_size=2))
+
+    for (_, _, preds, stage), first_preds, final_preds in zip(results, first, final):
+        if first_preds.max() >= threshold:
+            assert stage == "PureCNN"
+            np.testing.assert_allclose(preds, first_preds, atol=1e-5)
+        else:
+            assert stage == "ResNet50"
+            np.testing.assert_allclose(preds, final_preds, atol=1e-5)
+    assert {stage for *_, stage in results} == {"PureCNN", "ResNet50"}
+
+@pytest.mark.parametrize("threshold, expected", [(0.0, 0.0), (1.01, 1.0)])
+def test_threshold_extremes(tiny_registry, pil_images, threshold, expected):
+    cascade = CascadeModel([("PureCNN", threshold), ("ResNet50", None)])
+    stages = [stage for *_, stage in cascade.predict_images(pil_images, CLASS_NAMES)]
+    assert summarize_stages(stages, cascade.stage_names)["escalated"] == expected
+
+def test_stream_adds_stage_column(tiny_registry, image_zip):
+    cascade = CascadeModel([("PureCNN", 1.01), ("ResNet50", None)])
+    rows = [row for chunk in stream_zip_predictions(cascade, image_zip, CLASS_NAMES) for row in chunk.results]
+    assert len(rows) == 5
+    assert {row["stage"] for row in rows} == {"ResNet50"}
+
+def test_hits_are_explained_by_their_deciding_model(tiny_registry, pil_images):
+    names = ["PureCNN", "ResNet50", "PureCNN", "ResNet50", "ResNet50"]
+    explained = explain_by_model(pil_images, names, pred_indices=[1] * len(names))
+
+    assert [name for _, name in explained] == names
+    for model_name in set(names):
+        idx = [i for i, name in enumerate(names) if name == model_name]
+        expected = explain_images(
+            load_model_file(model_name), [pil_images[i] for i in idx], "conv2d_2", model_name, pred_indices=[1] * len(idx)
+        )
+        for i, overlay in zip(idx, expected):
+            np.testing.assert_array_equal(explained[i][0], overlay)
+
+def test_identity_follows_each_stage_backend(tiny_registry, monkeypatch):
+    import tensorflow as tf
+    from utils.tflite_backend import get_tflite_path
+
+    cascade = CascadeModel([("PureCNN", 0.7), ("ResNet50", None)])
+    identity, mtime = cascade.identity()
+    assert tiny_registry["PureCNN"] in identity and tiny_registry["ResNet50"] in identity
+    assert mtime is not None
+
+    # Switching a stage to its TFLite export starts a new job
+    converter = tf.lite.TFLiteConverter.from_keras_model(load_model_file("PureCNN"))
+    with open(get_tflite_path("PureCNN", "int8"), "wb") as f:
+        f.write(converter.convert())
+    monkeypatch.setenv("POTHOLE_BACKEND_PURECNN", "tflite:int8")
+    tflite_identity, _ = cascade.identity()
+    assert tflite_identity != identity
+    assert get_tflite_path("PureCNN", "int8") in tflite_identity
+
+@pytest.mark.parametrize("value", ["PureCNN:abc,ResNet50", "Bogus,ResNet50"])
+def test_invalid_cascade_config_only_disables_cascade_mode(monkeypatch, value):
+    from streamlit.testing.v1 import AppTest
+
+    def batch_tab():
+        from utils.batch import render_batch_options
+        render_batch_options()
+
+    monkeypatch.setenv("POTHOLE_CASCADE", value)
+    app = AppTest.from_function(batch_tab).run()
+
+    assert not app.exception
+    assert "POTHOLE_CASCADE" in app.warning[0].value
+    assert app.checkbox[1].disabled and not app.checkbox[1].value
@@ -0,0 +1,53 @@
+import numpy as np
+from tensorflow.keras import layers
+
+from conftest import build_tiny_cnn
+from compress_purecnn import cluster_weights, prune_channels
+
+def silence_half_the_channels(model):
+    """Zero every other channel after each BatchNorm / hidden Dense (pruning them is then exact)"""
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if isinstance(layer, layers.BatchNormalization):
+            gamma, beta, mean, variance = weights
+            gamma[::2], beta[::2] = 0, 0
+            layer.set_weights([gamma, beta, mean, variance])
+        elif layer.name == "dense":
+            kernel, bias = weights
+            kernel[:, ::2], bias[::2] = 0, 0
+            layer.set_weights([kernel, bias])
+
+def channel_counts(model):
+    return [layer.get_weights()[0].shape[-1] for layer in model.layers if isinstance(layer, (layers.Conv2D, layers.Dense))]
+
+def test_prune_channels_shrinks_layers_and_keeps_io():
+    model = build_tiny_cnn()
+    pruned = prune_channels(model, 0.5)
+
+    assert channel_counts(model) == [4, 8, 8, 2]
+    assert channel_counts(pruned) == [2, 4, 4, 2]
+    assert pruned.input_shape == model.input_shape and pruned.output_shape == model.output_shape
+
+def test_prune_channels_matches_model_when_removed_channels_are_silent():
+    model = build_tiny_cnn()
+    silence_half_the_channels(model)
+    x = np.random.default_rng(0).random((4, 32, 32, 3), dtype=np.float32)
+
+    np.testing.assert_allclose(prune_channels(model, 0.0)(x), model(x), atol=1e-6)
+    np.testing.assert_allclose(prune_channels(model, 0.5)(x), model(x), atol=1e-5)
+
+def test_cluster_weights_shares_kernel_values():
+    model = build_tiny_cnn()
+    original = {layer.name: layer.get_weights() for layer in model.layers}
+    cluster_weights(model, 8)
+
+    for layer in model.layers:
+        if not isinstance(layer, (layers.Conv2D, layers.Dense)):
+            continue
+        (kernel, bias), (original_kernel, original_bias) = layer.get_weights(), original[layer.name]
+        assert kernel.shape == original_kernel.shape and kernel.dtype == original_kernel.dtype
+        assert len(np.unique(kernel)) <= 8
+        # Every weight moves at most to its centroid, within one cluster width
+        width = (original_kernel.max() - original_kernel.min()) / 8
+        assert np.abs(kernel - original_kernel).max() <= width
+        np.testing.assert_array_equal(bias, original_bias)
@@ -0,0 +1,54 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image, JpegImagePlugin
+
+from utils.decode import decode_image
+
+def encode(size, image_format):
+    rng = np.random.default_rng(0)
+    buf = BytesIO()
+    Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)).save(buf, format=image_format)
+    buf.seek(0)
+    return buf
+
+@pytest.fixture
+def draft_calls(monkeypatch):
+    calls = []
+    draft = JpegImagePlugin.JpegImageFile.draft
+
+    def record(self, mode, size):
+        calls.append(size)
+        return draft(self, mode, size)
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", record)
+    return calls
+
+def test_large_jpeg_is_decoded_in_draft_mode(draft_calls):
+    img = decode_image(encode((1600, 1200), "JPEG"), max_side=200)
+
+    assert draft_calls == [(200, 150)]
+    assert max(img.size) == 200 and img.mode == "RGB"
+    assert img.format == "JPEG"
+    assert img.info["original_size"] == (1600, 1200)
+
+def test_small_jpeg_and_png_skip_draft_mode(draft_calls):
+    assert decode_image(encode((120, 80), "JPEG"), max_side=200).size == (120, 80)
+    assert decode_image(encode((1600, 1200), "PNG"), max_side=200).size == (200, 150)
+    assert draft_calls == []
+
+def test_rejects_images_over_pixel_limit():
+    with pytest.raises(ValueError, match="exceeds the 10,000 pixel limit"):
+        decode_image(encode((200, 100), "PNG"), max_pixels=10_000)
+
+def test_rejects_decompression_bombs(monkeypatch):
+    # PIL warns above MAX_IMAGE_PIXELS and raises above twice that
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 5_000)
+    for size in [(100, 60), (200, 100)]:
+        with pytest.raises(ValueError, match="Image too large"):
+            decode_image(encode(size, "PNG"))
+
+def test_rejects_non_images():
+    with pytest.raises(ValueError, match="Cannot decode image"):
+        decode_image(BytesIO(b"not an image"))
@@ -0,0 +1,28 @@
+import numpy as np
+
+from utils.gradcam import explain_images, make_gradcam_heatmap, make_gradcam_heatmaps
+from utils.preprocessing import preprocess_batch
+
+def test_batched_heatmaps_match_single_image(tiny_registry, tiny_cnn, pil_images):
+    batch = preprocess_batch(pil_images, "PureCNN")
+    heatmaps = make_gradcam_heatmaps(batch, tiny_cnn, "conv2d_2")
+
+    assert heatmaps.shape[0] == len(pil_images)
+    assert heatmaps.max() > 0
+    for img_array, heatmap in zip(batch, heatmaps):
+        single = make_gradcam_heatmap(img_array[None], tiny_cnn, "conv2d_2")
+        np.testing.assert_allclose(heatmap, single, atol=1e-5)
+
+def test_batched_heatmaps_follow_requested_classes(tiny_registry, tiny_cnn, pil_images):
+    batch = preprocess_batch(pil_images, "PureCNN")
+    heatmaps = make_gradcam_heatmaps(batch, tiny_cnn, "conv2d_2", pred_indices=[1] * len(pil_images))
+
+    for img_array, heatmap in zip(batch, heatmaps):
+        single = make_gradcam_heatmap(img_array[None], tiny_cnn, "conv2d_2", pred_index=1)
+        np.testing.assert_allclose(heatmap, single, atol=1e-5)
+
+def test_explain_images_yields_one_overlay_per_image(tiny_registry, tiny_cnn, pil_images):
+    overlays = list(explain_images(tiny_cnn, pil_images, "conv2d_2", "PureCNN", batch_size=2))
+
+    assert len(overlays) == len(pil_images)
+    assert all(np.asarray(overlay).shape == (32, 32, 3) for overlay in overlays)
@@ -0,0 +1,21 @@
+
+import numpy as np
+
+from utils.inference import predict_image, predict_images
+from utils.model_loader import CLASS_NAMES
+
+def test_predict_images_matches_single_image(tiny_registry, tiny_cnn, pil_images):
+    single = [predict_image(tiny_cnn, image, CLASS_NAMES, "PureCNN") for image in pil_images]
+    batched = list(predict_images(tiny_cnn, pil_images, CLASS_NAMES, "PureCNN", batch_size=2))
+
+    assert len(batched) == len(pil_images)
+    for (label, conf, preds), (b_label, b_conf, b_preds) in zip(single, batched):
+        assert b_label == label
+        np.testing.assert_allclose(b_preds, preds, atol=1e-5)
+        assert abs(b_conf - conf) < 1e-5
+
+def test_predict_images_accepts_a_generator(tiny_registry, tiny_cnn, pil_images):
+    results = list(predict_images(tiny_cnn, iter(pil_images), CLASS_NAMES, "PureCNN", batch_size=3))
+    assert [label for label, _, _ in results] == [
+        predict_image(tiny_cnn, image, CLASS_NAMES, "PureCNN")[0] for image in pil_images
+    ]
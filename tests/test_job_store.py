@@ -0,0 +1,54 @@
+from utils.batch import ThroughputMeter, list_zip_images, stream_zip_predictions
+from utils.job_store import JobStore, archive_fingerprint
+from utils.model_loader import CLASS_NAMES
+
+def run_job(store, model, image_zip, fingerprint=None, **kwargs):
+    names = list_zip_images(image_zip)
+    job = store.open_job(fingerprint or archive_fingerprint(image_zip, names), "PureCNN", 1, len(names), **kwargs)
+    meter = ThroughputMeter(len(names), done=job.completed)
+    scored = []
+    for chunk in stream_zip_predictions(model, image_zip, CLASS_NAMES, "PureCNN", batch_size=2, names=names, job=job):
+        scored.extend(chunk.results)
+        meter.update(len(chunk.results) + len(chunk.skipped))
+    return job, scored, meter
+
+def test_resume_scores_nothing_twice(tiny_registry, tiny_cnn, image_zip, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job, scored, meter = run_job(store, tiny_cnn, image_zip)
+    assert len(scored) == 5
+    assert meter.done == meter.total == 6
+
+    # A fresh store on the same database resumes without reading any member
+    resumed, rescored, meter = run_job(JobStore(store.db_path), None, image_zip)
+    assert resumed.job_id == job.job_id
+    assert resumed.completed == 6
+    assert rescored == []
+    assert meter.done == meter.total and meter.eta is None
+    assert [row["image_name"] for row in resumed.completed_rows()] == [row["image_name"] for row in scored]
+
+def test_skipped_members_are_recorded(tiny_registry, tiny_cnn, image_zip, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job, _, _ = run_job(store, tiny_cnn, image_zip)
+
+    assert [message.split(":")[0] for message in job.skipped_rows()] == ["broken.jpg"]
+    assert store.get_job(job.job_id)["status"] == "completed_with_errors"
+
+    # Skipped members are only decoded again on request
+    assert JobStore(store.db_path).open_job("other", "PureCNN", 1, 6).completed == 0
+    retry, _, _ = run_job(store, tiny_cnn, image_zip, retry_skipped=True)
+    assert len(retry.skipped_rows()) == 1
+
+def test_same_content_is_reused_across_jobs(tiny_registry, tiny_cnn, image_zip, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    _, scored, _ = run_job(store, tiny_cnn, image_zip)
+
+    # No model: every image must come from the stored results
+    _, reused, meter = run_job(store, None, image_zip, fingerprint="another-upload")
+    assert sorted(row["image_name"] for row in reused) == sorted(row["image_name"] for row in scored)
+    assert meter.done == meter.total
+
+def test_meter_never_passes_total():
+    meter = ThroughputMeter(3, done=2)
+    meter.update(5)
+    assert meter.done == 3
+    assert meter.eta in (None, 0.0)
@@ -0,0 +1,29 @@
+import importlib
+
+import pytest
+
+from check_import_budget import IMPORT_BUDGET_S, get_home_imports, measure_once
+
+def test_home_page_imports_stay_light():
+    elapsed, loaded = measure_once(get_home_imports())
+    assert loaded == []
+    # Generous margin over the budget: shared CI machines are noisy
+    assert elapsed <= 2 * IMPORT_BUDGET_S
+
+def test_light_module_does_not_pull_in_tensorflow():
+    _, loaded = measure_once("from utils import get_base_css, get_home_theme")
+    assert loaded == []
+
+def test_every_lazy_name_resolves():
+    import utils
+
+    for module_name, names in utils._LAZY_IMPORTS.items():
+        module = importlib.import_module(f"utils.{module_name}")
+        for name in names:
+            assert getattr(utils, name) is getattr(module, name)
+
+def test_unknown_name_raises_attribute_error():
+    import utils
+
+    with pytest.raises(AttributeError):
+        utils.not_a_real_name
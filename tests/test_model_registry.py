@@ -0,0 +1,46 @@
+import logging
+import os
+
+from utils import model_loader
+from utils.model_loader import MODEL_SPECS, ModelRegistry
+
+def model_sizes(monkeypatch, tiny_registry):
+    """(weight bytes, largest file size) of the tiny models"""
+    # Footprints are the weight bytes when RSS is unavailable, so sizes are exact
+    monkeypatch.setattr(model_loader, "_get_rss_bytes", lambda: None)
+    weights = model_loader._weights_bytes(ModelRegistry(MODEL_SPECS).get(next(iter(tiny_registry))))
+    return weights, max(os.path.getsize(path) for path in tiny_registry.values())
+
+def test_registry_evicts_least_recently_used(monkeypatch, tiny_registry, caplog):
+    weights, file_size = model_sizes(monkeypatch, tiny_registry)
+    # Two resident models, or one plus the file estimate of the model being loaded
+    registry = ModelRegistry(MODEL_SPECS, weights + max(weights, file_size))
+    a, b, c = list(tiny_registry)[:3]
+    registry.get(a)
+    registry.get(b)
+    registry.get(a)  # b is now the least recently used
+
+    with caplog.at_level(logging.INFO, logger=model_loader.__name__):
+        registry.get(c)
+
+    assert [row["model"] for row in registry.report()] == [c, a]
+    assert registry.resident_mb() * 1024 ** 2 <= registry.budget_bytes
+    assert f"Evicted {b} from model registry" in caplog.text
+
+def test_registry_reloads_evicted_model(monkeypatch, tiny_registry):
+    weights, _ = model_sizes(monkeypatch, tiny_registry)
+    registry = ModelRegistry(MODEL_SPECS, weights)
+    a, b = list(tiny_registry)[:2]
+    first = registry.get(a)
+    registry.get(b)
+    assert [row["model"] for row in registry.report()] == [b]
+
+    reloaded = registry.get(a)
+    assert reloaded is not first
+    assert [row["model"] for row in registry.report()] == [a]
+
+def test_registry_without_budget_keeps_everything(tiny_registry):
+    registry = ModelRegistry(MODEL_SPECS)
+    for name in tiny_registry:
+        registry.get(name)
+    assert {row["model"] for row in registry.report()} == set(tiny_registry)
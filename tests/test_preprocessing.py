@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from utils.inference import preprocess_image
+from utils.preprocessing import preprocess_batch
+
+@pytest.mark.parametrize("model_type", ["PureCNN", "ResNet50", "EfficientNet"])
+def test_batch_matches_single_image(tiny_registry, pil_images, model_type):
+    batch = preprocess_batch(pil_images, model_type)
+
+    assert batch.shape == (len(pil_images), 32, 32, 3)
+    assert batch.dtype == np.float32
+    for image, row in zip(pil_images, batch):
+        np.testing.assert_allclose(row, preprocess_image(image, model_type)[0], atol=1e-4)
+
+def test_batch_reuses_output_buffer(tiny_registry, pil_images):
+    out = np.empty((len(pil_images), 32, 32, 3), dtype=np.float32)
+    batch = preprocess_batch(pil_images, "PureCNN", out=out)
+
+    assert np.shares_memory(batch, out)
+    assert 0.0 <= batch.min() and batch.max() <= 1.0
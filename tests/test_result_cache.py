@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from utils.result_cache import ResultCache
+
+def entry(value, size=1000):
+    return {"probs": np.full(size // 8, value, dtype=np.float64)}
+
+def test_make_key_changes_with_model_identity():
+    key = ResultCache.make_key(b"image", "PureCNN", 100.0)
+    assert key != ResultCache.make_key(b"image", "PureCNN", 200.0)
+    assert key != ResultCache.make_key(b"image", "ResNet50", 100.0)
+    assert key != ResultCache.make_key(b"other", "PureCNN", 100.0)
+
+def test_memory_tier_evicts_lru_within_byte_budget():
+    cache = ResultCache(max_bytes=2500)
+    cache.put("a", entry(1))
+    cache.put("b", entry(2))
+    assert cache.get("a") is not None  # b is now the least recently used
+    cache.put("c", entry(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a")["probs"][0] == 1 and cache.get("c")["probs"][0] == 3
+    assert cache.stats()["bytes"] == 2000 <= cache.max_bytes
+
+def test_memory_tier_skips_entries_over_budget():
+    cache = ResultCache(max_bytes=500)
+    cache.put("big", entry(1))
+    assert cache.stats()["entries"] == 0
+
+def test_disk_tier_survives_restart(tmp_path):
+    ResultCache(cache_dir=str(tmp_path)).put("a", entry(1))
+
+    cache = ResultCache(cache_dir=str(tmp_path))
+    assert cache.get("a")["probs"][0] == 1
+    assert cache.stats()["disk_hits"] == 1
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".")]
+
+def test_disk_tier_prunes_oldest_files(tmp_path):
+    cache_dir = str(tmp_path)
+    probe = ResultCache(cache_dir=cache_dir)
+    probe.put("probe", entry(0))
+    file_size = os.path.getsize(os.path.join(cache_dir, "probe.npz"))
+    os.remove(os.path.join(cache_dir, "probe.npz"))
+
+    cache = ResultCache(cache_dir=cache_dir, disk_max_bytes=int(file_size * 2.5))
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, entry(i))
+        os.utime(os.path.join(cache_dir, f"{key}.npz"), (1000 + i, 1000 + i))
+
+    assert sorted(os.listdir(cache_dir)) == ["b.npz", "c.npz"]
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.get("b")["probs"][0] == 1
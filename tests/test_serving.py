@@ -0,0 +1,79 @@
+import asyncio
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+
+from utils.model_loader import CLASS_NAMES
+from utils.serving import MAX_BODY_BYTES, HTTPError, InferenceServer, read_request
+
+def png_bytes(image):
+    buf = BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+def dispatch(server, method, target, body=b""):
+    async def call():
+        try:
+            return await server.dispatch(method, target, body)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+    return asyncio.run(call())
+
+def parse(raw):
+    async def call():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_request(reader)
+    return asyncio.run(call())
+
+def test_concurrent_requests_share_one_batch(tiny_registry, pil_images):
+    server = InferenceServer(["PureCNN"], max_batch_size=4, max_wait_ms=2000)
+    bodies = [png_bytes(image) for image in pil_images[:4]]
+
+    async def predict_all():
+        return await asyncio.gather(*(server.predict("PureCNN", body) for body in bodies))
+
+    outputs = asyncio.run(predict_all())
+    assert [output["batch_size"] for output in outputs] == [4] * 4
+    assert all(output["prediction"] in CLASS_NAMES for output in outputs)
+    assert all(abs(sum(output["probabilities"].values()) - 1) < 1e-5 for output in outputs)
+    stats = server.stats()["batchers"]["PureCNN"]
+    assert (stats["requests"], stats["batches"], stats["largest_batch"]) == (4, 1, 4)
+
+def test_dispatch_errors(tiny_registry, pil_images):
+    server = InferenceServer(["PureCNN"])
+
+    assert dispatch(server, "POST", "/predict/PureCNN")[0] == HTTPStatus.BAD_REQUEST
+    status, payload = dispatch(server, "POST", "/predict/PureCNN", b"not an image")
+    assert status == HTTPStatus.BAD_REQUEST and "Cannot decode image" in payload["error"]
+    assert dispatch(server, "POST", "/predict/ResNet50", png_bytes(pil_images[0]))[0] == HTTPStatus.NOT_FOUND
+    assert dispatch(server, "GET", "/predict/PureCNN")[0] == HTTPStatus.METHOD_NOT_ALLOWED
+    assert dispatch(server, "GET", "/nowhere")[0] == HTTPStatus.NOT_FOUND
+
+def test_models_lists_public_fields_only(tiny_registry):
+    status, payload = dispatch(InferenceServer(["PureCNN", "ResNet50"]), "GET", "/models")
+
+    assert status == HTTPStatus.OK
+    assert payload["PureCNN"] == {
+        "name": "PureCNN", "input_size": [32, 32, 3], "backend": "keras", "variant": None, "exists": True
+    }
+    assert not any(str(tiny_registry["PureCNN"]) in str(value) for value in payload["PureCNN"].values())
+
+def test_read_request_parses_body_and_keep_alive():
+    request = parse(b"POST /predict/PureCNN HTTP/1.1\r\nContent-Length: 3\r\n\r\nabc")
+    assert (request.method, request.target, request.body, request.keep_alive) == ("POST", "/predict/PureCNN", b"abc", True)
+    assert not parse(b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n").keep_alive
+    assert parse(b"") is None
+
+@pytest.mark.parametrize("raw, status", [
+    (b"GARBAGE\r\n\r\n", HTTPStatus.BAD_REQUEST),
+    (b"POST / HTTP/1.1\r\nContent-Length: abc\r\n\r\n", HTTPStatus.BAD_REQUEST),
+    (b"POST / HTTP/1.1\r\nContent-Length: -1\r\n\r\n", HTTPStatus.BAD_REQUEST),
+    (b"POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY_BYTES + 1), HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+])
+def test_read_request_rejects_bad_requests(raw, status):
+    with pytest.raises(HTTPError) as e:
+        parse(raw)
+    assert e.value.status == status
@@ -0,0 +1,39 @@
+import numpy as np
+from tensorflow import keras
+
+from conftest import build_tiny_cnn
+from train_resolutions import rebuild_at_resolution
+from utils.gradcam import build_gradcam_model
+
+def nested_backbone_model(size=64):
+    """Transfer-learning layout: a Functional backbone nested in a Sequential"""
+    backbone = keras.applications.EfficientNetB0(weights=None, include_top=False, input_shape=(size, size, 3))
+    return keras.Sequential([
+        keras.Input((size, size, 3)),
+        backbone,
+        keras.layers.GlobalAveragePooling2D(),
+        keras.layers.Dense(2, activation="softmax")
+    ])
+
+def test_nested_backbone_is_rebuilt_at_new_size():
+    model = nested_backbone_model()
+    resized, reset = rebuild_at_resolution(model, 32)
+
+    assert reset == []
+    assert resized.input_shape == (None, 32, 32, 3)
+    assert resized.get_layer("efficientnetb0").input_shape == (None, 32, 32, 3)
+    assert resized.predict(np.zeros((2, 32, 32, 3)), verbose=0).shape == (2, 2)
+
+    conv_outputs, preds = build_gradcam_model(resized, "top_activation")(np.zeros((1, 32, 32, 3)))
+    assert conv_outputs.shape[1:3] == (1, 1) and preds.shape == (1, 2)
+
+def test_same_size_rebuild_keeps_outputs():
+    model = nested_backbone_model()
+    resized, _ = rebuild_at_resolution(model, 64)
+    x = np.random.default_rng(0).uniform(0, 255, (2, 64, 64, 3)).astype(np.float32)
+    np.testing.assert_allclose(resized(x).numpy(), model(x).numpy(), atol=1e-6)
+
+def test_flatten_dense_is_reinitialized():
+    resized, reset = rebuild_at_resolution(build_tiny_cnn(32), 16)
+    assert reset == ["dense"]
+    assert resized.predict(np.zeros((1, 16, 16, 3)), verbose=0).shape == (1, 2)
@@ -0,0 +1,173 @@
+"""
+Fine-tune each model at lower input resolutions
+Saves the variants next to the trained models and reports accuracy against CPU latency per resolution
+"""
+
+import argparse
+import csv
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Dashboard"))
+
+from tensorflow import keras
+from compress_purecnn import fine_tune
+from distill_student import evaluate, load_split, predict_uint8
+from export_tflite import DEFAULT_DATASET, time_single
+from utils.model_loader import MODEL_SPECS, PROJECT_ROOT, get_inference_fn, get_resolution_path
+from utils.preprocessing import get_preprocessor
+
+DEFAULT_MODELS = ["PureCNN", "ResNet50", "EfficientNet"]
+DEFAULT_REPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "allmodel", "resolution_report.csv")
+
+SIZES = (128, 160, 224)
+EPOCHS = 5
+BATCH_SIZE = 32
+LEARNING_RATE = 1e-4
+
+def _clone_layer(size):
+    """clone_model hook that moves nested backbones onto the new input size as well"""
+    def clone(layer):
+        if isinstance(layer, keras.Model):
+            inputs = keras.Input((size, size, layer.input_shape[-1]))
+            return keras.models.clone_model(layer, input_tensors=inputs, clone_function=clone)
+        return layer.__class__.from_config(layer.get_config())
+    return clone
+
+def _copy_weights(source, target, reset):
+    """Copy weights layer by layer (recursing into nested models), collecting mismatches"""
+    for layer in source.layers:
+        if not layer.weights:
+            continue
+        target_layer = target.get_layer(layer.name)
+        if isinstance(layer, keras.Model):
+            _copy_weights(layer, target_layer, reset)
+            continue
+        weights = layer.get_weights()
+        if [w.shape for w in weights] == [w.shape for w in target_layer.get_weights()]:
+            target_layer.set_weights(weights)
+        else:
+            reset.append(layer.name)
+
+def rebuild_at_resolution(model, size):
+    """
+    Copy of a model with a (size, size, 3) input
+
+    Layers are cloned onto the new input, including nested backbones such
+    as the resnet50 / efficientnetb0 base of a transfer learning model
+    (their own Input would otherwise stay at 224x224), and every weight
+    whose shape does not depend on the resolution is copied. Models with
+    global pooling (ResNet50, EfficientNet) keep all of their weights;
+    PureCNN's first Dense after Flatten changes shape and starts from a
+    fresh initialization.
+
+    Returns:
+        (resized model, names of the re-initialized layers)
+    """
+    clone = _clone_layer(size)
+    inputs = keras.Input((size, size, model.input_shape[-1]))
+    resized = keras.models.clone_model(model, input_tensors=inputs, clone_function=clone)
+    reset = []
+    _copy_weights(model, resized, reset)
+    return resized, reset
+
+def measure_row(model, model_name, size, test_images, test_labels):
+    metrics = evaluate(predict_uint8(model, model_name, test_images), test_labels)
+    batch = get_preprocessor(model_name)(test_images[:1], np.empty(test_images[:1].shape, dtype=np.float32))
+    infer = get_inference_fn(model)
+    return {
+        "model": model_name,
+        "input_size": size,
+        "parameters": model.count_params(),
+        "accuracy": metrics["Accuracy"],
+        "f1": metrics["F1-Score"],
+        "latency_ms": round(time_single(lambda x: infer(x).numpy(), batch), 2)
+    }
+
+def print_table(rows):
+    print("\n" + "="*72)
+    print(f"{'Model':<14}{'Input':>8}{'Params':>13}{'Accuracy':>10}{'F1':>8}{'ms':>9}{'Speedup':>10}")
+    print("-"*72)
+    for row in rows:
+        print(f"{row['model']:<14}{row['input_size']:>8}{row['parameters']:>13,}{row['accuracy']:>9.2f}%"
+              f"{row['f1']:>8.2f}{row['latency_ms']:>9.2f}{row['speedup']:>9.1f}x")
+    print("="*72)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fine-tune models at several input resolutions")
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS), default=DEFAULT_MODELS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES),
+                        help="Square input sizes in pixels (default: %(default)s)")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET,
+                        help="Dataset root with train/, valid/ and test/ folders (default: %(default)s)")
+    parser.add_argument("--epochs", type=int, default=EPOCHS, help="Fine-tuning epochs per variant")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE)
+    parser.add_argument("--no-save", action="store_true", help="Only report, do not write the variants")
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="Report CSV (default: %(default)s)")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("MULTI-RESOLUTION VARIANTS")
+    print("="*60)
+
+    models = []
+    for name in args.models:
+        if os.path.exists(MODEL_SPECS[name]["path"]):
+            models.append(name)
+        else:
+            print(f"❌ Model not found: {MODEL_SPECS[name]['path']}")
+    if not models:
+        return 1
+
+    rows = []
+    for size in sorted(set(args.sizes)):
+        # Images are decoded once per resolution and shared by every model
+        needs_training = any(size != MODEL_SPECS[name]["input_size"][0] for name in models)
+        splits = {split: load_split(args.dataset, split, (size, size))
+                  for split in (("train", "valid", "test") if needs_training else ("test",))}
+        for split, (images, _, _) in splits.items():
+            if images is None:
+                print(f"❌ No labeled images in {os.path.join(args.dataset, split)}")
+                return 1
+        test_images, test_labels, _ = splits["test"]
+
+        for name in models:
+            print(f"\n{'='*60}")
+            print(f"{name} @ {size}x{size}")
+            print(f"{'='*60}")
+            model = keras.models.load_model(MODEL_SPECS[name]["path"], compile=False)
+            native = size == MODEL_SPECS[name]["input_size"][0]
+            if not native:
+                model, reset = rebuild_at_resolution(model, size)
+                if reset:
+                    print(f"⚠️ Re-initialized (input-size dependent): {', '.join(reset)}")
+                model = fine_tune(model, splits, args.epochs, args.batch_size, args.learning_rate, model_name=name)
+
+            rows.append(measure_row(model, name, size, test_images, test_labels))
+            print(f"✅ Accuracy {rows[-1]['accuracy']:.2f}% · {rows[-1]['latency_ms']:.2f} ms")
+
+            if not native and not args.no_save:
+                out_path = get_resolution_path(name, size)
+                model.save(out_path)
+                print(f"✅ Saved to {os.path.relpath(out_path, PROJECT_ROOT)}")
+
+    # Speedup against the largest resolution measured for the same model
+    rows.sort(key=lambda row: (args.models.index(row["model"]), -row["input_size"]))
+    for row in rows:
+        base = next(r for r in rows if r["model"] == row["model"])
+        row["speedup"] = round(base["latency_ms"] / row["latency_ms"], 2)
+
+    print_table(rows)
+    with open(args.report, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n✅ Report saved to {args.report}")
+    print("\nSelect a variant in the Dashboard with POTHOLE_RESOLUTION_<MODEL>=<size> "
+          "(e.g. POTHOLE_RESOLUTION_EFFICIENTNET=160).")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())